@@ -17,6 +17,16 @@ class Film(BaseModel):
 class FilmListResponse(BaseModel):
     films: List[Film]
 
+class SimilarFilm(BaseModel):
+    film_id: int
+    title: str
+    similarity: float
+    poster_path: Optional[str] = None
+
+class SimilarFilmsResponse(BaseModel):
+    film_id: int
+    similar_films: List[SimilarFilm]
+
 
 # Définition de la classe pour la requête
 class RecommendRequest(BaseModel):
@@ -47,6 +57,21 @@ class TopFilm(BaseModel):
     release_date: date
 class ListTopFilm(BaseModel):
     top_films:List[TopFilm]
+class HistogramBin(BaseModel):
+    start: float
+    end: float
+    count: int
+
+class YearCount(BaseModel):
+    year: int
+    count: int
+
+class StatisticsOverviewResponse(BaseModel):
+    total_films: int
+    rating_histogram: List[HistogramBin]
+    films_per_year: List[YearCount]
+    top_films: List[TopFilm]
+
 class GenreStatistics(BaseModel):
     genre: str
     count: int
@@ -63,6 +88,24 @@ class DistributionGenresResponse(BaseModel):
     year: int
     genres: List[GenreDistribution]
 
+class YearStatistics(BaseModel):
+    year: int
+    total_films: int
+    genres: List[GenreDistribution]
+    top_films: List[TopFilm]
+
+class StatisticsRangeResponse(BaseModel):
+    year_from: int
+    year_to: int
+    genres: List[str]
+    years: List[YearStatistics]
+
 class FilmCountResponse(BaseModel):
     total_films: int
 
+class GenreListResponse(BaseModel):
+    genres: List[str]
+
+class DataVersionResponse(BaseModel):
+    version: str
+
@@ -0,0 +1,64 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Header, HTTPException, Query
+
+from app.utils.profiler import arm_profiler, current_session
+
+router = APIRouter(prefix="/admin")
+
+# Jeton exigé dans l'en-tête X-Admin-Token ; sans jeton configuré, les routes d'administration sont désactivées
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def check_admin(token: str):
+    """
+    Vérifie le jeton d'administration.
+
+    Args:
+        token (str): Valeur de l'en-tête X-Admin-Token.
+
+    Raises:
+        HTTPException: 403 si l'administration est désactivée ou si le jeton est invalide.
+    """
+    if not ADMIN_TOKEN or not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Accès administrateur refusé")
+
+
+@router.post("/profile")
+def start_profile(requests: int = Query(10, ge=1, le=10000), x_admin_token: str = Header(None)):
+    """
+    Active le profilage statistique des prochaines requêtes.
+
+    Args:
+        requests (int): Nombre de requêtes à profiler.
+        x_admin_token (str): Jeton d'administration.
+
+    Returns:
+        dict: Nombre de requêtes à profiler et dossier où le profil sera écrit.
+    """
+    check_admin(x_admin_token)
+    session = arm_profiler(requests)
+    return {"requests": requests, "directory": str(session.directory)}
+
+
+@router.get("/profile")
+def get_profile_status(x_admin_token: str = Header(None)):
+    """
+    État de la dernière session de profilage.
+
+    Args:
+        x_admin_token (str): Jeton d'administration.
+
+    Returns:
+        dict: Requêtes restant à profiler, requêtes en cours et fichier écrit.
+    """
+    check_admin(x_admin_token)
+    session = current_session()
+    if session is None:
+        return {"remaining": 0, "in_flight": 0, "output": None}
+    return {
+        "remaining": session.remaining,
+        "in_flight": session.in_flight,
+        "output": str(session.output) if session.output else None,
+    }
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Response
+
+from app.utils.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """
+    Expose les métriques du service au format Prometheus.
+
+    Returns:
+        Response: Métriques au format texte Prometheus.
+    """
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
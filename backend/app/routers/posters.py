@@ -0,0 +1,42 @@
+import hashlib
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from loguru import logger
+
+from app.service.poster_cache import PosterNotFound, PosterOriginError, get_poster_cache
+
+router = APIRouter(prefix="/posters")
+
+# Une vignette ne change jamais pour un même nom d'affiche : le navigateur peut la garder un an
+POSTER_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get("/{size}/{path:path}")
+def get_poster(size: str, path: str, if_none_match: str = Header(None)):
+    """
+    Vignette d'une affiche, redimensionnée depuis l'origine puis servie depuis le cache disque.
+
+    Args:
+        size (str): Largeur demandée, par exemple `w200` ou `w300`.
+        path (str): Nom du fichier d'affiche (`poster_path` d'un film).
+        if_none_match (str): ETag déjà connu du client.
+
+    Returns:
+        Response: Image JPEG, ou 304 si le client a déjà cette version.
+
+    Raises:
+        HTTPException: 404 si l'affiche est inconnue, 502 si l'origine est en erreur.
+    """
+    try:
+        data = get_poster_cache().get(size, path)
+    except PosterNotFound:
+        raise HTTPException(status_code=404, detail="Affiche introuvable")
+    except PosterOriginError as e:
+        logger.warning(f"Affiche {size}/{path} indisponible : {e}")
+        raise HTTPException(status_code=502, detail="Origine des affiches indisponible")
+
+    etag = f'"{hashlib.sha1(data).hexdigest()[:16]}"'
+    headers = {"Cache-Control": POSTER_CACHE_CONTROL, "ETag": etag}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type="image/jpeg", headers=headers)
@@ -1,50 +1,131 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from collections import Counter
-from ..service.recommendation_service import recommend_movies
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional
+import asyncio
+import hashlib
+from ..service.recommendation_service import FILMS_PATH, data_fingerprint, recommend_movies_json
+from ..service.content_index import get_content_index
+from ..utils.query_executor import (
+    QueryCancelled, QueryExecutor, QueryRejected, QueryTimeout, get_query_executor, watch_disconnect
+)
 from ..models.schemas import (
-    Film, FilmListResponse, RecommendRequest, Recommendation,
+    DataVersionResponse, Film, FilmListResponse, RecommendRequest, Recommendation,
     RecommendResponse, TopFilm, ListTopFilm, StatisticsResponse,
     GenreStatistics, DistributionGenresResponse, GenreDistribution,
-    FilmCountResponse
+    FilmCountResponse, GenreListResponse, SimilarFilm, SimilarFilmsResponse,
+    HistogramBin, YearCount, StatisticsOverviewResponse, StatisticsRangeResponse, YearStatistics
 )
-import duckdb
-import os
-from pathlib import Path
-import pandas as pd
 from app.utils.count_gender import count_gender
 
 router = APIRouter()
 
 
-def get_db_connection():
+class Queries:
+    """
+    Requêtes DuckDB d'une requête HTTP, exécutées sur le pool dédié (voir `app.utils.query_executor`)
+    et interrompues si le client se déconnecte.
     """
-    Génère une connexion DuckDB au fichier films_reco.db.
+
+    def __init__(self, executor: QueryExecutor, disconnected: asyncio.Event):
+        self.executor = executor
+        self.disconnected = disconnected
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None):
+        """
+        Exécute `fn(con, *args)` sur le pool de requêtes.
+
+        Args:
+            fn (Callable): Fonction recevant la connexion DuckDB.
+            timeout (float, optional): Délai en secondes (`QUERY_TIMEOUT` par défaut).
+
+        Raises:
+            HTTPException: 503 si le pool est saturé, 504 si le délai est dépassé,
+                499 si le client s'est déconnecté.
+        """
+        try:
+            return await self.executor.run(fn, *args, timeout=timeout, disconnected=self.disconnected)
+        except QueryRejected:
+            raise HTTPException(status_code=503, detail="Serveur surchargé, réessayez plus tard",
+                                headers={"Retry-After": "1"})
+        except QueryTimeout:
+            raise HTTPException(status_code=504, detail="La requête a dépassé son délai.")
+        except QueryCancelled:
+            raise HTTPException(status_code=499, detail="Client déconnecté.")
+
+    async def fetchone(self, query: str, parameters=None, timeout: Optional[float] = None):
+        return await self.run(lambda con: con.execute(query, parameters).fetchone(), timeout=timeout)
+
+    async def fetchall(self, query: str, parameters=None, timeout: Optional[float] = None):
+        return await self.run(lambda con: con.execute(query, parameters).fetchall(), timeout=timeout)
+
+
+@asynccontextmanager
+async def request_queries(request: Request):
+    """
+    Accès à la base pour une requête HTTP, avec surveillance de la déconnexion du client.
+
+    La surveillance lit les messages ASGI de la requête : elle n'est lancée que pour
+    les requêtes sans corps, dont la route n'a rien à lire. Les autres requêtes ne sont
+    pas interrompues quand leur client se déconnecte.
+
+    Args:
+        request (Request): Requête HTTP en cours.
 
     Returns:
-        DuckDBPyConnection: Connexion à la base de données.
+        Queries: Exécuteur des requêtes DuckDB de la requête.
     """
-    films_path = Path(__file__).resolve().parents[2] / "app" / "utils" / "data" / "films_reco.db"
-    con = duckdb.connect(films_path)
+    disconnected = asyncio.Event()
+    has_body = request.headers.get("content-length", "0") != "0" or "transfer-encoding" in request.headers
+    watcher = None if has_body else asyncio.create_task(watch_disconnect(request.receive, disconnected))
     try:
-        yield con
+        yield Queries(get_query_executor(FILMS_PATH), disconnected)
     finally:
-        con.close()
+        if watcher is not None:
+            watcher.cancel()
+
+
+async def get_queries(request: Request):
+    """
+    Dépendance des routes : accès à la base pendant l'exécution de la route (voir `request_queries`).
+
+    Returns:
+        Queries: Exécuteur des requêtes DuckDB de la requête.
+    """
+    async with request_queries(request) as queries:
+        yield queries
+
+
+@router.get("/data/version", response_model=DataVersionResponse)
+async def get_data_version(db: Queries = Depends(get_queries)):
+    """
+    Version des données servies, qui change dès qu'un film ou une note est ajouté.
+
+    Les clients s'en servent comme clé de cache : une réponse mise en cache reste
+    valable tant que la version ne change pas.
+
+    Returns:
+        DataVersionResponse: Empreinte courte des données.
+    """
+    fingerprint = await db.run(data_fingerprint)
+    return DataVersionResponse(version=hashlib.sha1(fingerprint.encode()).hexdigest()[:12])
 
 
 @router.get("/films/count", response_model=FilmCountResponse)
-def get_total_films(con: duckdb.DuckDBPyConnection = Depends(get_db_connection)):
+async def get_total_films(db: Queries = Depends(get_queries)):
     """
     Compte le nombre total de films dans la base de données.
 
     Returns:
         FilmCountResponse: Nombre total de films enregistrés.
     """
-    result = con.execute("SELECT COUNT(*) FROM films").fetchone()
+    result = await db.fetchone("SELECT COUNT(*) FROM films")
     return FilmCountResponse(total_films=result[0])
 
 
 @router.get("/films", response_model=FilmListResponse)
-def get_films(page: int = Query(1, ge=1, le=500), con: duckdb.DuckDBPyConnection = Depends(get_db_connection)):
+async def get_films(page: int = Query(1, ge=1, le=500), db: Queries = Depends(get_queries)):
     """
     Récupère une liste paginée de 20 films.
 
@@ -56,7 +137,7 @@ def get_films(page: int = Query(1, ge=1, le=500), con: duckdb.DuckDBPyConnection
     """
     films_per_page = 20
     offset = (page - 1) * films_per_page
-    result = con.execute(f"SELECT * FROM films LIMIT {films_per_page} OFFSET {offset}").fetchall()
+    result = await db.fetchall(f"SELECT * FROM films LIMIT {films_per_page} OFFSET {offset}")
 
     if not result:
         raise HTTPException(status_code=404, detail="Aucun film trouvé pour cette page.")
@@ -78,7 +159,7 @@ def get_films(page: int = Query(1, ge=1, le=500), con: duckdb.DuckDBPyConnection
 
 
 @router.get("/films/search", response_model=FilmListResponse)
-def search_films_by_title(query: str, con: duckdb.DuckDBPyConnection = Depends(get_db_connection)):
+async def search_films_by_title(query: str, db: Queries = Depends(get_queries)):
     """
     Recherche de films dont le titre contient le texte donné.
 
@@ -89,7 +170,7 @@ def search_films_by_title(query: str, con: duckdb.DuckDBPyConnection = Depends(g
         FilmListResponse: Liste des films correspondant à la recherche.
     """
     search_query = f"%{query}%"
-    result = con.execute("SELECT * FROM films WHERE title LIKE ? LIMIT 10", [search_query]).fetchall()
+    result = await db.fetchall("SELECT * FROM films WHERE title LIKE ? LIMIT 10", [search_query])
 
     films = [
         Film(
@@ -107,8 +188,50 @@ def search_films_by_title(query: str, con: duckdb.DuckDBPyConnection = Depends(g
     return FilmListResponse(films=films)
 
 
+# Films sérialisés par bloc de `EXPORT_BATCH_ROWS` lignes dans `/films/export`
+EXPORT_BATCH_ROWS = 1000
+# Sérialisation JSON faite par DuckDB, dans le format du modèle `Film` ; pagination par clé
+FILM_JSON_QUERY = """
+SELECT id, to_json(struct_pack(film_id := id, title, genres, description, release_date,
+                               vote_average, vote_count, poster_path))
+FROM films
+WHERE id > ?
+ORDER BY id
+LIMIT ?
+"""
+
+
+@router.get("/films/export", response_model=FilmListResponse)
+async def export_films(request: Request):
+    """
+    Exporte tout le catalogue en une réponse diffusée par blocs : les premiers films
+    partent avant que les suivants ne soient lus, et la mémoire reste bornée par la
+    taille d'un bloc.
+
+    Returns:
+        StreamingResponse: `{"films": [...]}`, dans le format de `/films`.
+    """
+    async def films_json():
+        # Accès à la base ouvert dans le flux et non par une dépendance : la route rend
+        # la réponse avant son premier bloc, les lectures continuent jusqu'au dernier
+        async with request_queries(request) as db:
+            yield b'{"films":['
+            last_id = -2 ** 63
+            separator = b""
+            while True:
+                rows = await db.fetchall(FILM_JSON_QUERY, [last_id, EXPORT_BATCH_ROWS])
+                if not rows:
+                    break
+                yield separator + ",".join(row[1] for row in rows).encode()
+                separator = b","
+                last_id = rows[-1][0]
+            yield b"]}"
+
+    return StreamingResponse(films_json(), media_type="application/json")
+
+
 @router.get("/films/{id}", response_model=Film)
-def get_film_by_id(id: int, con: duckdb.DuckDBPyConnection = Depends(get_db_connection)):
+async def get_film_by_id(id: int, db: Queries = Depends(get_queries)):
     """
     Récupère les détails d’un film par son identifiant.
 
@@ -119,7 +242,7 @@ def get_film_by_id(id: int, con: duckdb.DuckDBPyConnection = Depends(get_db_conn
         Film: Détail du film.
     """
     query = "SELECT * FROM films WHERE id = ?"
-    row = con.execute(query, [id]).fetchone()
+    row = await db.fetchone(query, [id])
     if not row:
         raise HTTPException(status_code=404, detail="Film introuvable.")
     return Film(
@@ -134,23 +257,186 @@ def get_film_by_id(id: int, con: duckdb.DuckDBPyConnection = Depends(get_db_conn
     )
 
 
+@router.get("/films/{id}/similar", response_model=SimilarFilmsResponse)
+async def get_similar_films(id: int, k: int = Query(10, ge=1, le=100), db: Queries = Depends(get_queries)):
+    """
+    Récupère les films les plus proches d'un film selon leurs genres et leur description.
+
+    Args:
+        id (int): Identifiant du film de référence.
+        k (int): Nombre de films similaires (entre 1 et 100).
+
+    Returns:
+        SimilarFilmsResponse: Films similaires, du plus proche au moins proche.
+    """
+    def find_similar(con):
+        # Le chargement de l'index et la recherche s'exécutent aussi sur le pool de requêtes
+        content_index = get_content_index(FILMS_PATH)
+        similar = content_index.similar(id, k) if content_index is not None else None
+        if similar is None:
+            return None
+        film_ids, similarities = similar
+        rows = con.execute(
+            "SELECT id, title, poster_path FROM films WHERE id IN (SELECT UNNEST(?))", [film_ids.tolist()]
+        ).fetchall()
+        return film_ids, similarities, rows
+
+    similar = await db.run(find_similar)
+    if similar is None:
+        raise HTTPException(status_code=404, detail="Film introuvable.")
+
+    film_ids, similarities, rows = similar
+    metadata = {row[0]: row for row in rows}
+    return SimilarFilmsResponse(
+        film_id=id,
+        similar_films=[
+            SimilarFilm(
+                film_id=film_id,
+                title=metadata[film_id][1],
+                similarity=similarity,
+                poster_path=metadata[film_id][2]
+            )
+            for film_id, similarity in zip(film_ids.tolist(), similarities.tolist())
+            if film_id in metadata
+        ]
+    )
+
+
 @router.post("/recommendation_movies/{user_id}", response_model=RecommendResponse)
-def get_recommendations(user_id: int, num_recommendations: int = 5):
+def get_recommendations(user_id: int, num_recommendations: int = Query(5, ge=1), genres: Optional[List[str]] = Query(None),
+                        year_from: Optional[int] = None, year_to: Optional[int] = None):
     """
-    Renvoie une liste de films recommandés pour un utilisateur.
+    Renvoie une liste de films recommandés pour un utilisateur, éventuellement filtrée
+    par genre et par année de sortie.
 
     Args:
         user_id (int): Identifiant de l'utilisateur.
         num_recommendations (int): Nombre de recommandations souhaitées.
+        genres (list[str], optional): Genres acceptés (`?genres=Action&genres=Drame`), un film doit en avoir au moins un.
+        year_from (int, optional): Première année de sortie acceptée.
+        year_to (int, optional): Dernière année de sortie acceptée.
 
     Returns:
         RecommendResponse: Liste de films recommandés.
     """
-    return recommend_movies(user_id, num_recommendations)
+    if year_from is not None and year_to is not None and year_from > year_to:
+        raise HTTPException(status_code=400, detail="year_from doit être inférieur ou égal à year_to.")
+    # Réponse déjà sérialisée par le service, éventuellement depuis son cache
+    content = recommend_movies_json(user_id, num_recommendations, genres, year_from, year_to)
+    return Response(content=content, media_type="application/json")
+
+
+# Bornes de l'échelle des notes moyennes TMDB, découpée en classes pour l'histogramme
+RATING_SCALE = (0.0, 10.0)
+
+
+@router.get("/statistics/overview", response_model=StatisticsOverviewResponse)
+async def get_statistics_overview(bins: int = Query(20, ge=1, le=100), top_n: int = Query(10, ge=1, le=100),
+                                  db: Queries = Depends(get_queries)):
+    """
+    Statistiques globales du catalogue pour le tableau de bord, calculées par DuckDB
+    en une seule lecture de la table `films` : histogramme des notes moyennes, nombre
+    de films par année de sortie et films les mieux notés.
+
+    Args:
+        bins (int): Nombre de classes de l'histogramme des notes (entre 1 et 100).
+        top_n (int): Nombre de films les mieux notés (entre 1 et 100).
+
+    Returns:
+        StatisticsOverviewResponse: Agrégats prêts à afficher.
+    """
+    low, high = RATING_SCALE
+    width = (high - low) / bins
+    total, rating_bins, years, top = await db.fetchone("""
+    SELECT
+        COUNT(*),
+        histogram(least(greatest(floor((vote_average - ?) / ?), 0), ? - 1)::INTEGER),
+        histogram(year(release_date)),
+        max_by(struct_pack(title, vote_average, release_date), vote_average, ?)
+            FILTER (WHERE release_date IS NOT NULL)
+    FROM films
+    """, [low, width, bins, top_n])
+
+    rating_bins = rating_bins or {}
+    top = sorted(top or [], key=lambda film: film["vote_average"], reverse=True)
+    return StatisticsOverviewResponse(
+        total_films=total,
+        rating_histogram=[
+            HistogramBin(start=low + i * width, end=low + (i + 1) * width, count=rating_bins.get(i, 0))
+            for i in range(bins)
+        ],
+        films_per_year=[YearCount(year=year, count=count) for year, count in sorted((years or {}).items())],
+        top_films=[TopFilm(**film) for film in top],
+    )
+
+
+# Nombre maximal d'années couvertes par `/statistics/range`
+MAX_YEAR_RANGE = 200
+
+
+@router.get("/statistics/range", response_model=StatisticsRangeResponse)
+async def get_statistics_range(year_from: int, year_to: int, genres: Optional[List[str]] = Query(None),
+                               top_n: int = Query(10, ge=1, le=100),
+                               db: Queries = Depends(get_queries)):
+    """
+    Statistiques année par année sur une période, en une seule requête groupée :
+    nombre de films, nombre de films par genre et meilleurs films de chaque année.
+
+    Args:
+        year_from (int): Première année de la période.
+        year_to (int): Dernière année de la période (incluse).
+        genres (list[str], optional): Genres retenus (`?genres=Action&genres=Drama`, sans
+            distinction de casse). Sans genre, tous les films et tous les genres sont comptés.
+        top_n (int): Nombre de meilleurs films par année (entre 1 et 100).
+
+    Returns:
+        StatisticsRangeResponse: Statistiques des années qui ont au moins un film retenu.
+    """
+    if year_from > year_to:
+        raise HTTPException(status_code=400, detail="year_from doit être inférieur ou égal à year_to.")
+    if year_to - year_from >= MAX_YEAR_RANGE:
+        raise HTTPException(status_code=400, detail=f"La période est limitée à {MAX_YEAR_RANGE} ans.")
+    wanted = sorted({genre.strip().lower() for genre in genres or [] if genre.strip()})
+
+    # Chaque film est lu une fois : ses genres (liste) sont filtrés puis comptés par année
+    # avec la liste des films de l'année, et max_by garde les meilleurs films du groupe.
+    rows = await db.fetchall("""
+    WITH films_in_range AS (
+        SELECT title, vote_average, release_date, year(release_date) AS year,
+               list_filter(list_transform(string_split(genres, ','), g -> trim(g)),
+                           g -> g <> '' AND (len($genres) = 0 OR list_contains($genres, lower(g)))) AS counted
+        FROM films
+        WHERE release_date >= make_date($year_from, 1, 1) AND release_date < make_date($year_to + 1, 1, 1)
+    )
+    SELECT year, COUNT(*),
+           list_aggregate(flatten(list(counted)), 'histogram'),
+           max_by(struct_pack(title, vote_average, release_date), vote_average, $top_n)
+    FROM films_in_range
+    WHERE len($genres) = 0 OR len(counted) > 0
+    GROUP BY year
+    ORDER BY year
+    """, {"genres": wanted, "year_from": year_from, "year_to": year_to, "top_n": top_n})
+
+    return StatisticsRangeResponse(
+        year_from=year_from,
+        year_to=year_to,
+        genres=wanted,
+        years=[
+            YearStatistics(
+                year=year,
+                total_films=total,
+                genres=[GenreDistribution(genre=genre, count=count)
+                        for genre, count in sorted((genre_counts or {}).items(), key=lambda x: x[1], reverse=True)],
+                top_films=[TopFilm(**film) for film in sorted(top or [], key=lambda film: film["vote_average"],
+                                                              reverse=True)],
+            )
+            for year, total, genre_counts, top in rows
+        ],
+    )
 
 
 @router.get("/statistics/{year}", response_model=ListTopFilm)
-def get_top10_film(year: int, con: duckdb.DuckDBPyConnection = Depends(get_db_connection)):
+async def get_top10_film(year: int, db: Queries = Depends(get_queries)):
     """
     Récupère les 10 meilleurs films (par vote moyen) pour une année donnée.
 
@@ -167,7 +453,7 @@ def get_top10_film(year: int, con: duckdb.DuckDBPyConnection = Depends(get_db_co
     ORDER BY vote_average DESC
     LIMIT 10
     """
-    top_films = con.execute(top_films_query, [str(year)]).fetchall()
+    top_films = await db.fetchall(top_films_query, [str(year)])
     if not top_films:
         raise HTTPException(status_code=404, detail="No films found for the given year.")
 
@@ -176,8 +462,25 @@ def get_top10_film(year: int, con: duckdb.DuckDBPyConnection = Depends(get_db_co
     ])
 
 
+@router.get("/genres", response_model=GenreListResponse)
+async def list_genres(db: Queries = Depends(get_queries)):
+    """
+    Liste les genres présents dans la base, pour les filtres des recommandations.
+
+    Returns:
+        GenreListResponse: Genres triés par ordre alphabétique.
+    """
+    rows = await db.fetchall("""
+        SELECT DISTINCT trim(genre) AS genre
+        FROM (SELECT unnest(string_split(genres, ',')) AS genre FROM films)
+        WHERE trim(genre) <> ''
+        ORDER BY genre
+    """)
+    return GenreListResponse(genres=[row[0] for row in rows])
+
+
 @router.get("/statistics/distribution_genres/{year}", response_model=DistributionGenresResponse)
-def distribution_genres(year: int, con: duckdb.DuckDBPyConnection = Depends(get_db_connection)):
+async def distribution_genres(year: int, db: Queries = Depends(get_queries)):
     """
     Donne la distribution des genres pour une année donnée.
 
@@ -192,7 +495,7 @@ def distribution_genres(year: int, con: duckdb.DuckDBPyConnection = Depends(get_
     FROM films
     WHERE STRFTIME('%Y', release_date) = ?
     """
-    rows = con.execute(genre_query, [str(year)]).fetchall()
+    rows = await db.fetchall(genre_query, [str(year)])
     genre_strings = [row[0] for row in rows if row[0]]
     if not genre_strings:
         raise HTTPException(status_code=404, detail="No genre data found for the given year.")
@@ -207,7 +510,7 @@ def distribution_genres(year: int, con: duckdb.DuckDBPyConnection = Depends(get_
 
 
 @router.get("/statistics/{gender}/{year}", response_model=StatisticsResponse)
-def get_statistics(gender: str, year: int, con: duckdb.DuckDBPyConnection = Depends(get_db_connection)):
+async def get_statistics(gender: str, year: int, db: Queries = Depends(get_queries)):
     """
     Récupère les 10 meilleurs films pour un genre et une année donnés,
     ainsi que le nombre total de films de ce genre cette année-là.
@@ -226,7 +529,7 @@ def get_statistics(gender: str, year: int, con: duckdb.DuckDBPyConnection = Depe
     ORDER BY vote_average DESC
     LIMIT 10
     """
-    top_films = con.execute(top_films_query, [str(year), f'%{gender}%']).fetchall()
+    top_films = await db.fetchall(top_films_query, [str(year), f'%{gender}%'])
     if not top_films:
         raise HTTPException(status_code=404, detail="No films found for the given year.")
 
@@ -235,7 +538,7 @@ def get_statistics(gender: str, year: int, con: duckdb.DuckDBPyConnection = Depe
     FROM films
     WHERE STRFTIME('%Y', release_date) = ? AND genres LIKE ?
     """
-    genre_stats = con.execute(genre_stats_query, [str(year), f'%{gender}%']).fetchall()
+    genre_stats = await db.fetchall(genre_stats_query, [str(year), f'%{gender}%'])
     genre_strings = [row[0] for row in genre_stats if row[0]]
     genre_counter = count_gender(genre_strings)
 
@@ -0,0 +1,352 @@
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+from ..utils.metrics import MODEL_MEMORY, record_cache
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "app" / "utils" / "data"
+CONTENT_INDEX_PATH = DATA_DIR / "content_index"
+GENRES_PATH = DATA_DIR / "movies_genre.json"
+
+# Dimension du hachage des descriptions et réduction optionnelle (0 = pas de réduction)
+CONTENT_N_FEATURES = int(os.getenv("CONTENT_N_FEATURES", str(2 ** 16)))
+CONTENT_N_COMPONENTS = int(os.getenv("CONTENT_N_COMPONENTS", "0"))
+CONTENT_GENRE_WEIGHT = float(os.getenv("CONTENT_GENRE_WEIGHT", "0.5"))
+CONTENT_CHECK_INTERVAL = float(os.getenv("CONTENT_CHECK_INTERVAL", "30"))
+
+
+class ContentIndex:
+    """
+    Représentation vectorielle des films à partir de leurs genres et de leur description.
+
+    Chaque film est décrit par un TF-IDF creux de sa description (termes hachés,
+    ce qui permet d'ajouter des films sans réapprendre de vocabulaire) concaténé à
+    un encodage one-hot de ses genres. Les fréquences documentaires sont tenues à
+    jour à chaque ajout ; une réduction de dimension (SVD tronquée) optionnelle
+    projette les vecteurs dans un espace dense, les nouveaux films étant projetés
+    avec les composantes déjà apprises.
+    """
+
+    def __init__(self, n_features: int = CONTENT_N_FEATURES, genre_weight: float = CONTENT_GENRE_WEIGHT,
+                 genres: Optional[list] = None):
+        from scipy.sparse import csr_matrix
+
+        self.n_features = n_features
+        self.genre_weight = genre_weight
+        self.genres = list(genres) if genres is not None else _known_genres()
+        self.film_ids = np.empty(0, dtype=np.int64)
+        self.term_counts = csr_matrix((0, n_features), dtype=np.float32)
+        self.genre_matrix = csr_matrix((0, len(self.genres)), dtype=np.float32)
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)
+        self.components = None
+        self._positions = {}
+        self._vectors = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.film_ids)
+
+    @property
+    def nbytes(self):
+        sizes = [self.film_ids.nbytes, self.doc_freq.nbytes, self.term_counts.data.nbytes,
+                 self.term_counts.indices.nbytes, self.genre_matrix.data.nbytes]
+        if self.components is not None:
+            sizes.append(self.components.nbytes)
+        return sum(sizes)
+
+    def position(self, film_id: int) -> Optional[int]:
+        return self._positions.get(int(film_id))
+
+    def positions(self, film_ids) -> np.ndarray:
+        """Positions des films dans l'index (-1 pour les films absents)."""
+        return np.array([self._positions.get(int(film_id), -1) for film_id in film_ids], dtype=np.int64)
+
+    def add_films(self, film_ids, genres, descriptions) -> int:
+        """
+        Ajoute des films à l'index ; les films déjà indexés sont ignorés.
+
+        :param film_ids: identifiants des films
+        :param genres: genres de chaque film, séparés par des virgules
+        :param descriptions: descriptions des films
+        :return: nombre de films ajoutés
+        """
+        from scipy.sparse import csr_matrix, vstack
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        rows = [
+            (int(film_id), genre_str or "", description or "")
+            for film_id, genre_str, description in zip(film_ids, genres, descriptions)
+            if int(film_id) not in self._positions
+        ]
+        # Un même film peut apparaître plusieurs fois dans un lot
+        rows = list({film_id: (film_id, g, d) for film_id, g, d in rows}.values())
+        if not rows:
+            return 0
+
+        vectorizer = HashingVectorizer(n_features=self.n_features, alternate_sign=False, norm=None,
+                                       stop_words="english", dtype=np.float32)
+        counts = vectorizer.transform([description for _, _, description in rows])
+
+        genre_rows, genre_cols = [], []
+        for row, (_, genre_str, _) in enumerate(rows):
+            for genre in {g.strip() for g in genre_str.split(",") if g.strip()}:
+                if genre not in self.genres:
+                    self.genres.append(genre)
+                genre_rows.append(row)
+                genre_cols.append(self.genres.index(genre))
+        genre_matrix = csr_matrix(
+            (np.ones(len(genre_rows), dtype=np.float32), (genre_rows, genre_cols)),
+            shape=(len(rows), len(self.genres)),
+        )
+
+        with self._lock:
+            self.genre_matrix.resize((self.genre_matrix.shape[0], len(self.genres)))
+            self.term_counts = vstack([self.term_counts, counts], format="csr")
+            self.genre_matrix = vstack([self.genre_matrix, genre_matrix], format="csr")
+            self.doc_freq += np.bincount(counts.indices, minlength=self.n_features)
+            start = len(self.film_ids)
+            self.film_ids = np.concatenate([self.film_ids, [film_id for film_id, _, _ in rows]]).astype(np.int64)
+            self._positions.update({film_id: start + i for i, (film_id, _, _) in enumerate(rows)})
+            self._vectors = None
+        return len(rows)
+
+    def _sparse_vectors(self):
+        """Vecteurs creux normalisés : TF-IDF des descriptions et genres, pondérés par `genre_weight`."""
+        from scipy.sparse import diags, hstack
+        from sklearn.preprocessing import normalize
+
+        idf = np.log((1 + len(self)) / (1 + self.doc_freq)) + 1
+        tfidf = normalize(self.term_counts @ diags(idf.astype(np.float32)))
+        genres = normalize(self.genre_matrix)
+        combined = hstack([tfidf * (1 - self.genre_weight), genres * self.genre_weight], format="csr")
+        return normalize(combined).astype(np.float32)
+
+    def fit_reduction(self, n_components: int, random_state: int = 42):
+        """
+        Apprend une projection dense de dimension `n_components` sur les films indexés.
+
+        :param n_components: dimension de l'espace réduit
+        """
+        from sklearn.decomposition import TruncatedSVD
+
+        vectors = self._sparse_vectors()
+        svd = TruncatedSVD(n_components=min(n_components, vectors.shape[1] - 1, max(len(self) - 1, 1)),
+                           random_state=random_state)
+        svd.fit(vectors)
+        with self._lock:
+            self.components = svd.components_.astype(np.float32)
+            self._vectors = None
+
+    def vectors(self):
+        """Vecteurs normalisés de tous les films indexés (creux, ou denses si une réduction est apprise)."""
+        vectors = self._vectors
+        if vectors is None:
+            from sklearn.preprocessing import normalize
+
+            vectors = self._sparse_vectors()
+            if self.components is not None:
+                # Les genres apparus après l'apprentissage de la projection sont ignorés
+                width = self.components.shape[1]
+                vectors = normalize(vectors[:, :width] @ self.components.T).astype(np.float32)
+            self._vectors = vectors
+        return vectors
+
+    def similar(self, film_id: int, k: int = 10):
+        """
+        Films les plus proches d'un film donné (similarité cosinus).
+
+        :param film_id: identifiant du film de référence
+        :param k: nombre de films à retourner
+        :return: (identifiants des films, similarités), ou None si le film n'est pas indexé
+        """
+        position = self.position(film_id)
+        if position is None:
+            return None
+        vectors = self.vectors()
+        similarities = _dense_1d(vectors @ vectors[position].T)
+        similarities[position] = -np.inf
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        best = np.argpartition(similarities, -k)[-k:]
+        best = best[np.argsort(-similarities[best], kind="stable")]
+        return self.film_ids[best], similarities[best]
+
+    def profile_scores(self, positions: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        Similarité cosinus entre un profil (somme pondérée de films) et tous les films indexés.
+
+        :param positions: positions dans l'index des films du profil
+        :param weights: poids de chaque film (par exemple note centrée de l'utilisateur)
+        :return: similarités dans [-1, 1], une par film indexé
+        """
+        keep = positions >= 0
+        positions, weights = positions[keep], weights[keep]
+        if len(positions) == 0:
+            return np.zeros(len(self), dtype=np.float32)
+        vectors = self.vectors()
+        profile = _dense_1d(vectors[positions].T @ weights.astype(np.float32))
+        norm = np.linalg.norm(profile)
+        if norm == 0:
+            return np.zeros(len(self), dtype=np.float32)
+        return _dense_1d(vectors @ (profile / norm)).astype(np.float32)
+
+    def save(self, path: Optional[Path] = None):
+        """Écrit l'index dans un dossier temporaire puis le renomme pour ne jamais exposer un index partiel."""
+        from scipy.sparse import save_npz
+
+        path = path or CONTENT_INDEX_PATH
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        np.save(tmp_path / "film_ids.npy", self.film_ids)
+        np.save(tmp_path / "doc_freq.npy", self.doc_freq)
+        save_npz(tmp_path / "term_counts.npz", self.term_counts)
+        save_npz(tmp_path / "genre_matrix.npz", self.genre_matrix)
+        if self.components is not None:
+            np.save(tmp_path / "components.npy", self.components)
+        with open(tmp_path / "index.json", "w", encoding="utf-8") as f:
+            json.dump({"n_features": self.n_features, "genre_weight": self.genre_weight, "genres": self.genres}, f)
+        shutil.rmtree(path, ignore_errors=True)
+        tmp_path.rename(path)
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "ContentIndex":
+        from scipy.sparse import load_npz
+
+        path = path or CONTENT_INDEX_PATH
+        with open(path / "index.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(**meta)
+        index.film_ids = np.load(path / "film_ids.npy")
+        index.doc_freq = np.load(path / "doc_freq.npy")
+        index.term_counts = load_npz(path / "term_counts.npz").tocsr()
+        index.genre_matrix = load_npz(path / "genre_matrix.npz").tocsr()
+        if (path / "components.npy").exists():
+            index.components = np.load(path / "components.npy")
+        index._positions = {int(film_id): i for i, film_id in enumerate(index.film_ids)}
+        return index
+
+
+def _dense_1d(values) -> np.ndarray:
+    """Tableau NumPy 1D à partir d'un résultat creux ou dense."""
+    if hasattr(values, "toarray"):
+        values = values.toarray()
+    return np.asarray(values).ravel()
+
+
+def _known_genres() -> list:
+    """Genres TMDB connus, dans l'ordre du fichier movies_genre.json."""
+    try:
+        with open(GENRES_PATH, encoding="utf-8") as f:
+            return [genre["name"] for genre in json.load(f)]
+    except (OSError, ValueError):
+        return []
+
+
+def sync_content_index(index: ContentIndex, conn) -> int:
+    """
+    Ajoute à l'index les films présents dans la base mais pas encore indexés.
+
+    :param index: index à compléter
+    :param conn: connexion DuckDB
+    :return: nombre de films ajoutés
+    """
+    film_ids = conn.execute("SELECT id FROM films").fetchnumpy()["id"]
+    missing = np.setdiff1d(film_ids, index.film_ids)
+    if len(missing) == 0:
+        return 0
+    rows = conn.execute(
+        "SELECT id, genres, description FROM films WHERE id IN (SELECT UNNEST(?)) ORDER BY id",
+        [missing.tolist()],
+    ).fetchall()
+    film_ids, genres, descriptions = zip(*rows)
+    added = index.add_films(film_ids, genres, descriptions)
+    logger.info(f"{added} films ajoutés à l'index de contenu.")
+    return added
+
+
+def build_content_index(conn, path: Optional[Path] = None, n_components: int = CONTENT_N_COMPONENTS,
+                        rebuild: bool = False) -> ContentIndex:
+    """
+    Met à jour (ou reconstruit) l'index de contenu sauvegardé à partir de la table `films`.
+
+    :param conn: connexion DuckDB
+    :param path: dossier de l'index (par défaut CONTENT_INDEX_PATH)
+    :param n_components: dimension de la réduction à apprendre lors d'une reconstruction (0 = aucune)
+    :param rebuild: repartir d'un index vide
+    :return: index à jour
+    """
+    path = path or CONTENT_INDEX_PATH
+    index = ContentIndex() if rebuild or not (path / "index.json").exists() else ContentIndex.load(path)
+    added = sync_content_index(index, conn)
+    if n_components and (rebuild or index.components is None):
+        index.fit_reduction(n_components)
+    if added or rebuild:
+        index.save(path)
+    return index
+
+
+_content_index: Optional[ContentIndex] = None
+_content_checked_at = 0.0
+_content_lock = threading.Lock()
+
+
+def get_content_index(db_path: Path) -> Optional[ContentIndex]:
+    """
+    Index de contenu servi par l'API, complété en mémoire avec les films ajoutés depuis sa sauvegarde.
+
+    :param db_path: chemin de la base DuckDB
+    :return: index, ou None s'il n'a pas pu être construit
+    """
+    global _content_index, _content_checked_at
+    if _content_index is not None and time.monotonic() - _content_checked_at < CONTENT_CHECK_INTERVAL:
+        record_cache("content_index", True)
+        return _content_index
+    with _content_lock:
+        if _content_index is not None and time.monotonic() - _content_checked_at < CONTENT_CHECK_INTERVAL:
+            record_cache("content_index", True)
+            return _content_index
+        record_cache("content_index", _content_index is not None)
+        try:
+            from ..utils.db import connect_read_only
+
+            index = _content_index
+            if index is None:
+                index = ContentIndex.load() if (CONTENT_INDEX_PATH / "index.json").exists() else ContentIndex()
+            with connect_read_only(db_path) as conn:
+                sync_content_index(index, conn)
+            _content_index = index
+            MODEL_MEMORY.labels("content_index").set(index.nbytes)
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement de l'index de contenu : {e}")
+        _content_checked_at = time.monotonic()
+        return _content_index
+
+
+def main():
+    import argparse
+    from ..utils.db import connect_read_only
+    from .recommendation_service import FILMS_PATH
+
+    parser = argparse.ArgumentParser(description="Construction de l'index de contenu des films.")
+    parser.add_argument("--rebuild", action="store_true", help="Reconstruire l'index depuis zéro")
+    parser.add_argument("--n-components", type=int, default=CONTENT_N_COMPONENTS,
+                        help="Dimension de la réduction (0 = vecteurs creux)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with connect_read_only(FILMS_PATH) as conn:
+        index = build_content_index(conn, n_components=args.n_components, rebuild=args.rebuild)
+    logger.info(f"Index de contenu : {len(index)} films en {time.perf_counter() - start:.2f} s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Vignettes d'affiches servies par l'API, avec un cache disque LRU de taille bornée.
+
+L'affiche d'origine (TMDB par défaut, ou tout autre serveur via `POSTER_ORIGIN`) n'est
+téléchargée qu'une fois : elle est conservée dans le cache, puis chaque taille demandée
+(`w200`, `w300`...) en est dérivée avec Pillow et conservée à son tour. Les fichiers sont
+écrits de façon atomique, si bien que plusieurs workers peuvent partager le même dossier.
+L'ordre LRU est porté par la date de modification des fichiers, rafraîchie à chaque
+lecture ; quand le cache dépasse `POSTER_CACHE_MAX_MB`, les fichiers les moins récemment
+servis sont supprimés jusqu'à revenir sous 90 % de la limite.
+
+`POSTER_ORIGIN` accepte une URL `http(s)://` ou un dossier local `file:///...`, ce qui
+permet de remplacer TMDB par un serveur ou des fichiers de test.
+"""
+import io
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+from loguru import logger
+
+from ..utils.metrics import record_cache
+from ..utils.timing import stage
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "app" / "utils" / "data"
+
+POSTER_ORIGIN = os.getenv("POSTER_ORIGIN", "https://image.tmdb.org/t/p/original")
+POSTER_CACHE_DIR = Path(os.getenv("POSTER_CACHE_DIR", str(DATA_DIR / "posters")))
+POSTER_CACHE_MAX_MB = float(os.getenv("POSTER_CACHE_MAX_MB", "256"))
+POSTER_FETCH_TIMEOUT = float(os.getenv("POSTER_FETCH_TIMEOUT", "10"))
+POSTER_QUALITY = int(os.getenv("POSTER_QUALITY", "85"))
+# Largeurs servies, en pixels : la taille `w300` correspond à une vignette de 300 pixels de large
+POSTER_WIDTHS = [int(width) for width in os.getenv("POSTER_WIDTHS", "92,154,185,200,300,342,500").split(",")]
+POSTER_SIZES = {f"w{width}": width for width in POSTER_WIDTHS}
+
+# Nom de fichier d'affiche TMDB (`/abc123.jpg`) : pas de dossier, donc pas de sortie du cache
+_POSTER_NAME = re.compile(r"^[A-Za-z0-9_-]{1,128}\.(jpg|jpeg|png|webp)$")
+ORIGIN_DIR = "origin"
+_LOCK_STRIPES = 64
+
+
+class PosterNotFound(Exception):
+    """Affiche inconnue : taille non servie, nom invalide ou absente de l'origine."""
+
+
+class PosterOriginError(Exception):
+    """L'origine des affiches n'a pas répondu correctement."""
+
+
+class PosterCache:
+    """
+    Cache disque des affiches d'origine et de leurs vignettes, borné en taille.
+    """
+
+    def __init__(self, directory: Path = POSTER_CACHE_DIR, max_bytes: int = int(POSTER_CACHE_MAX_MB * 1e6),
+                 origin: str = POSTER_ORIGIN):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.origin = origin.rstrip("/")
+        self._size = None
+        self._lock = threading.Lock()
+        # Verrous par fichier (répartis sur un nombre fixe de verrous) : des requêtes simultanées
+        # sur la même affiche ne la téléchargent et ne la redimensionnent qu'une fois. Vignettes et
+        # originaux ont leurs propres verrous, toujours pris dans cet ordre.
+        self._thumbnail_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        self._origin_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+    def get(self, size: str, name: str) -> bytes:
+        """
+        Vignette `size` de l'affiche `name`, créée si besoin.
+
+        :param size: taille demandée (clé de `POSTER_SIZES`)
+        :param name: nom du fichier d'affiche, avec ou sans `/` initial
+        :return: contenu JPEG de la vignette
+        :raises PosterNotFound: taille ou nom invalide, ou affiche absente de l'origine
+        :raises PosterOriginError: origine injoignable ou réponse invalide
+        """
+        name = name.lstrip("/")
+        if size not in POSTER_SIZES or not _POSTER_NAME.match(name):
+            raise PosterNotFound(f"{size}/{name}")
+        path = self.directory / size / f"{Path(name).stem}.jpg"
+        data = self._read(path)
+        record_cache("posters", data is not None)
+        if data is not None:
+            return data
+        with self._thumbnail_locks[hash(path) % _LOCK_STRIPES]:
+            data = self._read(path)
+            if data is None:
+                original = self._original(name)
+                with stage("poster_resize"):
+                    data = resize(original, POSTER_SIZES[size])
+                self._write(path, data)
+        return data
+
+    def _original(self, name: str) -> bytes:
+        path = self.directory / ORIGIN_DIR / name
+        with self._origin_locks[hash(path) % _LOCK_STRIPES]:
+            data = self._read(path)
+            if data is not None:
+                return data
+            with stage("poster_fetch"):
+                data = fetch_origin(self.origin, name)
+            self._write(path, data)
+            return data
+
+    @staticmethod
+    def _read(path: Path) -> Optional[bytes]:
+        """Contenu de `path`, marqué comme récemment servi ; None s'il n'est pas (ou plus) en cache."""
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def _write(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._size is None:
+                self._size = self.disk_usage()
+            else:
+                self._size += len(data)
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def disk_usage(self) -> int:
+        return sum(path.stat().st_size for path in self._files())
+
+    def _files(self):
+        return (path for path in self.directory.glob("*/*") if path.is_file() and not path.name.startswith("."))
+
+    def evict(self, target: Optional[int] = None) -> int:
+        """
+        Supprime les fichiers les moins récemment servis jusqu'à passer sous `target` octets
+        (90 % de la limite par défaut).
+
+        :return: nombre de fichiers supprimés
+        """
+        target = int(self.max_bytes * 0.9) if target is None else target
+        files = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        with self._lock:
+            self._size = total
+        if removed:
+            logger.info(f"Cache d'affiches : {removed} fichiers supprimés, {total / 1e6:.1f} Mo conservés")
+        return removed
+
+
+def fetch_origin(origin: str, name: str) -> bytes:
+    """
+    Télécharge l'affiche `name` depuis l'origine (`http(s)://...` ou dossier `file:///...`).
+
+    :raises PosterNotFound: affiche absente de l'origine
+    :raises PosterOriginError: origine injoignable ou en erreur
+    """
+    if origin.startswith("file://"):
+        try:
+            return (Path(unquote(urlparse(origin).path)) / name).read_bytes()
+        except FileNotFoundError:
+            raise PosterNotFound(name)
+    # Importé ici : requests alourdit le démarrage et ne sert qu'en cas d'absence du cache
+    import requests
+
+    start = time.perf_counter()
+    try:
+        response = requests.get(f"{origin}/{name}", timeout=POSTER_FETCH_TIMEOUT)
+    except requests.RequestException as e:
+        raise PosterOriginError(f"{name} : {e}")
+    if response.status_code == 404:
+        raise PosterNotFound(name)
+    if response.status_code != 200:
+        raise PosterOriginError(f"{name} : statut {response.status_code}")
+    logger.info(f"Affiche {name} téléchargée en {time.perf_counter() - start:.2f}s ({len(response.content)} octets)")
+    return response.content
+
+
+def resize(data: bytes, width: int) -> bytes:
+    """
+    Vignette JPEG de `width` pixels de large (jamais agrandie) de l'image `data`.
+
+    :raises PosterOriginError: l'origine n'a pas renvoyé une image lisible
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (UnidentifiedImageError, OSError) as e:
+        raise PosterOriginError(f"image illisible : {e}")
+    if image.width > width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+    output = io.BytesIO()
+    image.convert("RGB").save(output, "JPEG", quality=POSTER_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_poster_cache() -> PosterCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PosterCache()
+        return _cache
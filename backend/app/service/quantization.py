@@ -0,0 +1,59 @@
+"""
+Quantification des facteurs latents : stockage en float16, ou en int8 avec une
+échelle par vecteur (ligne), et produit scalaire approché par blocs.
+
+En int8, chaque ligne `v` est stockée sous la forme `round(v / s)` avec
+`s = max(|v|) / 127`, ce qui divise par 4 la mémoire des facteurs float32.
+"""
+from typing import Tuple
+
+import numpy as np
+
+QUANTIZED_DTYPES = ("float16", "int8")
+# Nombre de lignes de facteurs déquantifiées à la fois lors du calcul des scores
+DEQUANTIZE_BLOCK = 8192
+
+
+def quantize_rows(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantifie une matrice ligne par ligne.
+
+    :param matrix: facteurs float32, un vecteur par ligne
+    :param dtype: "float16" ou "int8"
+    :return: codes (même forme que `matrix`) et échelles (une par ligne, 1 en float16)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if dtype == "float16":
+        return matrix.astype(np.float16), np.ones(len(matrix), dtype=np.float32)
+    if dtype != "int8":
+        raise ValueError(f"Type de quantification inconnu : {dtype} (disponibles : {', '.join(QUANTIZED_DTYPES)})")
+    scales = np.abs(matrix).max(axis=1) / 127
+    scales[scales == 0] = 1
+    codes = np.rint(matrix / scales[:, None]).clip(-127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_rows(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Reconstruit des facteurs float32 à partir des codes et de leurs échelles."""
+    return codes.astype(np.float32) * scales[:, None]
+
+
+def quantized_dot(vectors: np.ndarray, codes: np.ndarray, scales: np.ndarray,
+                  block: int = DEQUANTIZE_BLOCK) -> np.ndarray:
+    """
+    Produits scalaires entre des vecteurs float32 et toutes les lignes quantifiées.
+
+    Les codes sont convertis en float32 par blocs de `block` lignes, pour que la
+    copie déquantifiée reste petite ; l'échelle de chaque ligne est appliquée au résultat.
+
+    :param vectors: tableau (nombre de vecteurs, k)
+    :param codes: tableau (nombre de lignes, k)
+    :param scales: échelle de chaque ligne
+    :return: tableau (nombre de vecteurs, nombre de lignes)
+    """
+    scores = np.empty((len(vectors), len(codes)), dtype=np.float32)
+    for start in range(0, len(codes), block):
+        stop = start + block
+        np.matmul(vectors, codes[start:stop].astype(np.float32).T, out=scores[:, start:stop])
+    scores *= scales
+    return scores
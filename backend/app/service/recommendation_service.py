@@ -1,112 +1,1311 @@
-import pandas as pd
 import numpy as np
-import duckdb
 from ..models.schemas import RecommendResponse,Recommendation
-from sklearn.decomposition import TruncatedSVD
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_squared_error, mean_absolute_error
-from sklearn.model_selection import train_test_split
-from typing import List
+from .content_index import ContentIndex, get_content_index
+from .response_cache import get_response_cache
+from .top_n_store import RECO_PRECOMPUTE_TOP_N, TopNStore, precompute_top_n
+from .quantization import QUANTIZED_DTYPES, dequantize_rows, quantize_rows, quantized_dot
+from ..utils.metrics import DUCKDB_QUERY, MODEL_LOAD, MODEL_MEMORY, MODEL_TRAIN, observe, record_cache
+from ..utils.timing import stage
+from ..utils.db import connect_read_only
+from ..utils.snapshots import films_db_path
+from ..utils.file_lock import file_lock
+from ..utils.ratings_parquet import RATINGS_PARQUET_DIR, current_export, latest_timestamp, parquet_source, partition_files
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
 from pathlib import Path
 from loguru import logger
-import gzip
-import pickle
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import threading
+import time
 
 # Chemin vers les fichiers de données
-FILMS_PATH = Path(__file__).resolve().parents[2] / "app" / "utils" / "data" / "films_reco.db"
-MODEL_PATH = Path(__file__).resolve().parents[2] / "app" / "utils" / "data" / "pred_df.pkl"
+FILMS_PATH = films_db_path()
+MODELS_DIR = Path(__file__).resolve().parents[2] / "app" / "utils" / "data" / "models"
+
+# Configuration du moteur de recommandation
+RECO_ENGINE = os.getenv("RECO_ENGINE", "svd")
+RECO_N_COMPONENTS = int(os.getenv("RECO_N_COMPONENTS", "20"))
+RECO_ENGINE_PARAMS = json.loads(os.getenv("RECO_ENGINE_PARAMS", "{}"))
+# Part de la similarité de contenu dans les scores (0 = filtrage collaboratif seul)
+RECO_CONTENT_WEIGHT = float(os.getenv("RECO_CONTENT_WEIGHT", "0"))
+# Intervalle minimal (en secondes) entre deux vérifications de changement des données
+RECO_MODEL_CHECK_INTERVAL = float(os.getenv("RECO_MODEL_CHECK_INTERVAL", "30"))
+# Nombre maximal de notes lues par requête DuckDB lors de la construction de la matrice
+RECO_LOAD_CHUNK_ROWS = int(os.getenv("RECO_LOAD_CHUNK_ROWS", "1000000"))
+# Source des notes d'entraînement : table DuckDB ("duckdb") ou export Parquet partitionné ("parquet")
+RECO_TRAIN_SOURCE = os.getenv("RECO_TRAIN_SOURCE", "duckdb")
+# Fenêtre d'entraînement en jours avant la note la plus récente (0 = tout l'historique)
+RECO_TRAIN_WINDOW_DAYS = float(os.getenv("RECO_TRAIN_WINDOW_DAYS", "0"))
+# Demi-vie en jours du poids des notes anciennes (0 = toutes les notes pèsent autant)
+RECO_TRAIN_HALF_LIFE_DAYS = float(os.getenv("RECO_TRAIN_HALF_LIFE_DAYS", "0"))
+
+# Notes dont le film existe, filtrées par DuckDB
+RATINGS_SOURCE = "ratings r SEMI JOIN films f ON r.film_id = f.id"
+
+
+class RatingsMatrix:
+    """
+    Matrice utilisateur-film creuse au format CSR, stockée dans des tableaux NumPy.
+
+    Les lignes sont les utilisateurs (`user_ids` triés), les colonnes les films
+    (`film_ids` triés). Seules les notes connues sont stockées. `weights`, facultatif,
+    donne le poids de chaque note à l'entraînement (décroissance avec l'âge de la
+    note) ; il n'est pas sauvegardé avec le modèle.
+    """
+
+    _arrays = ("user_ids", "film_ids", "indptr", "indices", "data")
+
+    def __init__(self, user_ids, film_ids, indptr, indices, data, weights=None):
+        self.user_ids = user_ids
+        self.film_ids = film_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.weights = weights
+
+    @classmethod
+    def from_ratings(cls, user_ids, film_ids, ratings) -> "RatingsMatrix":
+        """
+        Construit la matrice à partir de triplets (utilisateur, film, note).
+
+        :param user_ids: identifiants utilisateurs de chaque note
+        :param film_ids: identifiants films de chaque note
+        :param ratings: valeurs des notes
+        :return: RatingsMatrix
+        """
+        unique_users, rows = np.unique(np.asarray(user_ids), return_inverse=True)
+        unique_films, cols = np.unique(np.asarray(film_ids), return_inverse=True)
+        order = np.lexsort((cols, rows))
+        indptr = np.zeros(len(unique_users) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(unique_users)), out=indptr[1:])
+        return cls(
+            unique_users,
+            unique_films,
+            indptr,
+            cols[order].astype(np.int32),
+            np.asarray(ratings, dtype=np.float32)[order],
+        )
+
+    @classmethod
+    def from_duckdb(cls, conn, chunk_rows: int = RECO_LOAD_CHUNK_ROWS, source: str = RATINGS_SOURCE,
+                    weight: Optional[str] = None, axes: Optional["RatingsMatrix"] = None) -> "RatingsMatrix":
+        """
+        Construit la matrice directement depuis la base, sans matérialiser les triplets.
+
+        DuckDB filtre les notes, compte les notes par utilisateur et trie ; les tableaux
+        CSR sont alloués une fois à leur taille finale puis remplis par tranches
+        d'utilisateurs d'au plus `chunk_rows` notes. Le pic mémoire est celui de la
+        matrice plus une tranche, au lieu de plusieurs copies de toutes les notes.
+
+        :param conn: connexion DuckDB
+        :param chunk_rows: nombre maximal de notes lues par requête
+        :param source: notes à lire, alias `r` (voir `training_source`)
+        :param weight: expression SQL du poids de chaque note, ou None
+        :param axes: matrice dont reprendre les utilisateurs et les films (lignes vides pour
+            les utilisateurs sans note dans `source`) ; ses axes doivent contenir toutes les notes lues
+        :return: RatingsMatrix
+        """
+        # Même instantané des données pour toutes les requêtes
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            users = conn.execute(
+                f"SELECT r.user_id, COUNT(*) AS n FROM {source} GROUP BY r.user_id ORDER BY r.user_id"
+            ).fetchnumpy()
+            film_ids = conn.execute(
+                f"SELECT DISTINCT r.film_id FROM {source} ORDER BY r.film_id"
+            ).fetchnumpy()["film_id"]
+            user_ids, counts = users["user_id"], users["n"]
+            if axes is not None:
+                rows = np.searchsorted(axes.user_ids, user_ids)
+                cols = np.searchsorted(axes.film_ids, film_ids)
+                if not (np.array_equal(axes.user_ids[np.minimum(rows, len(axes.user_ids) - 1)], user_ids)
+                        and np.array_equal(axes.film_ids[np.minimum(cols, len(axes.film_ids) - 1)], film_ids)):
+                    raise ValueError("Notes d'utilisateurs ou de films absents des axes de la matrice")
+                user_ids, film_ids = axes.user_ids, axes.film_ids
+                counts = np.bincount(rows, weights=counts, minlength=len(user_ids)).astype(np.int64)
+            indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+            np.cumsum(counts, out=indptr[1:])
+            indices = np.empty(indptr[-1], dtype=np.int32)
+            data = np.empty(indptr[-1], dtype=np.float32)
+            weights = np.empty(indptr[-1], dtype=np.float32) if weight is not None else None
+
+            # Tranches d'utilisateurs consécutifs dont le total de notes tient dans `chunk_rows`
+            bounds = np.searchsorted(indptr, np.arange(0, indptr[-1], max(chunk_rows, 1)), side="right") - 1
+            bounds = np.unique(np.append(bounds, len(user_ids)))
+            for first, last in zip(bounds[:-1], bounds[1:]):
+                chunk = conn.execute(f"""
+                    SELECT r.film_id, r.rating::FLOAT AS rating{f", ({weight})::FLOAT AS weight" if weight else ""}
+                    FROM {source}
+                    WHERE r.user_id BETWEEN ? AND ? ORDER BY r.user_id, r.film_id
+                """, [int(user_ids[first]), int(user_ids[last - 1])]).fetchnumpy()
+                start, end = indptr[first], indptr[last]
+                indices[start:end] = np.searchsorted(film_ids, chunk["film_id"])
+                data[start:end] = chunk["rating"]
+                if weights is not None:
+                    weights[start:end] = chunk["weight"]
+                del chunk
+        finally:
+            conn.execute("COMMIT")
+        return cls(user_ids, film_ids, indptr, indices, data, weights)
+
+    @property
+    def shape(self):
+        return len(self.user_ids), len(self.film_ids)
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self._arrays)
+
+    def user_index(self, user_id: int) -> Optional[int]:
+        """Position de l'utilisateur dans la matrice, ou None s'il est inconnu."""
+        position = int(np.searchsorted(self.user_ids, user_id))
+        if position < len(self.user_ids) and self.user_ids[position] == user_id:
+            return position
+        return None
+
+    def seen(self, user_index: int) -> np.ndarray:
+        """Indices des films déjà notés par l'utilisateur."""
+        return self.indices[self.indptr[user_index]:self.indptr[user_index + 1]]
+
+    def user_ratings(self, user_index: int):
+        """Indices des films notés par l'utilisateur et notes correspondantes."""
+        start, end = self.indptr[user_index], self.indptr[user_index + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def transpose(self, with_weights: bool = False):
+        """
+        Même matrice au format CSR film-utilisateur : (indptr, indices, data),
+        suivis des poids réordonnés si `with_weights` (None sans poids).
+        """
+        rows = np.repeat(np.arange(self.shape[0], dtype=np.int32), np.diff(self.indptr))
+        order = np.argsort(self.indices, kind="stable")
+        indptr = np.zeros(self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=self.shape[1]), out=indptr[1:])
+        if with_weights:
+            return indptr, rows[order], self.data[order], None if self.weights is None else self.weights[order]
+        return indptr, rows[order], self.data[order]
+
+    def to_scipy(self, weighted: bool = False):
+        """
+        Conversion en `scipy.sparse.csr_matrix` (sans copie des données).
+
+        :param weighted: multiplier chaque note par son poids, s'il y en a
+        """
+        from scipy.sparse import csr_matrix
+        data = self.data * self.weights if weighted and self.weights is not None else self.data
+        return csr_matrix((data, self.indices, self.indptr), shape=self.shape)
+
+    def split(self, test_size: float = 0.2, seed: int = 42):
+        """
+        Met de côté une fraction des notes pour l'évaluation.
+
+        :param test_size: proportion des notes conservées pour le test
+        :param seed: graine aléatoire
+        :return: (matrice d'entraînement, lignes, colonnes et valeurs des notes de test)
+        """
+        rows = np.repeat(np.arange(self.shape[0], dtype=np.int32), np.diff(self.indptr))
+        test = np.random.default_rng(seed).random(self.nnz) < test_size
+        train = RatingsMatrix.__new__(RatingsMatrix)
+        train.user_ids, train.film_ids = self.user_ids, self.film_ids
+        train.indptr = np.zeros_like(self.indptr)
+        np.cumsum(np.bincount(rows[~test], minlength=self.shape[0]), out=train.indptr[1:])
+        train.indices, train.data = self.indices[~test], self.data[~test]
+        train.weights = None if self.weights is None else self.weights[~test]
+        return train, rows[test], self.indices[test], self.data[test]
+
+    def save(self, path: Path):
+        path.mkdir(parents=True, exist_ok=True)
+        for name in self._arrays:
+            np.save(path / f"{name}.npy", getattr(self, name))
+
+    @classmethod
+    def load(cls, path: Path, mmap_mode: Optional[str] = None) -> "RatingsMatrix":
+        return cls(*(np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in cls._arrays))
+
+
+class FilmCatalog:
+    """
+    Métadonnées des films utilisées pour habiller les recommandations (titre, affiche).
+
+    Tableaux NumPy triés par identifiant : la recherche d'une liste de films est
+    vectorisée (`searchsorted`) au lieu d'un filtrage du catalogue par film.
+    """
+
+    def __init__(self, film_ids, titles, poster_paths, genres=None, release_years=None):
+        order = np.argsort(film_ids, kind="stable")
+        self.film_ids = np.asarray(film_ids)[order]
+        self.titles = np.asarray(titles, dtype=object)[order]
+        self.poster_paths = np.asarray(poster_paths, dtype=object)[order]
+        # Genres séparés par des virgules et année de sortie (0 si inconnue), pour les filtres
+        self.genres = (np.asarray(genres, dtype=object)[order] if genres is not None
+                       else np.full(len(self.film_ids), None, dtype=object))
+        self.release_years = (np.asarray(release_years, dtype=np.int16)[order] if release_years is not None
+                              else np.zeros(len(self.film_ids), dtype=np.int16))
+
+    def __len__(self):
+        return len(self.film_ids)
+
+    @property
+    def nbytes(self):
+        text = sum(len(value) for value in self.titles if value) + sum(len(value) for value in self.poster_paths if value)
+        return self.film_ids.nbytes + self.titles.nbytes + self.poster_paths.nbytes + text
+
+    def positions(self, film_ids) -> np.ndarray:
+        """Position de chaque film dans le catalogue, -1 pour les films absents."""
+        film_ids = np.asarray(film_ids)
+        if not len(self.film_ids):
+            return np.full(len(film_ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.film_ids, film_ids), len(self.film_ids) - 1)
+        return np.where(self.film_ids[positions] == film_ids, positions, -1)
+
+    def lookup(self, film_ids):
+        """
+        Titres et affiches d'une liste de films.
+
+        :param film_ids: identifiants des films
+        :return: (titres, affiches), None pour les films absents du catalogue
+        """
+        film_ids = np.asarray(film_ids)
+        titles = np.full(len(film_ids), None, dtype=object)
+        posters = np.full(len(film_ids), None, dtype=object)
+        if len(self.film_ids):
+            positions = np.minimum(np.searchsorted(self.film_ids, film_ids), len(self.film_ids) - 1)
+            found = self.film_ids[positions] == film_ids
+            titles[found] = self.titles[positions[found]]
+            posters[found] = self.poster_paths[positions[found]]
+        return titles, posters
+
+
+class ItemFilters:
+    """
+    Filtres des recommandations par genre et par année de sortie, sous forme de masques
+    booléens sur l'axe des films d'un moteur.
+
+    Un masque par genre et le tableau des années sont précalculés une fois par modèle :
+    filtrer une requête ne coûte que quelques opérations vectorisées sur l'axe des
+    films, et les masques des combinaisons déjà demandées sont gardés en cache.
+    """
+
+    _cache_size = 256
+
+    def __init__(self, films: FilmCatalog, film_ids):
+        positions = films.positions(film_ids)
+        found = positions >= 0
+        genres = np.where(found, films.genres[positions], None)
+        self.release_years = np.where(found, films.release_years[positions], 0).astype(np.int16)
+
+        # Index inversé genre -> positions, puis un masque par genre (insensible à la casse)
+        rows = {}
+        for position, genre_str in enumerate(genres):
+            for genre in {g.strip().lower() for g in (genre_str or "").split(",") if g.strip()}:
+                rows.setdefault(genre, []).append(position)
+        self.genre_masks = {}
+        for genre, genre_rows in rows.items():
+            mask = np.zeros(len(positions), dtype=bool)
+            mask[genre_rows] = True
+            self.genre_masks[genre] = mask
+        self._masks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self.release_years.nbytes + sum(mask.nbytes for mask in self.genre_masks.values())
+
+    def mask(self, genres: Optional[List[str]] = None, year_from: Optional[int] = None,
+             year_to: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Films de l'axe qui satisfont les filtres.
+
+        :param genres: genres acceptés (un film doit en avoir au moins un)
+        :param year_from: première année de sortie acceptée
+        :param year_to: dernière année de sortie acceptée
+        :return: masque booléen en lecture seule, ou None si aucun filtre n'est demandé
+        """
+        genres = tuple(sorted({genre.strip().lower() for genre in genres or () if genre.strip()}))
+        if not genres and year_from is None and year_to is None:
+            return None
+        key = (genres, year_from, year_to)
+        mask = self._masks.get(key)
+        if mask is not None:
+            return mask
+
+        mask = np.ones(len(self.release_years), dtype=bool)
+        if genres:
+            mask = np.zeros(len(self.release_years), dtype=bool)
+            for genre in genres:
+                if genre in self.genre_masks:
+                    mask |= self.genre_masks[genre]
+        if year_from is not None or year_to is not None:
+            mask &= self.release_years > 0
+            if year_from is not None:
+                mask &= self.release_years >= year_from
+            if year_to is not None:
+                mask &= self.release_years <= year_to
+        mask.flags.writeable = False
+        with self._lock:
+            if len(self._masks) >= self._cache_size:
+                self._masks.pop(next(iter(self._masks)))
+            self._masks[key] = mask
+        return mask
+
+
+def _column(values) -> np.ndarray:
+    """Colonne retournée par `fetchnumpy`, les valeurs NULL (tableau masqué) remplacées par None."""
+    if isinstance(values, np.ma.MaskedArray):
+        data = values.data.astype(object)
+        data[np.ma.getmaskarray(values)] = None
+        return data
+    return values
+
+
+class RecommenderEngine:
+    """
+    Interface commune des moteurs de recommandation.
+
+    Un moteur s'entraîne sur une `RatingsMatrix` puis attribue un score à chaque
+    film (colonne de la matrice) pour un ou plusieurs utilisateurs (lignes).
+    Les sous-classes déclarent dans `_arrays` les tableaux appris, ce qui suffit
+    pour la sauvegarde et le chargement.
+    """
+
+    name = None
+    _arrays = ()
+
+    def __init__(self, **params):
+        self.params = params
+
+    def fit(self, ratings: RatingsMatrix) -> "RecommenderEngine":
+        raise NotImplementedError
+
+    def fold_in(self, ratings: RatingsMatrix, user_indices) -> "RecommenderEngine":
+        """
+        Recalcule les facteurs de quelques utilisateurs depuis leurs notes, ceux des films restant fixes.
+
+        Sert aux utilisateurs sans note d'entraînement (hors de `RECO_TRAIN_WINDOW_DAYS`).
+
+        :param ratings: matrice des notes, sur les mêmes axes que celle de l'entraînement
+        :param user_indices: positions des utilisateurs dans la matrice
+        """
+        raise NotImplementedError(f"Le moteur {self.name} ne sait pas ajouter un utilisateur sans réentraînement")
+
+    def score_batch(self, user_indices) -> np.ndarray:
+        """
+        Scores de tous les films pour plusieurs utilisateurs.
+
+        :param user_indices: positions des utilisateurs dans la matrice
+        :return: tableau (nombre d'utilisateurs, nombre de films)
+        """
+        raise NotImplementedError
+
+    def score_user(self, user_index: int) -> np.ndarray:
+        """Scores de tous les films pour un utilisateur."""
+        return self.score_batch(np.array([user_index]))[0]
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self._arrays)
+
+    def save(self, path: Path):
+        path.mkdir(parents=True, exist_ok=True)
+        for name in self._arrays:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        with open(path / "engine.json", "w", encoding="utf-8") as f:
+            json.dump({"engine": self.name, "params": self.params}, f)
+
+    @classmethod
+    def load(cls, path: Path, mmap_mode: Optional[str] = None) -> "RecommenderEngine":
+        with open(path / "engine.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        engine = ENGINES[meta["engine"]](**meta["params"])
+        for name in engine._arrays:
+            setattr(engine, name, np.load(path / f"{name}.npy", mmap_mode=mmap_mode))
+        engine._load_extra(path, mmap_mode)
+        return engine
+
+    def _load_extra(self, path: Path, mmap_mode: Optional[str]):
+        """Chargement des parties sauvegardées hors de `_arrays` (sous-moteurs), le cas échéant."""
+
+
+class SVDEngine(RecommenderEngine):
+    """
+    SVD tronquée sur la matrice des notes où les films non notés valent 0,
+    puis mise à l'échelle des prédictions entre 0.5 et 5 film par film.
+    Une note pondérée est multipliée par son poids : une note ancienne se
+    rapproche d'une note absente.
+    """
+
+    name = "svd"
+    _arrays = ("user_factors", "components", "col_min", "col_scale")
+
+    def __init__(self, n_components: int = 20, algorithm: str = "randomized", n_iter: int = 5,
+                 random_state: int = 42):
+        super().__init__(n_components=n_components, algorithm=algorithm, n_iter=n_iter,
+                         random_state=random_state)
+
+    def fit(self, ratings: RatingsMatrix) -> "SVDEngine":
+        from sklearn.decomposition import TruncatedSVD
+
+        svd = TruncatedSVD(
+            n_components=min(self.params["n_components"], ratings.shape[1] - 1),
+            algorithm=self.params["algorithm"],
+            n_iter=self.params["n_iter"],
+            random_state=self.params["random_state"],
+        )
+        self.user_factors = svd.fit_transform(ratings.to_scipy(weighted=True)).astype(np.float32)
+        self.components = svd.components_.astype(np.float32)
+        self._scale_columns()
+        return self
+
+    def fold_in(self, ratings: RatingsMatrix, user_indices) -> "SVDEngine":
+        # Projection des notes sur les composantes, comme `TruncatedSVD.transform`
+        self.user_factors[user_indices] = ratings.to_scipy()[user_indices] @ self.components.T
+        self._scale_columns()
+        return self
+
+    def _scale_columns(self):
+        # Bornes par film des prédictions brutes (équivalent de MinMaxScaler((0.5, 5)))
+        n_films = self.components.shape[1]
+        col_min = np.full(n_films, np.inf, dtype=np.float32)
+        col_max = np.full(n_films, -np.inf, dtype=np.float32)
+        for start in range(0, len(self.user_factors), 4096):
+            block = self.user_factors[start:start + 4096] @ self.components
+            np.minimum(col_min, block.min(axis=0), out=col_min)
+            np.maximum(col_max, block.max(axis=0), out=col_max)
+        # Échelle nulle pour un film sans note d'entraînement (prédictions constantes)
+        col_scale = np.zeros(n_films, dtype=np.float32)
+        np.divide(4.5, col_max - col_min, out=col_scale, where=col_max > col_min)
+        self.col_min = col_min
+        self.col_scale = col_scale
+
+    def factors(self):
+        """Facteurs latents (utilisateurs, films), un vecteur par ligne."""
+        return self.user_factors, self.components.T
+
+    def finish_scores(self, scores: np.ndarray, items=None) -> np.ndarray:
+        """
+        Transforme en place des produits scalaires utilisateur·film en notes prédites.
+
+        :param scores: produits scalaires, une colonne par film (ou par film de `items`)
+        :param items: indices des films de chaque colonne (par défaut, tous les films)
+        """
+        col_min = self.col_min if items is None else self.col_min[items]
+        col_scale = self.col_scale if items is None else self.col_scale[items]
+        scores -= col_min
+        scores *= col_scale
+        scores += 0.5
+        return scores
+
+    def score_batch(self, user_indices) -> np.ndarray:
+        return self.finish_scores(self.user_factors[user_indices] @ self.components)
+
+
+class ALSEngine(RecommenderEngine):
+    """
+    Factorisation par moindres carrés alternés (ALS-WR) sur les seules notes connues.
+
+    Contrairement à la SVD, les films non notés ne sont pas traités comme des 0.
+    Chaque demi-itération résout un système k×k par utilisateur (ou par film) ;
+    les systèmes sont assemblés et résolus par lots avec NumPy (BLAS/LAPACK) et
+    les lots sont répartis sur plusieurs threads. Avec des poids, chaque note
+    compte dans les moindres carrés (et dans la régularisation) à proportion de son poids.
+    """
+
+    name = "als"
+    _arrays = ("user_factors", "item_factors", "global_mean")
+
+    def __init__(self, n_components: int = 20, regularization: float = 0.1, iterations: int = 10,
+                 n_threads: Optional[int] = None, batch_mb: int = 32, random_state: int = 42):
+        super().__init__(n_components=n_components, regularization=regularization, iterations=iterations,
+                         n_threads=n_threads, batch_mb=batch_mb, random_state=random_state)
+
+    def _solve(self, indptr, indices, residuals, fixed, pool, weights=None):
+        """Résout les moindres carrés régularisés de chaque ligne, par lots parallèles."""
+        k = fixed.shape[1]
+        regularization = self.params["regularization"]
+        solution = np.zeros((len(indptr) - 1, k), dtype=np.float32)
+
+        # Découpage des lignes en lots dont les matrices k×k intermédiaires tiennent dans `batch_mb` Mo
+        batch_nnz = max(1, self.params["batch_mb"] * 1_000_000 // (4 * k * k))
+        bounds = np.searchsorted(indptr, np.arange(0, indptr[-1], batch_nnz), side="right") - 1
+        bounds = np.unique(np.append(bounds, len(indptr) - 1))
+
+        def solve_batch(first, last):
+            counts = np.diff(indptr[first:last + 1])
+            rated = np.nonzero(counts)[0]
+            if len(rated) == 0:
+                return
+            start, end = indptr[first], indptr[last]
+            factors = fixed[indices[start:end]]
+            offsets = (indptr[first:last] - start)[rated]
+            if weights is None:
+                weighted, mass = factors, counts[rated]
+            else:
+                weighted = factors * weights[start:end, None]
+                mass = np.add.reduceat(weights[start:end], offsets)
+            gram = np.add.reduceat(weighted[:, :, None] * factors[:, None, :], offsets, axis=0)
+            rhs = np.add.reduceat(weighted * residuals[start:end, None], offsets, axis=0)
+            gram += (regularization * mass)[:, None, None] * np.eye(k, dtype=np.float32)
+            solution[first + rated] = np.linalg.solve(gram, rhs[:, :, None])[:, :, 0]
+
+        list(pool.map(lambda pair: solve_batch(*pair), zip(bounds[:-1], bounds[1:])))
+        return solution
+
+    def fit(self, ratings: RatingsMatrix) -> "ALSEngine":
+        n_users, n_films = ratings.shape
+        k = self.params["n_components"]
+        rng = np.random.default_rng(self.params["random_state"])
+        self.global_mean = np.array(np.average(ratings.data, weights=ratings.weights) if ratings.nnz else 0,
+                                    dtype=np.float32)
+        residuals = ratings.data - self.global_mean
+        item_indptr, item_indices, item_ratings, item_weights = ratings.transpose(with_weights=True)
+        item_residuals = item_ratings - self.global_mean
+
+        self.user_factors = np.zeros((n_users, k), dtype=np.float32)
+        self.item_factors = (rng.standard_normal((n_films, k)) * 0.1).astype(np.float32)
+        with ThreadPoolExecutor(max_workers=self.params["n_threads"] or os.cpu_count()) as pool:
+            for _ in range(self.params["iterations"]):
+                self.user_factors = self._solve(ratings.indptr, ratings.indices, residuals, self.item_factors, pool,
+                                                ratings.weights)
+                self.item_factors = self._solve(item_indptr, item_indices, item_residuals, self.user_factors, pool,
+                                                item_weights)
+        return self
+
+    def fold_in(self, ratings: RatingsMatrix, user_indices) -> "ALSEngine":
+        # Lignes CSR des utilisateurs concaténées, puis une demi-itération sur ces seules lignes
+        user_indices = np.asarray(user_indices)
+        starts, counts = ratings.indptr[user_indices], np.diff(ratings.indptr)[user_indices]
+        indptr = np.zeros(len(user_indices) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        positions = np.arange(indptr[-1]) + np.repeat(starts - indptr[:-1], counts)
+        with ThreadPoolExecutor(max_workers=self.params["n_threads"] or os.cpu_count()) as pool:
+            self.user_factors[user_indices] = self._solve(indptr, ratings.indices[positions],
+                                                          ratings.data[positions] - self.global_mean,
+                                                          self.item_factors, pool)
+        return self
+
+    def factors(self):
+        """Facteurs latents (utilisateurs, films), un vecteur par ligne."""
+        return self.user_factors, self.item_factors
+
+    def finish_scores(self, scores: np.ndarray, items=None) -> np.ndarray:
+        """Transforme en place des produits scalaires utilisateur·film en notes prédites."""
+        scores += self.global_mean
+        return np.clip(scores, 0.5, 5, out=scores)
+
+    def score_batch(self, user_indices) -> np.ndarray:
+        return self.finish_scores(self.user_factors[user_indices] @ self.item_factors.T)
+
+
+# Vues NumPy sur la mémoire partagée, propres à chaque worker du calcul des voisins
+_KNN_SHARED = {}
+_KNN_SEGMENTS = []
+
+
+def _init_knn_worker(spec: dict):
+    from app.utils.shared_arrays import attach_arrays
+    segments, arrays = attach_arrays(spec)
+    # Les segments doivent rester ouverts tant que les vues sont utilisées
+    _KNN_SEGMENTS.extend(segments)
+    _KNN_SHARED.update(arrays)
+
+
+def _knn_block(start: int, end: int, n_neighbors: int, arrays: Optional[dict] = None):
+    """
+    Plus proches voisins des utilisateurs `start` à `end` par produit creux X[start:end] · Xᵀ.
+
+    Seul un bloc (end - start) × utilisateurs est densifié à la fois.
+    """
+    from scipy.sparse import csr_matrix
+
+    arrays = arrays if arrays is not None else _KNN_SHARED
+    n_users, n_films = len(arrays["indptr"]) - 1, len(arrays["t_indptr"]) - 1
+    block_indptr = arrays["indptr"][start:end + 1]
+    lo, hi = block_indptr[0], block_indptr[-1]
+    block = csr_matrix(
+        (arrays["data"][lo:hi], arrays["indices"][lo:hi], block_indptr - lo), shape=(end - start, n_films)
+    )
+    transposed = csr_matrix((arrays["t_data"], arrays["t_indices"], arrays["t_indptr"]), shape=(n_films, n_users))
+    similarities = (block @ transposed).toarray()
+    similarities[np.arange(end - start), np.arange(start, end)] = -np.inf
+
+    k = min(n_neighbors, n_users - 1)
+    neighbors = np.argpartition(similarities, n_users - k, axis=1)[:, n_users - k:]
+    weights = np.take_along_axis(similarities, neighbors, axis=1)
+    order = np.argsort(-weights, axis=1, kind="stable")
+    neighbors = np.take_along_axis(neighbors, order, axis=1).astype(np.int32)
+    weights = np.take_along_axis(weights, order, axis=1).astype(np.float32)
+    # Seules les similarités positives comptent dans l'agrégation
+    neighbors[~(weights > 0)] = -1
+    weights[~(weights > 0)] = 0
+    return start, neighbors, weights
+
+
+class UserKNNEngine(RecommenderEngine):
+    """
+    Filtrage collaboratif utilisateur-utilisateur.
+
+    À l'entraînement, les K utilisateurs les plus similaires (cosinus sur les notes
+    centrées par utilisateur) sont précalculés par produits matriciels creux par
+    blocs, répartis sur plusieurs processus qui partagent la matrice en mémoire
+    partagée : la matrice utilisateurs × utilisateurs n'est jamais densifiée.
+    Le score d'un film est la moyenne de l'utilisateur plus la moyenne pondérée
+    des écarts à la moyenne de ses voisins qui l'ont noté.
+    """
+
+    name = "knn"
+    _arrays = ("neighbors", "similarities", "user_means", "indptr", "indices", "data", "film_count")
+
+    def __init__(self, n_neighbors: int = 50, shrinkage: float = 10.0, n_jobs: Optional[int] = None,
+                 block_mb: int = 64):
+        super().__init__(n_neighbors=n_neighbors, shrinkage=shrinkage, n_jobs=n_jobs, block_mb=block_mb)
+
+    def fit(self, ratings: RatingsMatrix) -> "UserKNNEngine":
+        n_users, n_films = ratings.shape
+        counts = np.diff(ratings.indptr)
+        rows = np.repeat(np.arange(n_users), counts)
+        self.indptr, self.indices, self.data = ratings.indptr, ratings.indices, ratings.data
+        self.film_count = np.array(n_films)
+        global_mean = ratings.data.mean() if ratings.nnz else 0
+        sums = np.bincount(rows, weights=ratings.data, minlength=n_users)
+        self.user_means = np.where(counts > 0, sums / np.maximum(counts, 1), global_mean).astype(np.float32)
+
+        # Notes centrées puis normalisées par utilisateur : le produit scalaire devient un cosinus
+        centered = ratings.data - self.user_means[rows]
+        norms = np.sqrt(np.bincount(rows, weights=centered ** 2, minlength=n_users))
+        norms[norms == 0] = 1
+        normalized = (centered / norms[rows]).astype(np.float32)
+        t_indptr, t_indices, t_data = RatingsMatrix(ratings.user_ids, ratings.film_ids, ratings.indptr,
+                                                    ratings.indices, normalized).transpose()
+        arrays = {"indptr": ratings.indptr, "indices": ratings.indices, "data": normalized,
+                  "t_indptr": t_indptr, "t_indices": t_indices, "t_data": t_data}
+
+        k = min(self.params["n_neighbors"], max(n_users - 1, 0))
+        self.neighbors = np.full((n_users, k), -1, dtype=np.int32)
+        self.similarities = np.zeros((n_users, k), dtype=np.float32)
+        if k == 0:
+            return self
+        block_size = max(1, self.params["block_mb"] * 1_000_000 // (4 * n_users))
+        starts = range(0, n_users, block_size)
+        n_jobs = self.params["n_jobs"] or os.cpu_count()
+
+        def store(result):
+            start, neighbors, weights = result
+            self.neighbors[start:start + len(neighbors)] = neighbors
+            self.similarities[start:start + len(neighbors)] = weights
+
+        if n_jobs == 1 or len(starts) == 1:
+            for start in starts:
+                store(_knn_block(start, min(start + block_size, n_users), k, arrays))
+            return self
+
+        from app.utils.shared_arrays import release_arrays, share_arrays
+        segments, spec = share_arrays(arrays)
+        try:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_knn_worker, initargs=(spec,)) as pool:
+                futures = [pool.submit(_knn_block, start, min(start + block_size, n_users), k) for start in starts]
+                for future in futures:
+                    store(future.result())
+        finally:
+            release_arrays(segments, unlink=True)
+        return self
+
+    @property
+    def n_films(self):
+        return int(self.film_count)
+
+    def score_user(self, user_index: int) -> np.ndarray:
+        neighbors = self.neighbors[user_index]
+        weights = self.similarities[user_index][neighbors >= 0]
+        neighbors = neighbors[neighbors >= 0]
+
+        # Concaténation des lignes CSR des voisins sans boucle Python
+        starts, counts = self.indptr[neighbors], np.diff(self.indptr)[neighbors]
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        positions = np.arange(counts.sum()) + offsets
+        items = self.indices[positions]
+        deviations = self.data[positions] - np.repeat(self.user_means[neighbors], counts)
+        item_weights = np.repeat(weights, counts)
+
+        numerator = np.bincount(items, weights=item_weights * deviations, minlength=self.n_films)
+        denominator = np.bincount(items, weights=item_weights, minlength=self.n_films)
+        scores = self.user_means[user_index] + numerator / (denominator + self.params["shrinkage"])
+        return np.clip(scores, 0.5, 5).astype(np.float32)
+
+    def score_batch(self, user_indices) -> np.ndarray:
+        scores = np.empty((len(user_indices), self.n_films), dtype=np.float32)
+        for row, user_index in enumerate(user_indices):
+            scores[row] = self.score_user(user_index)
+        return scores
+
+
+class QuantizedEngine(RecommenderEngine):
+    """
+    Moteur à factorisation (SVD ou ALS) dont les facteurs sont servis quantifiés.
+
+    Les scores de tous les films sont calculés sur les facteurs float16 ou int8
+    (échelle par vecteur), puis les `rerank_candidates` meilleurs films de chaque
+    utilisateur sont recalculés avec les facteurs float32 du moteur de base. Ces
+    derniers sont sauvegardés dans `base/` : servis en mémoire mappée, seules les
+    lignes des candidats sont lues.
+    """
+
+    name = "quantized"
+    _arrays = ("user_codes", "user_scales", "item_codes", "item_scales")
+
+    def __init__(self, base: str = "svd", dtype: str = "int8", rerank_candidates: int = 200,
+                 n_components: int = 20, base_params: Optional[dict] = None):
+        if base not in ("svd", "als"):
+            raise ValueError(f"Moteur de base non quantifiable : {base} (disponibles : svd, als)")
+        if dtype not in QUANTIZED_DTYPES:
+            raise ValueError(f"Type de quantification inconnu : {dtype} (disponibles : {', '.join(QUANTIZED_DTYPES)})")
+        super().__init__(base=base, dtype=dtype, rerank_candidates=rerank_candidates,
+                         n_components=n_components, base_params=base_params or {})
+        self.base = None
+
+    @classmethod
+    def from_engine(cls, engine: RecommenderEngine, dtype: str = "int8",
+                    rerank_candidates: int = 200) -> "QuantizedEngine":
+        """
+        Quantifie un moteur SVD ou ALS déjà entraîné.
+
+        :param engine: moteur de base entraîné
+        :param dtype: "float16" ou "int8"
+        :param rerank_candidates: nombre de films recalculés en pleine précision par utilisateur
+        :return: QuantizedEngine
+        """
+        base_params = {key: value for key, value in engine.params.items() if key != "n_components"}
+        quantized = cls(engine.name, dtype, rerank_candidates, engine.params["n_components"], base_params)
+        quantized.base = engine
+        quantized._quantize()
+        return quantized
+
+    def fit(self, ratings: RatingsMatrix) -> "QuantizedEngine":
+        self.base = make_engine(self.params["base"], self.params["n_components"],
+                                **self.params["base_params"]).fit(ratings)
+        self._quantize()
+        return self
+
+    def fold_in(self, ratings: RatingsMatrix, user_indices) -> "QuantizedEngine":
+        self.base.fold_in(ratings, user_indices)
+        self._quantize()
+        return self
+
+    def _quantize(self):
+        user_factors, item_factors = self.base.factors()
+        self.user_codes, self.user_scales = quantize_rows(user_factors, self.params["dtype"])
+        self.item_codes, self.item_scales = quantize_rows(item_factors, self.params["dtype"])
+
+    def save(self, path: Path):
+        super().save(path)
+        self.base.save(path / "base")
+
+    def _load_extra(self, path: Path, mmap_mode: Optional[str]):
+        self.base = RecommenderEngine.load(path / "base", mmap_mode=mmap_mode)
+
+    def score_batch(self, user_indices) -> np.ndarray:
+        user_indices = np.asarray(user_indices)
+        users = dequantize_rows(self.user_codes[user_indices], self.user_scales[user_indices])
+        scores = self.base.finish_scores(quantized_dot(users, self.item_codes, self.item_scales))
+
+        n_candidates = min(self.params["rerank_candidates"], scores.shape[1])
+        if n_candidates <= 0:
+            return scores
+        candidates = np.argpartition(-scores, n_candidates - 1, axis=1)[:, :n_candidates]
+        # Recalcul exact des candidats avec les facteurs float32
+        user_factors, item_factors = self.base.factors()
+        exact = np.einsum("uk,uck->uc", np.asarray(user_factors[user_indices]),
+                          np.asarray(item_factors[candidates.ravel()]).reshape(*candidates.shape, -1))
+        np.put_along_axis(scores, candidates, self.base.finish_scores(exact, candidates), axis=1)
+        return scores
+
+
+ENGINES = {engine.name: engine for engine in (SVDEngine, ALSEngine, UserKNNEngine, QuantizedEngine)}
+
+
+class ContentBlendEngine(RecommenderEngine):
+    """
+    Combine les scores d'un moteur collaboratif avec la similarité de contenu.
+
+    Le profil de contenu d'un utilisateur est la somme des vecteurs des films qu'il
+    a notés, pondérés par l'écart de chaque note à sa moyenne. Les films sans
+    aucune note, absents de la matrice, sont ajoutés en fin d'axe des films
+    (`film_ids`) : leur part collaborative est remplacée par la moyenne de l'utilisateur.
+    """
+
+    name = "content-blend"
+
+    def __init__(self, engine: RecommenderEngine, ratings_matrix: RatingsMatrix, content_index: ContentIndex,
+                 weight: float = RECO_CONTENT_WEIGHT):
+        super().__init__(weight=weight)
+        self.engine = engine
+        self.ratings_matrix = ratings_matrix
+        self.content_index = content_index
+        cold_films = np.setdiff1d(content_index.film_ids, ratings_matrix.film_ids)
+        self.film_ids = np.concatenate([ratings_matrix.film_ids, cold_films])
+        self.content_positions = content_index.positions(self.film_ids)
+        counts = np.diff(ratings_matrix.indptr)
+        rows = np.repeat(np.arange(ratings_matrix.shape[0]), counts)
+        sums = np.bincount(rows, weights=ratings_matrix.data, minlength=ratings_matrix.shape[0])
+        self.user_means = (sums / np.maximum(counts, 1)).astype(np.float32)
+
+    @property
+    def nbytes(self):
+        return self.engine.nbytes + self.content_index.nbytes
+
+    def score_batch(self, user_indices) -> np.ndarray:
+        weight = self.params["weight"]
+        n_rated_films = self.ratings_matrix.shape[1]
+        collaborative = self.engine.score_batch(user_indices)
+        indexed = self.content_positions >= 0
+        scores = np.empty((len(user_indices), len(self.film_ids)), dtype=np.float32)
+        for row, user_index in enumerate(user_indices):
+            items, ratings = self.ratings_matrix.user_ratings(user_index)
+            mean = self.user_means[user_index]
+            similarity = self.content_index.profile_scores(self.content_positions[items], ratings - mean)
+            # Similarité cosinus [-1, 1] ramenée sur l'échelle des notes [0.5, 5]
+            content = np.where(indexed, 2.75 + 2.25 * similarity[self.content_positions], mean)
+            scores[row, :n_rated_films] = (1 - weight) * collaborative[row] + weight * content[:n_rated_films]
+            scores[row, n_rated_films:] = (1 - weight) * mean + weight * content[n_rated_films:]
+        return scores
+
+
+def make_engine(name: str = RECO_ENGINE, n_components: int = RECO_N_COMPONENTS, **params) -> RecommenderEngine:
+    """
+    Instancie un moteur de recommandation à partir de son nom.
+
+    :param name: nom du moteur ("svd", "als", "knn" ou "quantized")
+    :param n_components: nombre de composantes latentes, ignoré par les moteurs qui n'en ont pas
+    :param params: autres paramètres propres au moteur
+    :return: moteur non entraîné
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Moteur de recommandation inconnu : {name} (disponibles : {', '.join(ENGINES)})")
+    if "n_components" in inspect.signature(ENGINES[name].__init__).parameters:
+        params.setdefault("n_components", n_components)
+    return ENGINES[name](**params)
+
+
+def data_fingerprint(conn) -> str:
+    """
+    Empreinte peu coûteuse des données d'entraînement, qui change dès qu'une note ou un film est ajouté.
+    """
+    with observe(DUCKDB_QUERY, "fingerprint"):
+        row = conn.execute("""
+            SELECT (SELECT COUNT(*) FROM films), COUNT(*), COALESCE(SUM(rating), 0), COALESCE(MAX(timestamp), 0)
+            FROM ratings
+        """).fetchone()
+    if RECO_TRAIN_SOURCE == "parquet":
+        # Un nouvel export Parquet change aussi les données d'entraînement
+        export = current_export()
+        row += (export.name if export is not None else "none",)
+    return "-".join(str(value) for value in row)
+
+
+def training_options() -> dict:
+    """Options d'entraînement différentes des valeurs par défaut (intégrées à la version du modèle)."""
+    options = {"source": RECO_TRAIN_SOURCE, "window_days": RECO_TRAIN_WINDOW_DAYS,
+               "half_life_days": RECO_TRAIN_HALF_LIFE_DAYS}
+    defaults = {"source": "duckdb", "window_days": 0, "half_life_days": 0}
+    return {key: value for key, value in options.items() if value != defaults[key]}
+
+
+def training_source(conn, source: str = RECO_TRAIN_SOURCE, window_days: float = RECO_TRAIN_WINDOW_DAYS,
+                    half_life_days: float = RECO_TRAIN_HALF_LIFE_DAYS, parquet_dir: Path = RATINGS_PARQUET_DIR):
+    """
+    Notes d'entraînement à lire par `RatingsMatrix.from_duckdb`, et expression de leur poids.
+
+    La fenêtre et la demi-vie se comptent depuis la note la plus récente. Depuis l'export
+    Parquet, seuls les fichiers des partitions qui recouvrent la fenêtre sont lus, avec le
+    filtre sur l'horodatage poussé dans la lecture des fichiers ; les notes retenues sont
+    copiées une fois dans une table temporaire, que les requêtes par tranches
+    d'utilisateurs parcourent ensuite au lieu de relire tous les fichiers.
+
+    :param conn: connexion DuckDB de la base (table `films`)
+    :param source: "duckdb" (table `ratings`) ou "parquet" (export de `app.utils.ratings_parquet`)
+    :param window_days: fenêtre en jours (0 = tout l'historique)
+    :param half_life_days: demi-vie du poids en jours (0 = sans pondération)
+    :param parquet_dir: dossier des exports Parquet
+    :return: (source SQL d'alias `r`, expression SQL du poids ou None)
+    """
+    if source == "parquet":
+        export = current_export(parquet_dir)
+        if export is None:
+            raise FileNotFoundError("Aucun export Parquet des notes (python -m app.utils.ratings_parquet)")
+        latest = latest_timestamp(conn, export)
+    elif source == "duckdb":
+        latest = conn.execute("SELECT MAX(timestamp) FROM ratings").fetchone()[0]
+    else:
+        raise ValueError(f"Source d'entraînement inconnue : {source} (disponibles : duckdb, parquet)")
+
+    since = int(latest - window_days * 86400) if window_days > 0 and latest is not None else None
+    window = f" WHERE timestamp >= {since}" if since is not None else ""
+    if source == "parquet":
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE training_ratings AS
+            SELECT user_id, film_id, rating, timestamp FROM {parquet_source(partition_files(export, since))}{window}
+        """)
+        table = "training_ratings"
+    elif window:
+        table = f"(SELECT user_id, film_id, rating, timestamp FROM ratings{window})"
+    else:
+        table = "ratings"
+    weight = None
+    if half_life_days > 0 and latest is not None:
+        weight = f"pow(0.5, ({int(latest)} - r.timestamp) / {half_life_days * 86400})"
+    return f"{table} r SEMI JOIN films f ON r.film_id = f.id", weight
+
 
 def load_data():
     """
     Charge les données depuis la base DuckDB et construit la matrice utilisateur-film.
 
-    :return: ratings_df, movies_df, ratings_matrix
+    La matrice est construite par `RatingsMatrix.from_duckdb` : le filtrage des notes
+    de films inconnus, le comptage et le tri sont faits par DuckDB, et les colonnes sont
+    lues en tableaux NumPy (sans passer par pandas) directement dans les tableaux CSR.
+
+    La matrice servie contient toutes les notes de la table : elle définit les
+    utilisateurs connus et les films déjà vus. Les notes d'entraînement, et leurs poids,
+    dépendent des options `RECO_TRAIN_*` (voir `training_source`) ; avec une fenêtre ou
+    l'export Parquet, elles forment une seconde matrice sur les mêmes axes, sinon c'est
+    la même matrice, pondérée.
+
+    :return: films (FilmCatalog), ratings_matrix, training_matrix
     """
     try:
-        with duckdb.connect(FILMS_PATH) as conn:
-            ratings_df = conn.execute("SELECT user_id, film_id, rating FROM ratings").df()
-            movies_df = conn.execute("SELECT id AS film_id, title, poster_path FROM films").df()
-            ratings_df = ratings_df[ratings_df["film_id"].isin(movies_df["film_id"])]
-            ratings_matrix = ratings_df.pivot_table(index='user_id', columns='film_id', values='rating').fillna(0)
+        with connect_read_only(FILMS_PATH) as conn, observe(DUCKDB_QUERY, "load_data"):
+            source, weight = training_source(conn, RECO_TRAIN_SOURCE, RECO_TRAIN_WINDOW_DAYS, RECO_TRAIN_HALF_LIFE_DAYS)
+            if source == RATINGS_SOURCE:
+                ratings_matrix = training_matrix = RatingsMatrix.from_duckdb(conn, weight=weight)
+            else:
+                ratings_matrix = RatingsMatrix.from_duckdb(conn)
+                training_matrix = RatingsMatrix.from_duckdb(conn, source=source, weight=weight, axes=ratings_matrix)
+            films = load_films(conn)
         logger.info("Données chargées avec succès.")
-        return ratings_df, movies_df, ratings_matrix
+        return films, ratings_matrix, training_matrix
     except Exception as e:
         logger.error(f"Erreur lors du chargement des données : {e}")
         return None, None, None
 
 
-def get_or_train_model(ratings_matrix, n_components=20, pkl_path=MODEL_PATH):
+def load_films(conn) -> FilmCatalog:
+    """Catalogue des films (identifiant, titre, affiche, genres, année de sortie) lu depuis la base."""
+    films = conn.execute("""
+        SELECT id AS film_id, title, poster_path, genres, COALESCE(year(release_date), 0) AS release_year
+        FROM films
+    """).fetchnumpy()
+    return FilmCatalog(films["film_id"], _column(films["title"]), _column(films["poster_path"]),
+                       _column(films["genres"]), films["release_year"])
+
+
+def model_version(engine: RecommenderEngine, fingerprint: Optional[str]) -> str:
+    """Version d'un modèle : empreinte du moteur, de ses paramètres, des données et des options d'entraînement."""
+    options = training_options()
+    return hashlib.sha1(
+        json.dumps([engine.name, engine.params, fingerprint] + ([options] if options else []), sort_keys=True).encode()
+    ).hexdigest()[:12]
+
+
+def model_dir(engine: RecommenderEngine, version: str, models_dir: Optional[Path] = None) -> Path:
+    """Dossier de sauvegarde d'un modèle."""
+    return (models_dir or MODELS_DIR) / f"{engine.name}-{version}"
+
+
+def load_model_artifact(model_path: Path, mmap_mode: Optional[str] = "r"):
+    """
+    Moteur et matrice des notes d'un modèle sauvegardé.
+
+    En mémoire mappée (par défaut), les tableaux ne sont pas copiés dans le processus :
+    leurs pages restent dans le cache du système, partagées par tous les workers.
+
+    :param model_path: dossier du modèle
+    :param mmap_mode: mode `np.load` (None pour charger en mémoire)
+    :return: (moteur, matrice des notes)
+    """
+    start = time.perf_counter()
+    engine = RecommenderEngine.load(model_path, mmap_mode=mmap_mode)
+    ratings_matrix = RatingsMatrix.load(model_path / "ratings", mmap_mode=mmap_mode)
+    MODEL_LOAD.labels(engine.name).observe(time.perf_counter() - start)
+    return engine, ratings_matrix
+
+
+def get_or_train_model(ratings_matrix: RatingsMatrix, engine_name: str = RECO_ENGINE,
+                       n_components: int = RECO_N_COMPONENTS, params: Optional[dict] = None,
+                       fingerprint: Optional[str] = None, models_dir: Optional[Path] = None,
+                       training_matrix: Optional[RatingsMatrix] = None):
     """
-    Charge le modèle de recommendations svd si disponible, sinon l’entraîne puis le sauvegarde.
+    Charge le moteur de recommandation si un modèle à jour est sauvegardé, sinon l’entraîne puis le sauvegarde.
+
+    Avec `training_matrix`, le moteur apprend sur ses seules notes ; les utilisateurs qui
+    n'y ont aucune note reçoivent des facteurs calculés sur leurs notes de `ratings_matrix`
+    (`RecommenderEngine.fold_in`). Un moteur qui ne le permet pas (`knn`) apprend sur
+    `ratings_matrix`. C'est `ratings_matrix` qui est sauvegardée avec le modèle.
+
     :param ratings_matrix: matrice utilisateur-film
+    :param engine_name: nom du moteur ("svd" ou "als")
     :param n_components: nombre de composantes latentes
-    :return: DataFrame des notes prédites
+    :param params: autres paramètres du moteur
+    :param fingerprint: empreinte des données ; sans empreinte, le modèle n'est ni relu ni sauvegardé
+    :param models_dir: dossier des modèles sauvegardés (par défaut MODELS_DIR)
+    :param training_matrix: notes d'entraînement, sur les axes de `ratings_matrix` (par défaut `ratings_matrix`)
+    :return: (moteur entraîné, version du modèle)
     """
     try:
-        # if Path(pkl_path).exists():
-        #     logger.info(f"Chargement du modèle depuis {pkl_path}")
-        #     with gzip.open(pkl_path, 'rb') as f:
-        #         pred_df = pickle.load(f)
-        #     return pred_df
-        svd = TruncatedSVD(n_components=min(n_components, ratings_matrix.shape[1]-1), random_state=42)
-        matrice_latente = svd.fit_transform(ratings_matrix)
-        predicted_ratings = np.dot(matrice_latente, svd.components_)
-        predicted_ratings_scaled = MinMaxScaler((0.5, 5)).fit_transform(predicted_ratings)
-        pred_df = pd.DataFrame(predicted_ratings_scaled, index=ratings_matrix.index, columns=ratings_matrix.columns).astype(np.float32)
-        #  # Sauvegarder le modèle compressé
-        # with gzip.open(pkl_path, 'wb') as f:
-        #     pickle.dump(pred_df, f)
-        logger.info(f"Modèle entraîné et sauvegardé à {pkl_path}")
-        return pred_df
+        engine = make_engine(engine_name, n_components, **(params if params is not None else RECO_ENGINE_PARAMS))
+        version = model_version(engine, fingerprint)
+        model_path = model_dir(engine, version, models_dir)
+        if fingerprint is not None and (model_path / "engine.json").exists():
+            logger.info(f"Chargement du modèle depuis {model_path}")
+            with observe(MODEL_LOAD, engine.name):
+                return RecommenderEngine.load(model_path), version
+
+        if training_matrix is ratings_matrix:
+            training_matrix = None
+        if training_matrix is not None and type(engine).fold_in is RecommenderEngine.fold_in:
+            logger.warning(f"Le moteur {engine.name} apprend sur toutes les notes, sans fenêtre d'entraînement.")
+            training_matrix = None
+        start = time.perf_counter()
+        with observe(MODEL_TRAIN, engine.name):
+            engine.fit(training_matrix if training_matrix is not None else ratings_matrix)
+            if training_matrix is not None:
+                # Utilisateurs sans note d'entraînement : facteurs tirés de tout leur historique
+                missing = np.flatnonzero((np.diff(training_matrix.indptr) == 0) & (np.diff(ratings_matrix.indptr) > 0))
+                if len(missing):
+                    engine.fold_in(ratings_matrix, missing)
+        logger.info(f"Modèle {engine.name} entraîné en {time.perf_counter() - start:.2f} s.")
+        if fingerprint is not None:
+            # Écriture dans un dossier temporaire puis renommage pour ne jamais exposer un modèle partiel
+            tmp_path = model_path.with_name(f".{model_path.name}.tmp")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            engine.save(tmp_path)
+            ratings_matrix.save(tmp_path / "ratings")
+            tmp_path.rename(model_path)
+            logger.info(f"Modèle sauvegardé à {model_path}")
+        return engine, version
     except Exception as e:
         logger.error(f"Erreur lors du chargement/entraînement du modèle : {e}")
+        return None, None
+
+
+class ModelState:
+    """
+    Modèle servi par l'API : moteur entraîné, matrice des notes et métadonnées des films.
+    """
+
+    def __init__(self, fingerprint, version, engine, ratings_matrix, films, film_ids, top_n_path):
+        self.fingerprint = fingerprint
+        self.version = version
+        self.engine = engine
+        self.ratings_matrix = ratings_matrix
+        self.films = films
+        self.film_ids = film_ids
+        self.top_n_path = top_n_path
+        self.checked_at = time.monotonic()
+        self._top_n = None
+        self._filters = None
+
+    @property
+    def filters(self) -> ItemFilters:
+        """Masques des filtres par genre et année sur l'axe des films, construits à la première demande."""
+        if self._filters is None:
+            self._filters = ItemFilters(self.films, self.film_ids)
+        return self._filters
+
+    @property
+    def top_n(self) -> Optional[TopNStore]:
+        """Recommandations précalculées pour ce modèle, dès que le précalcul est terminé."""
+        if self._top_n is None and self.top_n_path.exists():
+            self._top_n = TopNStore.load(self.top_n_path)
+        return self._top_n
+
+
+def load_model_state(fingerprint: str) -> Optional[ModelState]:
+    """
+    Charge le moteur configuré (entraîné si besoin), combiné au contenu si `RECO_CONTENT_WEIGHT` > 0.
+
+    Le moteur et la matrice des notes sont toujours servis depuis le modèle sauvegardé,
+    ouvert en mémoire mappée : avec plusieurs workers, une seule copie du modèle
+    occupe la mémoire. Un verrou de fichier garantit qu'un seul processus entraîne un
+    modèle manquant ; les autres attendent sa sauvegarde puis l'ouvrent.
+
+    :param fingerprint: empreinte des données
+    :return: ModelState, ou None en cas d'échec
+    """
+    model_path = None
+    try:
+        engine = make_engine(RECO_ENGINE, RECO_N_COMPONENTS, **RECO_ENGINE_PARAMS)
+        version = model_version(engine, fingerprint)
+        model_path = model_dir(engine, version)
+        with file_lock(model_path.with_name(f".{model_path.name}.lock")):
+            if not (model_path / "engine.json").exists():
+                with stage("data"):
+                    _, ratings_matrix, training_matrix = load_data()
+                if ratings_matrix is None:
+                    return None
+                with stage("train"):
+                    engine, version = get_or_train_model(ratings_matrix, fingerprint=fingerprint,
+                                                         training_matrix=training_matrix)
+                if engine is None:
+                    return None
+                del ratings_matrix, training_matrix
+        with stage("train"):
+            engine, ratings_matrix = load_model_artifact(model_path)
+        with stage("data"), connect_read_only(FILMS_PATH) as conn:
+            films = load_films(conn)
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement du modèle {model_path} : {e}")
+        return None
+    film_ids = ratings_matrix.film_ids
+    top_n_path = model_dir(engine, version) / "top_n"
+    if RECO_CONTENT_WEIGHT > 0:
+        content_index = get_content_index(FILMS_PATH)
+        if content_index is not None and len(content_index):
+            engine = ContentBlendEngine(engine, ratings_matrix, content_index, RECO_CONTENT_WEIGHT)
+            film_ids = engine.film_ids
+            top_n_path = top_n_path.with_name(f"top_n-content-{RECO_CONTENT_WEIGHT}-{len(content_index)}")
+    return ModelState(fingerprint, version, engine, ratings_matrix, films, film_ids, top_n_path)
+
+
+_model_state: Optional[ModelState] = None
+_model_lock = threading.Lock()
+
+
+def _precompute_once(state: ModelState):
+    """Précalcule le top-N du modèle, sauf si un autre worker s'en charge déjà."""
+    with file_lock(state.top_n_path.with_name(f".{state.top_n_path.name}.lock"), blocking=False) as acquired:
+        if acquired and not state.top_n_path.exists():
+            precompute_top_n(state.engine, state.ratings_matrix, state.top_n_path, RECO_PRECOMPUTE_TOP_N,
+                             film_ids=state.film_ids)
+
+
+def get_model_state() -> Optional[ModelState]:
+    """
+    Retourne le modèle servi, en le rechargeant ou réentraînant si les données ont changé.
+
+    Les données ne sont revérifiées qu'après `RECO_MODEL_CHECK_INTERVAL` secondes.
+    """
+    global _model_state
+    state = _model_state
+    if state is not None and time.monotonic() - state.checked_at < RECO_MODEL_CHECK_INTERVAL:
+        record_cache("model", True)
+        return state
+
+    with _model_lock:
+        state = _model_state
+        if state is not None and time.monotonic() - state.checked_at < RECO_MODEL_CHECK_INTERVAL:
+            record_cache("model", True)
+            return state
+        with stage("fingerprint"), connect_read_only(FILMS_PATH) as conn:
+            fingerprint = data_fingerprint(conn)
+        if state is not None and state.fingerprint == fingerprint:
+            state.checked_at = time.monotonic()
+            record_cache("model", True)
+            return state
+
+        record_cache("model", False)
+        new_state = load_model_state(fingerprint)
+        if new_state is None:
+            return state
+        MODEL_MEMORY.labels("engine").set(new_state.engine.nbytes)
+        MODEL_MEMORY.labels("ratings").set(new_state.ratings_matrix.nbytes)
+        MODEL_MEMORY.labels("films").set(new_state.films.nbytes)
+        if RECO_PRECOMPUTE_TOP_N > 0 and not new_state.top_n_path.exists():
+            threading.Thread(target=_precompute_once, args=(new_state,), daemon=True).start()
+        _model_state = new_state
+        return _model_state
+
+
+def top_n(scores: np.ndarray, n: int) -> np.ndarray:
+    """Indices des `n` meilleurs scores, triés par score décroissant."""
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    if n < len(scores):
+        candidates = np.argpartition(scores, -n)[-n:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def score_live(user_id: int, ratings_matrix: RatingsMatrix, engine: RecommenderEngine, nombre_de_recommandation: int,
+               film_ids: Optional[np.ndarray] = None, mask: Optional[np.ndarray] = None):
+    """
+    Calcule à la volée les meilleurs films non vus d'un utilisateur.
+
+    :param film_ids: identifiants des films de l'axe des scores (par défaut, ceux de la matrice)
+    :param mask: films autorisés sur l'axe des scores (par défaut, tous)
+    :return: (identifiants des films, scores), ou None si l'utilisateur est inconnu du modèle
+    """
+    user_index = ratings_matrix.user_index(user_id) if ratings_matrix is not None else None
+    if engine is None or user_index is None:
         return None
 
-def get_recommendation(user_id: int, ratings_df: pd.DataFrame, movies_df: pd.DataFrame, pred_df: pd.DataFrame, nombre_de_recommandation: int = 5) -> RecommendResponse:
+    # récupérer directement les films déjà vus et filtrer les prédictions
+    seen = ratings_matrix.seen(user_index)
+    scores = engine.score_user(user_index)
+    if mask is None:
+        scores[seen] = -np.inf
+        n_candidates = len(scores) - len(seen)
+    else:
+        allowed = mask.copy()
+        allowed[seen] = False
+        scores[~allowed] = -np.inf
+        n_candidates = int(np.count_nonzero(allowed))
+    best = top_n(scores, min(nombre_de_recommandation, n_candidates))
+    return (film_ids if film_ids is not None else ratings_matrix.film_ids)[best], scores[best]
+
+
+def get_recommendation(user_id: int, ratings_matrix: RatingsMatrix, films: FilmCatalog, engine: RecommenderEngine, nombre_de_recommandation: int = 5, top_n_store: Optional[TopNStore] = None, film_ids: Optional[np.ndarray] = None, mask: Optional[np.ndarray] = None) -> RecommendResponse:
     """
     Génère des recommandations de films pour un utilisateur donné.
 
+    Les recommandations précalculées sont utilisées quand elles existent ; sinon
+    (utilisateur absent du dernier précalcul, liste plus longue que le top-N
+    précalculé) elles sont calculées à la volée. Un filtre (`mask`) est appliqué aux
+    scores avant la sélection des meilleurs films.
+
     :param user_id: identifiant de l'utilisateur
-    :param ratings_df: DataFrame des notes
-    :param movies_df: DataFrame des films
-    :param pred_df: Prédictions du modèle
+    :param ratings_matrix: matrice utilisateur-film des notes
+    :param films: catalogue des films (titres et affiches)
+    :param engine: moteur de recommandation entraîné
     :param nombre_de_recommandation: nombre de films à recommander
+    :param top_n_store: recommandations précalculées pour ce moteur
+    :param film_ids: identifiants des films de l'axe des scores du moteur
+    :param mask: films autorisés sur l'axe des scores (voir `ItemFilters`)
     :return: RecommendResponse contenant la liste des recommandations
     """
     try:
-        if pred_df is None or user_id not in pred_df.index:
+        with stage("score"):
+            best = top_n_store.lookup(user_id, nombre_de_recommandation, mask) if top_n_store is not None else None
+            record_cache("top_n", best is not None)
+            if best is None:
+                best = score_live(user_id, ratings_matrix, engine, nombre_de_recommandation, film_ids, mask)
+        if best is None:
             logger.warning(f"Utilisateur {user_id} introuvable dans les prédictions.")
             return RecommendResponse(user_id=user_id, recommendations=[])
 
-        # récupérer directement les films déjà vus et filtrer les prédictions
-        seen = set(ratings_df.loc[ratings_df.user_id == user_id, 'film_id'])
-        preds = pred_df.loc[user_id].drop(labels=seen, errors='ignore')
-        if preds.empty:
+        film_ids, scores = best
+        if len(film_ids) == 0:
             logger.info(f"Aucune recommandation disponible pour l'utilisateur {user_id}.")
             return RecommendResponse(user_id=user_id, recommendations=[])
-        
-        recos = []
-        for film_id, score in preds.nlargest(nombre_de_recommandation).items():
-            # À l'intérieur de la boucle, récupère les infos du film de manière sécurisée
-            poster = None
-            title = "Titre inconnu"
-
-            film_row = movies_df.loc[movies_df.film_id == film_id]
-
-            if not film_row.empty:
-                if 'poster_path' in film_row.columns:
-                    poster = film_row['poster_path'].iat[0]
-                if 'title' in film_row.columns:
-                    title = film_row['title'].iat[0]
-
-            recos.append(
+
+        with stage("metadata"):
+            titles, posters = films.lookup(film_ids)
+            recos = [
                 Recommendation(
                     movie_id=film_id,
-                    title=title,
+                    title=title if title is not None else "Titre inconnu",
                     rating_predicted=score,
                     poster_path=poster
                 )
-            )
+                for film_id, score, title, poster in zip(film_ids.tolist(), scores.tolist(), titles, posters)
+            ]
 
         logger.info(f"{len(recos)} recommandations générées pour l'utilisateur {user_id}.")
         return RecommendResponse(user_id=user_id, recommendations=recos)
@@ -117,44 +1316,81 @@ def get_recommendation(user_id: int, ratings_df: pd.DataFrame, movies_df: pd.Dat
 
 
 
-def recommend_movies(user_id: int, nombre_de_recommandation: int = 10) -> RecommendResponse:
+def recommend_movies(user_id: int, nombre_de_recommandation: int = 10, genres: Optional[List[str]] = None,
+                     year_from: Optional[int] = None, year_to: Optional[int] = None,
+                     state: Optional[ModelState] = None) -> RecommendResponse:
     """
     Point d'entrée principal pour générer des recommandations pour un utilisateur.
+
+    :param genres: ne recommander que des films ayant au moins un de ces genres
+    :param year_from: première année de sortie acceptée
+    :param year_to: dernière année de sortie acceptée
+    :param state: modèle à utiliser (par défaut, le modèle servi)
     """
     try:
-        ratings_df, movies_df, ratings_matrix = load_data()
-        if ratings_df is None:
+        state = state if state is not None else get_model_state()
+        if state is None:
             return RecommendResponse(user_id=user_id, recommendations=[])
-        pred_df = get_or_train_model(ratings_matrix)
-        return get_recommendation(user_id, ratings_df, movies_df, pred_df, nombre_de_recommandation)
+        with stage("filter"):
+            mask = state.filters.mask(genres, year_from, year_to)
+        return get_recommendation(user_id, state.ratings_matrix, state.films, state.engine, nombre_de_recommandation, state.top_n, state.film_ids, mask)
     except Exception as e:
         logger.error(f"Erreur dans recommend_movies pour l'utilisateur {user_id} : {e}")
         return RecommendResponse(user_id=user_id, recommendations=[])
 
 
+def recommend_movies_json(user_id: int, nombre_de_recommandation: int = 10, genres: Optional[List[str]] = None,
+                          year_from: Optional[int] = None, year_to: Optional[int] = None) -> bytes:
+    """
+    Recommandations sérialisées en JSON, servies depuis le cache des réponses quand c'est possible.
+
+    Les réponses vides (utilisateur inconnu, aucun film pour le filtre, erreur) ne sont
+    pas conservées : une erreur passagère n'est jamais resservie.
 
-def evaluate_model(ratings_matrix, n_components=20):
+    :param genres: ne recommander que des films ayant au moins un de ces genres
+    :param year_from: première année de sortie acceptée
+    :param year_to: dernière année de sortie acceptée
+    :return: RecommendResponse en JSON
     """
-    Évalue le modèle SVD avec les métriques RMSE et MAE.
+    try:
+        state = get_model_state()
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement du modèle pour l'utilisateur {user_id} : {e}")
+        state = None
+    if state is None:
+        return RecommendResponse(user_id=user_id, recommendations=[]).model_dump_json().encode()
+
+    cache = get_response_cache()
+    params = (nombre_de_recommandation, tuple(sorted(set(genres))) if genres else None, year_from, year_to)
+    if cache is not None:
+        payload = cache.get(state.version, user_id, params)
+        if payload is not None:
+            return payload
+    response = recommend_movies(user_id, nombre_de_recommandation, genres, year_from, year_to, state=state)
+    with stage("serialize"):
+        payload = response.model_dump_json().encode()
+    if cache is not None and response.recommendations:
+        cache.put(state.version, user_id, params, payload)
+    return payload
+
+
+
+def evaluate_model(ratings_matrix: RatingsMatrix, engine_name: str = RECO_ENGINE, n_components: int = RECO_N_COMPONENTS, **params):
+    """
+    Évalue un moteur de recommandation avec les métriques RMSE et MAE sur des notes mises de côté.
 
     :param ratings_matrix: matrice utilisateur-film
+    :param engine_name: nom du moteur ("svd" ou "als")
     :param n_components: dimensions latentes
     :return: tuple (rmse, mae)
     """
     try:
-        train_matrix, test_matrix = train_test_split(ratings_matrix, test_size=0.2, random_state=42)
-        model = TruncatedSVD(n_components=n_components, random_state=42)
-        model.fit(train_matrix)
-        predicted_matrix = np.dot(model.transform(train_matrix), model.components_)
-
-        test_values = test_matrix.values
-        mask = test_values != 0
-
-        true_ratings = test_values[mask]
-        predicted_ratings = predicted_matrix[mask]
+        train_matrix, test_rows, test_cols, test_values = ratings_matrix.split(test_size=0.2, seed=42)
+        engine = make_engine(engine_name, n_components, **params).fit(train_matrix)
+        predicted_ratings = predict_ratings(engine, test_rows, test_cols)
 
-        rmse = np.sqrt(mean_squared_error(true_ratings, predicted_ratings))
-        mae = mean_absolute_error(true_ratings, predicted_ratings)
+        rmse = float(np.sqrt(np.mean((predicted_ratings - test_values) ** 2)))
+        mae = float(np.mean(np.abs(predicted_ratings - test_values)))
 
         logger.info(f"Évaluation du modèle : RMSE={rmse:.4f}, MAE={mae:.4f}")
         return rmse, mae
@@ -163,3 +1399,19 @@ def evaluate_model(ratings_matrix, n_components=20):
         return None, None
 
 
+def predict_ratings(engine: RecommenderEngine, rows: np.ndarray, cols: np.ndarray, batch_size: int = 1024) -> np.ndarray:
+    """
+    Notes prédites pour des couples (utilisateur, film), calculées par lots d'utilisateurs.
+
+    :param engine: moteur entraîné
+    :param rows: positions des utilisateurs
+    :param cols: positions des films
+    :return: tableau des notes prédites
+    """
+    predicted = np.empty(len(rows), dtype=np.float32)
+    users, inverse = np.unique(rows, return_inverse=True)
+    for start in range(0, len(users), batch_size):
+        scores = engine.score_batch(users[start:start + batch_size])
+        in_batch = (inverse >= start) & (inverse < start + batch_size)
+        predicted[in_batch] = scores[inverse[in_batch] - start, cols[in_batch]]
+    return predicted
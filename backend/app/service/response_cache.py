@@ -0,0 +1,116 @@
+"""
+Cache en mémoire des réponses de recommandation déjà sérialisées, par utilisateur.
+
+Une réponse dépend de l'utilisateur, du nombre de films demandés, des filtres (genres,
+années) et du modèle servi. Elle est conservée telle qu'envoyée (JSON) avec la version
+du modèle qui l'a calculée, et n'est resservie que tant que cette version est servie.
+Une nouvelle note change l'empreinte des données, donc la version du modèle : au
+premier accès avec la nouvelle version, tout le cache est vidé, puisqu'un nouvel
+entraînement change les scores de tous les utilisateurs.
+
+Il n'y a pas d'invalidation par utilisateur : les notes sont immuables pendant qu'un
+modèle est servi. L'API lit en lecture seule l'instantané publié de la base, et les
+notes n'y changent que par la publication d'un nouvel instantané (`app.utils.snapshots`).
+`get_model_state` détecte alors la nouvelle empreinte au plus tard après
+`RECO_MODEL_CHECK_INTERVAL` secondes et réentraîne avant de répondre. Une fois le
+nouveau modèle servi, aucune réponse calculée avant la nouvelle note n'est resservie,
+dans aucun worker. Si le nouveau modèle ne peut pas être chargé, l'ancien reste servi
+avec ses réponses. Une route qui écrirait des notes dans la base servie devrait
+retirer de ce cache les réponses de l'utilisateur concerné. Le cache étant propre à
+chaque worker, il faudrait le faire dans chacun.
+
+Le cache est borné à `RECO_RESPONSE_CACHE_MB` Mo par processus (0 le désactive) ; les
+réponses les moins récemment servies sont retirées en premier. Les accès sont comptés
+dans `reco_cache_requests_total{cache="responses"}`.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from ..utils.metrics import RESPONSE_CACHE_BYTES, record_cache
+
+RECO_RESPONSE_CACHE_MB = float(os.getenv("RECO_RESPONSE_CACHE_MB", "64"))
+# Coût mémoire approximatif d'une entrée en plus de la réponse (clé, nœuds des dictionnaires)
+ENTRY_OVERHEAD = 200
+
+
+class ResponseCache:
+    """
+    Cache LRU de réponses sérialisées, indexé par utilisateur et paramètres de la requête.
+
+    :param max_bytes: taille maximale des réponses conservées (octets)
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.version = None
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, version: str, user_id: int, params: Hashable) -> Optional[bytes]:
+        """
+        Réponse conservée pour cette version du modèle, ou None.
+
+        :param version: version du modèle servi
+        :param user_id: identifiant de l'utilisateur
+        :param params: paramètres de la requête (nombre de films, filtres)
+        """
+        with self._lock:
+            if version != self.version:
+                self._clear()
+                self.version = version
+            payload = self._entries.get((user_id, params))
+            if payload is not None:
+                self._entries.move_to_end((user_id, params))
+        record_cache("responses", payload is not None)
+        return payload
+
+    def put(self, version: str, user_id: int, params: Hashable, payload: bytes):
+        """Conserve une réponse, sauf si le modèle servi a changé pendant son calcul."""
+        size = len(payload) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            key = (user_id, params)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = payload
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+            RESPONSE_CACHE_BYTES.set(self.nbytes)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _remove(self, key):
+        payload = self._entries.pop(key)
+        self.nbytes -= len(payload) + ENTRY_OVERHEAD
+
+    def _clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+        RESPONSE_CACHE_BYTES.set(0)
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Cache des réponses du processus, ou None s'il est désactivé (`RECO_RESPONSE_CACHE_MB=0`)."""
+    global _response_cache
+    if RECO_RESPONSE_CACHE_MB <= 0:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(int(RECO_RESPONSE_CACHE_MB * 1024 * 1024))
+        return _response_cache
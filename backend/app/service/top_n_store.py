@@ -0,0 +1,185 @@
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+from ..utils.metrics import TOP_N_PRECOMPUTE
+
+# Nombre de films précalculés par utilisateur après chaque entraînement (0 pour désactiver)
+RECO_PRECOMPUTE_TOP_N = int(os.getenv("RECO_PRECOMPUTE_TOP_N", "100"))
+
+
+class TopNStore:
+    """
+    Recommandations précalculées : pour chaque utilisateur, les N films non vus les mieux notés.
+
+    Les tableaux sont des fichiers `.npy` ouverts en mémoire mappée. Une table
+    d'adressage directe `user_rows` (indexée par identifiant utilisateur) donne la
+    ligne de chaque utilisateur en O(1).
+    """
+
+    _arrays = ("user_ids", "film_ids", "items", "scores")
+
+    def __init__(self, user_ids, film_ids, items, scores, user_rows=None):
+        self.user_ids = user_ids
+        self.film_ids = film_ids
+        self.items = items
+        self.scores = scores
+        self.user_rows = user_rows
+
+    @property
+    def n(self):
+        return self.items.shape[1]
+
+    def row(self, user_id: int) -> Optional[int]:
+        """Ligne de l'utilisateur dans le store, ou None s'il n'a pas été précalculé."""
+        if self.user_rows is not None:
+            if 0 <= user_id < len(self.user_rows):
+                row = int(self.user_rows[user_id])
+                return row if row >= 0 else None
+            return None
+        position = int(np.searchsorted(self.user_ids, user_id))
+        if position < len(self.user_ids) and self.user_ids[position] == user_id:
+            return position
+        return None
+
+    def lookup(self, user_id: int, n: int, mask: Optional[np.ndarray] = None):
+        """
+        Meilleures recommandations précalculées d'un utilisateur.
+
+        Avec un filtre, les films précalculés qui le satisfont sont gardés dans l'ordre :
+        c'est le top filtré exact tant qu'il en reste au moins `n` (tout film filtré hors
+        du top-N a un score inférieur), ou si le top-N contient tous les films non vus.
+
+        :param user_id: identifiant de l'utilisateur
+        :param n: nombre de recommandations souhaitées
+        :param mask: films autorisés, indexé comme `film_ids` (par défaut, tous)
+        :return: (identifiants des films, scores), ou None si le store ne peut pas répondre
+        """
+        if n <= 0:
+            return self.film_ids[:0], np.empty(0, dtype=self.scores.dtype)
+        if n > self.n:
+            return None
+        row = self.row(user_id)
+        if row is None:
+            return None
+        if mask is None:
+            items = self.items[row, :n]
+            items = items[items >= 0]
+            return self.film_ids[items], self.scores[row, :len(items)]
+
+        items = self.items[row]
+        complete = items[-1] < 0
+        items = items[items >= 0]
+        kept = np.flatnonzero(mask[items])[:n]
+        if len(kept) < n and not complete:
+            return None
+        return self.film_ids[items[kept]], self.scores[row, kept]
+
+    @classmethod
+    def load(cls, path: Path) -> "TopNStore":
+        arrays = [np.load(path / f"{name}.npy", mmap_mode="r") for name in cls._arrays]
+        user_rows_path = path / "user_rows.npy"
+        user_rows = np.load(user_rows_path, mmap_mode="r") if user_rows_path.exists() else None
+        return cls(*arrays, user_rows=user_rows)
+
+
+def precompute_top_n(engine, ratings_matrix, path: Path, n: int = RECO_PRECOMPUTE_TOP_N,
+                     workers: Optional[int] = None, chunk_mb: int = 64, film_ids=None) -> TopNStore:
+    """
+    Calcule les N meilleurs films non vus de tous les utilisateurs et les écrit dans `path`.
+
+    Les utilisateurs sont traités par blocs en parallèle sur un pool de threads (le
+    produit matriciel et la sélection partielle libèrent le GIL). Le store est écrit
+    dans un dossier temporaire puis renommé pour ne jamais être lu incomplet.
+
+    :param engine: moteur de recommandation entraîné
+    :param ratings_matrix: matrice des notes ayant servi à l'entraînement
+    :param path: dossier de destination
+    :param n: nombre de films par utilisateur
+    :param workers: nombre de threads (par défaut, nombre de cœurs)
+    :param chunk_mb: taille visée en Mo de la matrice de scores d'un bloc
+    :param film_ids: identifiants des films de l'axe des scores du moteur (par défaut, ceux de la matrice)
+    :return: TopNStore chargé depuis `path`
+    """
+    start_time = time.perf_counter()
+    film_ids = np.asarray(film_ids if film_ids is not None else ratings_matrix.film_ids)
+    n_users, n_films = ratings_matrix.shape[0], len(film_ids)
+    n = min(n, n_films)
+    chunk_size = max(1, chunk_mb * 1_000_000 // (4 * max(n_films, 1)))
+
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+    items = np.lib.format.open_memmap(tmp_path / "items.npy", mode="w+", dtype=np.int32, shape=(n_users, n))
+    scores = np.lib.format.open_memmap(tmp_path / "scores.npy", mode="w+", dtype=np.float32, shape=(n_users, n))
+
+    def process(start):
+        end = min(start + chunk_size, n_users)
+        block = engine.score_batch(np.arange(start, end))
+        indptr = ratings_matrix.indptr
+        rows = np.repeat(np.arange(end - start), np.diff(indptr[start:end + 1]))
+        block[rows, ratings_matrix.indices[indptr[start]:indptr[end]]] = -np.inf
+        if n < n_films:
+            top = np.argpartition(block, n_films - n, axis=1)[:, n_films - n:]
+        else:
+            top = np.broadcast_to(np.arange(n_films), block.shape).copy()
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        top[np.isneginf(top_scores)] = -1
+        items[start:end] = top
+        scores[start:end] = top_scores
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        list(pool.map(process, range(0, n_users, chunk_size)))
+    items.flush()
+    scores.flush()
+    del items, scores
+
+    user_ids = np.asarray(ratings_matrix.user_ids)
+    np.save(tmp_path / "user_ids.npy", user_ids)
+    np.save(tmp_path / "film_ids.npy", film_ids)
+    # Table d'adressage directe si les identifiants sont assez denses
+    if n_users and user_ids[0] >= 0 and user_ids[-1] < 4 * n_users + 1024:
+        user_rows = np.full(int(user_ids[-1]) + 1, -1, dtype=np.int32)
+        user_rows[user_ids] = np.arange(n_users, dtype=np.int32)
+        np.save(tmp_path / "user_rows.npy", user_rows)
+
+    shutil.rmtree(path, ignore_errors=True)
+    tmp_path.rename(path)
+    TOP_N_PRECOMPUTE.observe(time.perf_counter() - start_time)
+    logger.info(f"Top-{n} précalculé pour {n_users} utilisateurs en {time.perf_counter() - start_time:.2f} s.")
+    return TopNStore.load(path)
+
+
+def main():
+    """
+    Tâche batch : entraîne (ou recharge) le modèle configuré puis précalcule le top-N de tous les utilisateurs.
+    """
+    import argparse
+    from ..utils.db import connect_read_only
+    from .recommendation_service import FILMS_PATH, data_fingerprint, load_model_state
+
+    parser = argparse.ArgumentParser(description="Précalcul des recommandations de tous les utilisateurs.")
+    parser.add_argument("--top-n", type=int, default=RECO_PRECOMPUTE_TOP_N or 100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with connect_read_only(FILMS_PATH) as conn:
+        fingerprint = data_fingerprint(conn)
+    state = load_model_state(fingerprint)
+    if state is None:
+        return
+    precompute_top_n(state.engine, state.ratings_matrix, state.top_n_path, n=args.top_n, workers=args.workers,
+                     film_ids=state.film_ids)
+
+
+if __name__ == "__main__":
+    main()
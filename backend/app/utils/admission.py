@@ -0,0 +1,181 @@
+"""
+Contrôle d'admission : limite le nombre de requêtes traitées en même temps par classe de routes.
+
+Les routes sont réparties en deux budgets : `expensive` (recommandations, par défaut) et
+`cheap` (catalogue, statistiques...). Chaque budget admet au plus `concurrency` requêtes
+à la fois ; les suivantes attendent dans une file bornée (`queue`) pendant au plus
+`timeout` secondes. Une requête qui trouve la file pleine, ou qui attend trop longtemps,
+est refusée immédiatement par une 503 avec l'en-tête `Retry-After` : le client réessaie
+plus tard au lieu d'allonger une file que le serveur ne résorbera pas.
+
+Les routes synchrones s'exécutent dans le pool de threads d'anyio : sa taille est portée
+à la somme des deux budgets, si bien que les recommandations ne peuvent jamais occuper
+les threads dont les routes légères ont besoin. Les routes de supervision (`/metrics`,
+`/admin`) ne sont pas limitées.
+
+Configuration (variables d'environnement, `<BUDGET>` valant `EXPENSIVE` ou `CHEAP`) :
+`ADMISSION_<BUDGET>_CONCURRENCY`, `ADMISSION_<BUDGET>_QUEUE`, `ADMISSION_<BUDGET>_TIMEOUT`,
+`ADMISSION_<BUDGET>_RETRY_AFTER`, `ADMISSION_EXPENSIVE_ROUTES` (préfixes de chemins
+séparés par des virgules), `ADMISSION_EXEMPT_ROUTES` ; `ADMISSION_ENABLED=0` désactive
+le contrôle.
+"""
+import asyncio
+import math
+import os
+import time
+
+from starlette.responses import JSONResponse
+
+from .metrics import ADMISSION_IN_FLIGHT, ADMISSION_LIMIT, ADMISSION_QUEUED, ADMISSION_REJECTED, ADMISSION_WAIT
+from .timing import stage
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") != "0"
+ADMISSION_EXPENSIVE_ROUTES = tuple(
+    prefix for prefix in os.getenv("ADMISSION_EXPENSIVE_ROUTES", "/recommendation_movies").split(",") if prefix
+)
+ADMISSION_EXEMPT_ROUTES = tuple(prefix for prefix in os.getenv("ADMISSION_EXEMPT_ROUTES", "/metrics,/admin").split(",") if prefix)
+# Marge du pool de threads pour les routes non limitées
+EXEMPT_THREADS = 4
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionBudget:
+    """
+    Nombre borné de requêtes simultanées, précédé d'une file d'attente bornée.
+
+    :param name: nom du budget (libellé des métriques)
+    :param concurrency: requêtes traitées simultanément au plus
+    :param queue: requêtes en attente au plus ; au-delà, refus immédiat
+    :param timeout: attente maximale (secondes) avant refus
+    :param retry_after: délai conseillé au client après un refus (secondes)
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int, timeout: float, retry_after: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = None
+        self._in_flight_gauge = ADMISSION_IN_FLIGHT.labels(name)
+        self._queued_gauge = ADMISSION_QUEUED.labels(name)
+        self._wait = ADMISSION_WAIT.labels(name)
+        ADMISSION_LIMIT.labels(name).set(concurrency)
+
+    @classmethod
+    def from_env(cls, name: str, concurrency: int, queue: int, timeout: float, retry_after: float) -> "AdmissionBudget":
+        prefix = f"ADMISSION_{name.upper()}"
+        return cls(
+            name,
+            concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+            queue=int(os.getenv(f"{prefix}_QUEUE", str(queue))),
+            timeout=float(os.getenv(f"{prefix}_TIMEOUT", str(timeout))),
+            retry_after=float(os.getenv(f"{prefix}_RETRY_AFTER", str(retry_after))),
+        )
+
+    async def acquire(self):
+        """
+        Attend une place dans le budget.
+
+        :raises AdmissionRejected: file pleine (`queue_full`) ou attente trop longue (`timeout`)
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self._semaphore.locked():
+            if self.waiting >= self.queue:
+                self._reject("queue_full")
+            start = time.perf_counter()
+            self.waiting += 1
+            self._queued_gauge.inc()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self._reject("timeout")
+            finally:
+                self.waiting -= 1
+                self._queued_gauge.dec()
+            self._wait.observe(time.perf_counter() - start)
+        else:
+            await self._semaphore.acquire()
+            self._wait.observe(0.0)
+        self.in_flight += 1
+        self._in_flight_gauge.inc()
+
+    def release(self):
+        self.in_flight -= 1
+        self._in_flight_gauge.dec()
+        self._semaphore.release()
+
+    def _reject(self, reason: str):
+        ADMISSION_REJECTED.labels(self.name, reason).inc()
+        raise AdmissionRejected(reason)
+
+
+def default_budgets() -> dict:
+    cpus = os.cpu_count() or 1
+    return {
+        "expensive": AdmissionBudget.from_env("expensive", concurrency=cpus, queue=4 * cpus, timeout=10, retry_after=2),
+        "cheap": AdmissionBudget.from_env("cheap", concurrency=32, queue=256, timeout=5, retry_after=1),
+    }
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI appliquant le contrôle d'admission avant le traitement de la requête.
+    """
+
+    def __init__(self, app, budgets: dict = None, enabled: bool = ADMISSION_ENABLED):
+        self.app = app
+        self.enabled = enabled
+        self.budgets = budgets if budgets is not None else default_budgets()
+        self._threads_sized = False
+
+    def budget_for(self, path: str):
+        if path.startswith(ADMISSION_EXEMPT_ROUTES):
+            return None
+        if path.startswith(ADMISSION_EXPENSIVE_ROUTES):
+            return self.budgets["expensive"]
+        return self.budgets["cheap"]
+
+    def _size_thread_pool(self):
+        """Dimensionne le pool de threads des routes synchrones sur la somme des budgets."""
+        from anyio.to_thread import current_default_thread_limiter
+
+        limiter = current_default_thread_limiter()
+        limiter.total_tokens = max(limiter.total_tokens,
+                                   sum(budget.concurrency for budget in self.budgets.values()) + EXEMPT_THREADS)
+        self._threads_sized = True
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        if not self._threads_sized:
+            self._size_thread_pool()
+
+        budget = self.budget_for(scope["path"])
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            with stage("admission"):
+                await budget.acquire()
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                {"detail": "Serveur surchargé, réessayez plus tard", "reason": e.reason},
+                status_code=503,
+                headers={"Retry-After": str(math.ceil(budget.retry_after))},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            budget.release()
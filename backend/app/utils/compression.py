@@ -0,0 +1,176 @@
+"""
+Compression des réponses selon l'en-tête `Accept-Encoding` du client.
+
+Les encodages sont essayés dans l'ordre de `COMPRESSION_ENCODINGS` (par défaut zstd, puis
+brotli, puis gzip) ; zstd et brotli ne sont proposés que si les paquets `zstandard` et
+`brotli` (ou `brotlicffi`) sont installés, gzip l'est toujours. Une réponse d'un seul bloc
+n'est compressée qu'au-delà de `COMPRESSION_MIN_SIZE` octets ; une réponse en flux
+(`StreamingResponse`) est compressée bloc par bloc et chaque bloc est vidé aussitôt, pour
+que le client reçoive les premiers octets sans attendre la fin du flux. Les types déjà
+compressés (images) et les réponses portant déjà un `Content-Encoding` sont laissés tels quels.
+"""
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_ENCODINGS = [encoding.strip() for encoding in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",")]
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+ENCODERS = {"gzip": GzipEncoder}
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+
+
+def negotiate(accept_encoding: str, encodings: list = COMPRESSION_ENCODINGS):
+    """
+    Premier encodage de `encodings` accepté par le client (q > 0), ou None.
+
+    :param accept_encoding: valeur de l'en-tête `Accept-Encoding`
+    :param encodings: encodages du serveur, par ordre de préférence
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in encodings:
+        if encoding in ENCODERS and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI compressant les réponses JSON et texte (voir le docstring du module).
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = negotiate(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder
+            if message["type"] == "http.response.start":
+                # Les en-têtes sont retenus jusqu'au premier bloc, qui décide de la compression
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = [(key.lower(), value) for key, value in start["headers"]]
+                content_type = next((value for key, value in headers if key == b"content-type"), b"").decode("latin-1")
+                compress = (
+                    content_type.startswith(COMPRESSIBLE_TYPES)
+                    and not any(key == b"content-encoding" for key, _ in headers)
+                    and (more_body or len(body) >= self.minimum_size)
+                )
+                if not compress:
+                    await send(start)
+                    await send(message)
+                    return
+                encoder = ENCODERS[encoding]()
+                headers = [(key, value) for key, value in headers if key != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                vary = b", ".join(value for key, value in headers if key == b"vary")
+                headers = [(key, value) for key, value in headers if key != b"vary"]
+                headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+                if not more_body:
+                    # Réponse d'un seul bloc : taille connue
+                    data = encoder.compress(body) + encoder.finish()
+                    headers.append((b"content-length", str(len(data)).encode("latin-1")))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": data})
+                    encoder = None
+                    return
+                await send({**start, "headers": headers})
+
+            if encoder is None:
+                await send(message)
+                return
+            data = encoder.compress(body) if body else b""
+            if not more_body:
+                data += encoder.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
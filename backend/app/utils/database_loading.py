@@ -4,14 +4,19 @@ from sqlalchemy.exc import IntegrityError
 import pandas as pd
 import json
 import logging
+import os
+import sys
 import time
 from datetime import datetime
-
-# Configuration de la base de données avec DuckDB
-engine = create_engine('duckdb:///backend/app/utils/data/films_reco.db')
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+from app.service.content_index import build_content_index
+from app.utils.db import connect_read_only
+from app.utils.snapshots import films_db_path, staging_snapshot
+
+# Base servie par l'API. Les chargements écrivent dans un nouvel instantané
+# (voir app.utils.snapshots), publié à la fin : l'API n'est jamais bloquée.
+DB_PATH = films_db_path()
 Base = declarative_base()
-SessionLocal = sessionmaker(bind=engine)
-session = SessionLocal()
 
 
 class Film(Base):
@@ -54,16 +59,23 @@ class Rating(Base):
         return f"<Rating(user_id={self.user_id}, movie_id={self.film_id}, rating={self.rating})>"
 
 
-# Création des tables dans la base de données si elles n'existent pas déjà
-Base.metadata.create_all(engine)
+def create_tables(db_engine):
+    """
+    Crée les tables 'films' et 'ratings' dans la base si elles n'existent pas déjà.
 
+    :param db_engine: moteur SQLAlchemy de la base cible
+    """
+    Base.metadata.create_all(db_engine)
 
-def add_film_from_json():
+
+def add_film_from_json(db_engine):
     """
     Charge les films depuis deux fichiers JSON (films + genres), puis insère les données
     dans la table 'films' en évitant les doublons.
+
+    :param db_engine: moteur SQLAlchemy de la base cible
     """
-    session = SessionLocal()
+    session = sessionmaker(bind=db_engine)()
 
     with open("backend/app/utils/data/movies_database.json", "r", encoding="utf-8") as f:
         all_movies = json.load(f)
@@ -113,6 +125,19 @@ def add_film_from_json():
     print("\nFilms insérés ou mis à jour :")
     for film in session.query(Film).limit(5):
         print(film)
+    session.close()
+
+
+def update_content_index(db_path=DB_PATH):
+    """
+    Ajoute les nouveaux films à l'index de contenu (genres + description) utilisé
+    pour les films similaires et les films encore sans notes.
+
+    :param db_path: base servie, lue dans son instantané publié
+    """
+    with connect_read_only(db_path) as conn:
+        index = build_content_index(conn)
+    print(f"Index de contenu à jour : {len(index)} films.")
 
 
 # Configuration du logger
@@ -120,12 +145,15 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
-def add_rating_from_csv():
+def add_rating_from_csv(db_engine):
     """
     Charge les évaluations de films depuis un fichier CSV et les insère dans la table 'ratings'
     par lots pour améliorer les performances.
+
+    :param db_engine: moteur SQLAlchemy de la base cible
     """
     BATCH_SIZE = 25000
+    session = sessionmaker(bind=db_engine)()
     try:
         logger.info("Lecture des données depuis le fichier CSV...")
         df = pd.read_csv('backend/app/utils/data/ratings.csv')
@@ -159,6 +187,8 @@ def add_rating_from_csv():
     except Exception as e:
         logger.error(f"Une erreur est survenue : {e}")
         session.rollback()
+        # L'instantané en cours de construction ne doit pas être publié
+        raise
 
     finally:
         logger.info("Vérification des données insérées...")
@@ -169,8 +199,27 @@ def add_rating_from_csv():
         logger.info("Session fermée.")
 
 
+def load_snapshot(load_ratings: bool = False, db_path=DB_PATH):
+    """
+    Construit un nouvel instantané de la base (copie de l'instantané servi, complétée
+    par les fichiers de données), le publie, puis met à jour l'index de contenu.
+
+    :param load_ratings: charger aussi les notes du fichier CSV
+    :param db_path: base servie
+    """
+    with staging_snapshot(db_path) as staging_path:
+        db_engine = create_engine(f"duckdb:///{staging_path}")
+        try:
+            create_tables(db_engine)
+            add_film_from_json(db_engine)
+            if load_ratings:
+                add_rating_from_csv(db_engine)
+        finally:
+            # Ferme les connexions avant la publication de l'instantané
+            db_engine.dispose()
+    update_content_index(db_path)
+
+
 if __name__ == "__main__":
-    add_film_from_json()
-    # add_rating_from_csv()
-    session.close()
+    load_snapshot(load_ratings="--ratings" in sys.argv)
 
@@ -0,0 +1,25 @@
+import threading
+from pathlib import Path
+
+import duckdb
+
+from .snapshots import current_snapshot
+
+_connect_lock = threading.Lock()
+
+
+def connect_read_only(path: Path) -> duckdb.DuckDBPyConnection:
+    """
+    Ouvre une connexion DuckDB en lecture seule.
+
+    La lecture seule permet à plusieurs processus (workers uvicorn) d'ouvrir la même
+    base. Les ouvertures sont sérialisées dans le processus : DuckDB refuse d'attacher
+    le même fichier depuis deux threads au même instant. Si `path` est un lien vers un
+    instantané (voir `app.utils.snapshots`), la connexion porte sur l'instantané publié
+    au moment de l'ouverture.
+
+    :param path: chemin de la base
+    :return: connexion DuckDB
+    """
+    with _connect_lock:
+        return duckdb.connect(current_snapshot(path), read_only=True)
@@ -0,0 +1,35 @@
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: Path, blocking: bool = True):
+    """
+    Verrou exclusif entre processus, porté par un fichier (`flock`).
+
+    Sert à ce qu'un seul worker entraîne un modèle ou précalcule ses recommandations
+    pendant que les autres attendent (ou passent leur tour).
+
+    :param path: fichier de verrou (créé si besoin)
+    :param blocking: attendre le verrou ; sinon, céder tout de suite s'il est pris
+    :return: (contexte) True si le verrou est obtenu
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
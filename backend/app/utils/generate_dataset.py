@@ -0,0 +1,325 @@
+"""
+Génération d'un jeu de données synthétique aux dimensions de la production.
+
+Écrit les tables `films` et `ratings` (schéma de `database_loading.py`) dans une base
+DuckDB, avec des distributions réalistes :
+- popularité des films en loi de puissance (quelques films concentrent la plupart des notes) ;
+- activité des utilisateurs à queue lourde (log-normale) ;
+- combinaisons de genres et dates de sortie entre 1900 et 2026, plus denses sur la période récente ;
+- notes issues de biais film/utilisateur, de goûts par genre et de facteurs latents, pour
+  que les moteurs de recommandation aient un signal à apprendre.
+
+Le résultat ne dépend que des paramètres et de la graine.
+
+Exemple (depuis le dossier backend) :
+    python -m app.utils.generate_dataset --scale 1m --seed 42 --output /tmp/films_1m.db
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+import duckdb
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sqlalchemy import create_engine
+
+from app.utils.database_loading import create_tables
+
+# Nombre de notes par échelle prédéfinie
+SCALES = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+    "25m": 25_000_000,
+    "50m": 50_000_000,
+}
+
+GENRES_PATH = Path(__file__).resolve().parent / "data" / "movies_genre.json"
+
+# Fréquence relative des genres dans le catalogue (proche de TMDB)
+GENRE_WEIGHTS = {
+    "Drama": 10, "Comedy": 7, "Thriller": 5, "Action": 5, "Romance": 4, "Horror": 4, "Crime": 3,
+    "Documentary": 3, "Adventure": 3, "Science Fiction": 2, "Family": 2, "Mystery": 2, "Fantasy": 2,
+    "Animation": 2, "Music": 1, "History": 1, "War": 1, "Western": 1, "TV Movie": 1,
+}
+
+GENRE_WORDS = {
+    "Action": ["explosive", "mission", "chase", "agent", "battle", "revenge"],
+    "Adventure": ["journey", "quest", "treasure", "island", "expedition", "map"],
+    "Animation": ["animated", "magical", "talking", "colorful", "friends", "kingdom"],
+    "Comedy": ["hilarious", "awkward", "wedding", "roommates", "misadventures", "prank"],
+    "Crime": ["detective", "heist", "gangster", "murder", "police", "cartel"],
+    "Documentary": ["true", "archive", "interviews", "history", "investigation", "nature"],
+    "Drama": ["family", "struggle", "loss", "redemption", "secrets", "life"],
+    "Family": ["children", "holiday", "dog", "parents", "home", "adventure"],
+    "Fantasy": ["dragon", "wizard", "enchanted", "prophecy", "realm", "curse"],
+    "History": ["empire", "revolution", "king", "century", "war", "biography"],
+    "Horror": ["haunted", "demon", "terror", "nightmare", "killer", "cabin"],
+    "Music": ["band", "singer", "concert", "rhythm", "tour", "song"],
+    "Mystery": ["clue", "disappearance", "puzzle", "secret", "suspect", "riddle"],
+    "Romance": ["love", "heart", "passion", "affair", "wedding", "summer"],
+    "Science Fiction": ["space", "alien", "future", "robot", "planet", "time"],
+    "TV Movie": ["holiday", "town", "small", "christmas", "reunion", "inn"],
+    "Thriller": ["conspiracy", "hostage", "escape", "spy", "deadly", "pursuit"],
+    "War": ["soldiers", "front", "battalion", "resistance", "occupation", "trenches"],
+    "Western": ["frontier", "sheriff", "outlaw", "ranch", "desert", "gunslinger"],
+}
+COMMON_WORDS = ["a", "the", "young", "woman", "man", "city", "world", "must", "find", "after", "when",
+                "their", "new", "old", "dark", "last", "story", "of", "in", "discovers"]
+TITLE_ADJECTIVES = ["Silent", "Broken", "Golden", "Last", "Hidden", "Red", "Endless", "Lost", "Wild",
+                    "Dark", "Bright", "Final", "Secret", "Frozen", "Burning", "Little", "Great", "Iron"]
+TITLE_NOUNS = ["River", "Night", "Kingdom", "Road", "Garden", "Empire", "Storm", "Promise", "City",
+               "Heart", "Shadow", "Harbor", "Summer", "Mountain", "Letter", "Signal", "Horizon", "Crown"]
+
+FIRST_YEAR, LAST_YEAR = 1900, 2026
+# Les premières notes MovieLens datent de 1995
+RATINGS_START = pd.Timestamp("1995-01-01").timestamp()
+RATINGS_END = pd.Timestamp(f"{LAST_YEAR}-12-31").timestamp()
+
+
+def dataset_shape(n_ratings: int, n_users: Optional[int] = None, n_films: Optional[int] = None) -> tuple[int, int]:
+    """
+    Nombre d'utilisateurs et de films par défaut pour un volume de notes (proportions de MovieLens).
+
+    :return: (nombre d'utilisateurs, nombre de films)
+    """
+    n_users = n_users or max(50, n_ratings // 150)
+    n_films = n_films or max(500, int(12 * np.sqrt(n_ratings)))
+    return n_users, n_films
+
+
+def load_genres() -> list[str]:
+    """Genres TMDB connus de l'application, ou ceux de `GENRE_WEIGHTS` à défaut."""
+    if GENRES_PATH.exists():
+        with open(GENRES_PATH, encoding="utf-8") as f:
+            return [genre["name"] for genre in json.load(f)]
+    return list(GENRE_WEIGHTS)
+
+
+def generate_films(n_films: int, rng: np.random.Generator, genres: list[str]) -> tuple[pd.DataFrame, dict]:
+    """
+    Catalogue de films synthétique.
+
+    :param n_films: nombre de films
+    :param rng: générateur aléatoire
+    :param genres: genres disponibles
+    :return: (DataFrame au format de la table `films`, caractéristiques latentes utilisées pour les notes)
+    """
+    ids = np.arange(1, n_films + 1)
+
+    # Popularité en loi de puissance, indépendante de l'ordre des identifiants
+    popularity = 1.0 / np.arange(1, n_films + 1) ** 1.05
+    popularity = popularity[rng.permutation(n_films)]
+    popularity /= popularity.sum()
+
+    # 1 à 3 genres par film, tirés selon leur fréquence
+    weights = np.array([GENRE_WEIGHTS.get(genre, 1) for genre in genres], dtype=float)
+    weights /= weights.sum()
+    n_genres = rng.choice([1, 2, 3], size=n_films, p=[0.35, 0.4, 0.25])
+    genre_matrix = np.zeros((n_films, len(genres)), dtype=np.float32)
+    genre_strings = []
+    descriptions = []
+    for i, count in enumerate(n_genres):
+        chosen = rng.choice(len(genres), size=count, replace=False, p=weights)
+        genre_matrix[i, chosen] = 1
+        names = [genres[g] for g in chosen]
+        genre_strings.append(",".join(names))
+        vocabulary = [word for name in names for word in GENRE_WORDS.get(name, [])] or COMMON_WORDS
+        words = np.concatenate([rng.choice(vocabulary, size=rng.integers(4, 10)),
+                                rng.choice(COMMON_WORDS, size=rng.integers(4, 10))])
+        rng.shuffle(words)
+        descriptions.append(" ".join(words).capitalize() + ".")
+
+    titles = [f"{a} {n}" for a, n in zip(rng.choice(TITLE_ADJECTIVES, n_films), rng.choice(TITLE_NOUNS, n_films))]
+
+    # Sorties plus nombreuses sur la période récente
+    years = np.clip(LAST_YEAR - np.floor(rng.exponential(25, n_films)), FIRST_YEAR, LAST_YEAR).astype(int)
+    release_dates = pd.to_datetime(pd.DataFrame({"year": years, "month": 1, "day": 1})) \
+        + pd.to_timedelta(rng.integers(0, 365, n_films), unit="D")
+
+    quality = rng.normal(0, 0.5, n_films)
+    vote_count = rng.poisson(popularity * n_films * 2000) + 1
+    vote_average = np.round(np.clip((3.5 + quality) * 2 + rng.normal(0, 0.4, n_films), 0, 10), 1)
+
+    films = pd.DataFrame({
+        "id": ids,
+        "title": titles,
+        "genres": genre_strings,
+        "description": descriptions,
+        "release_date": release_dates.dt.date,
+        "vote_average": vote_average,
+        "vote_count": vote_count,
+        "poster_path": [f"/synthetic{film_id}.jpg" for film_id in ids],
+    })
+    features = {
+        "popularity": popularity,
+        "quality": quality,
+        "genres": genre_matrix,
+        "release_ts": release_dates.astype("int64").to_numpy() / 1e9,
+    }
+    return films, features
+
+
+def user_activity(n_users: int, n_ratings: int, n_films: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Nombre de notes par utilisateur : log-normale à queue lourde, ramenée au volume visé.
+
+    :return: tableau du nombre de notes de chaque utilisateur
+    """
+    activity = rng.lognormal(mean=0, sigma=1.2, size=n_users)
+    counts = np.maximum(np.round(activity / activity.sum() * n_ratings), 5)
+    return np.minimum(counts, n_films // 2).astype(np.int64)
+
+
+def generate_ratings(counts: np.ndarray, features: dict, user_offset: int, rng: np.random.Generator,
+                     user_params: dict, film_factors: np.ndarray) -> pd.DataFrame:
+    """
+    Notes d'un bloc d'utilisateurs.
+
+    Les films sont tirés selon leur popularité, sans doublon par utilisateur ; la note
+    combine biais, goût de l'utilisateur pour les genres du film et facteurs latents.
+
+    :param counts: nombre de notes de chaque utilisateur du bloc
+    :param features: caractéristiques des films produites par `generate_films`
+    :param user_offset: indice du premier utilisateur du bloc
+    :param rng: générateur aléatoire propre au bloc
+    :param user_params: biais, goûts par genre, facteurs et début d'activité de tous les utilisateurs
+    :param film_factors: facteurs latents des films
+    :return: DataFrame au format de la table `ratings`
+    """
+    n_films = len(features["popularity"])
+    n_users = len(counts)
+    # Tirages avec remise surdimensionnés puis suppression des doublons, répétés tant que
+    # des utilisateurs très actifs n'ont pas atteint leur nombre de notes
+    users = np.empty(0, dtype=np.int64)
+    films = np.empty(0, dtype=np.int64)
+    missing = counts
+    for _ in range(20):
+        if not missing.any():
+            break
+        draws = np.where(missing > 0, np.ceil(missing * 1.3).astype(np.int64) + 2, 0)
+        new_users = np.repeat(np.arange(n_users), draws)
+        users = np.concatenate([users, new_users])
+        films = np.concatenate([films, rng.choice(n_films, size=len(new_users), p=features["popularity"])])
+        _, first = np.unique(users * n_films + films, return_index=True)
+        first.sort()
+        first = first[np.argsort(users[first], kind="stable")]
+        users, films = users[first], films[first]
+        rank = np.arange(len(users)) - np.searchsorted(users, np.arange(n_users))[users]
+        keep = rank < counts[users]
+        users, films = users[keep], films[keep]
+        missing = counts - np.bincount(users, minlength=n_users)
+
+    global_users = users + user_offset
+    genres = features["genres"][films]
+    affinity = (genres * user_params["genre_taste"][global_users]).sum(axis=1) / genres.sum(axis=1)
+    latent = (user_params["factors"][global_users] * film_factors[films]).sum(axis=1)
+    raw = (3.5 + features["quality"][films] + user_params["bias"][global_users] + affinity + latent
+           + rng.normal(0, 0.6, len(users)))
+    rating = np.clip(np.round(raw * 2) / 2, 0.5, 5.0).astype(np.float32)
+
+    start = np.maximum(user_params["start_ts"][global_users], features["release_ts"][films])
+    start = np.minimum(start, RATINGS_END - 1)
+    timestamp = (start + rng.random(len(users)) * (RATINGS_END - start)).astype(np.int64)
+
+    return pd.DataFrame({
+        "user_id": global_users + 1,
+        "film_id": films + 1,
+        "rating": rating,
+        "timestamp": timestamp,
+    })
+
+
+def generate_dataset(output: Path, n_ratings: int, seed: int = 42, n_users: Optional[int] = None,
+                     n_films: Optional[int] = None, chunk_ratings: int = 1_000_000,
+                     overwrite: bool = False) -> dict:
+    """
+    Écrit une base DuckDB synthétique avec les tables `films` et `ratings`.
+
+    :param output: fichier DuckDB à créer
+    :param n_ratings: nombre de notes visé (le nombre réel en est proche)
+    :param seed: graine aléatoire ; mêmes paramètres et même graine donnent la même base
+    :param n_users: nombre d'utilisateurs (par défaut, proportion MovieLens)
+    :param n_films: nombre de films (par défaut, proportion MovieLens)
+    :param chunk_ratings: nombre de notes générées et insérées par bloc
+    :param overwrite: remplacer le fichier s'il existe
+    :return: résumé (utilisateurs, films, notes, durée)
+    """
+    start_time = time.perf_counter()
+    output = Path(output)
+    if output.exists():
+        if not overwrite:
+            raise FileExistsError(f"{output} existe déjà (utiliser --overwrite pour le remplacer)")
+        output.unlink()
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    n_users, n_films = dataset_shape(n_ratings, n_users, n_films)
+    seeds = np.random.SeedSequence(seed)
+    catalog_seed, users_seed, chunks_seed = seeds.spawn(3)
+
+    genres = load_genres()
+    films, features = generate_films(n_films, np.random.default_rng(catalog_seed), genres)
+    rng = np.random.default_rng(users_seed)
+    counts = user_activity(n_users, n_ratings, n_films, rng)
+    n_factors = 8
+    film_factors = rng.normal(0, 0.35, (n_films, n_factors)).astype(np.float32)
+    user_params = {
+        "bias": rng.normal(0, 0.4, n_users),
+        "genre_taste": rng.normal(0, 0.4, (n_users, len(genres))).astype(np.float32),
+        "factors": rng.normal(0, 0.35, (n_users, n_factors)).astype(np.float32),
+        "start_ts": RATINGS_START + rng.random(n_users) * (RATINGS_END - RATINGS_START),
+    }
+
+    # Tables créées avec le schéma SQLAlchemy de l'application
+    sql_engine = create_engine(f"duckdb:///{output}")
+    create_tables(sql_engine)
+    sql_engine.dispose()
+
+    # Blocs d'utilisateurs d'environ `chunk_ratings` notes, chacun avec sa propre graine
+    bounds = np.searchsorted(np.cumsum(counts), np.arange(chunk_ratings, counts.sum(), chunk_ratings))
+    bounds = np.unique(np.concatenate([[0], bounds + 1, [n_users]]))
+    chunk_rngs = [np.random.default_rng(s) for s in chunks_seed.spawn(len(bounds) - 1)]
+
+    total = 0
+    with duckdb.connect(output) as conn:
+        conn.register("films_df", films)
+        conn.execute("INSERT INTO films (id, title, genres, description, release_date, vote_average, "
+                     "vote_count, poster_path) SELECT * FROM films_df")
+        conn.unregister("films_df")
+        for (begin, end), chunk_rng in zip(zip(bounds[:-1], bounds[1:]), chunk_rngs):
+            ratings = generate_ratings(counts[begin:end], features, begin, chunk_rng, user_params, film_factors)
+            conn.register("ratings_df", ratings)
+            conn.execute("INSERT INTO ratings (user_id, film_id, rating, timestamp) SELECT * FROM ratings_df")
+            conn.unregister("ratings_df")
+            total += len(ratings)
+            logger.info(f"{total} notes écrites ({end}/{n_users} utilisateurs).")
+
+    summary = {"users": n_users, "films": n_films, "ratings": total, "seed": seed,
+               "seconds": time.perf_counter() - start_time}
+    logger.info(f"Base synthétique écrite dans {output} : {summary}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère une base films/notes synthétique.")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--scale", choices=list(SCALES), default="100k", help="Volume de notes prédéfini")
+    size.add_argument("--ratings", type=int, help="Nombre de notes visé")
+    parser.add_argument("--users", type=int, help="Nombre d'utilisateurs")
+    parser.add_argument("--films", type=int, help="Nombre de films")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", required=True, help="Fichier DuckDB à créer")
+    parser.add_argument("--chunk-ratings", type=int, default=1_000_000)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    generate_dataset(Path(args.output), args.ratings or SCALES[args.scale], seed=args.seed, n_users=args.users,
+                     n_films=args.films, chunk_ratings=args.chunk_ratings, overwrite=args.overwrite)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Balayage des hyperparamètres des moteurs de recommandation.
+
+Évalue une grille de dimensions latentes (et d'options des moteurs) dans un pool de
+processus. Les workers s'attachent à la matrice des notes via la mémoire partagée
+au lieu d'en recevoir une copie picklée.
+
+Exemple (depuis le dossier backend) :
+    python -m app.utils.hyperparameter_sweep --engines svd als knn --components 5 10 20 50 \
+        --param algorithm=randomized,arpack --param regularization=0.05,0.1 --param n_neighbors=20,50
+"""
+import argparse
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from app.service.recommendation_service import (
+    ENGINES, RatingsMatrix, load_data, make_engine, predict_ratings, top_n
+)
+from app.utils.shared_arrays import attach_arrays, release_arrays, share_arrays
+
+# Vues NumPy sur la mémoire partagée, propres à chaque worker
+_SHARED = {}
+_SEGMENTS = []
+
+
+def _init_worker(spec: dict):
+    global _SEGMENTS
+    # Modules importés paresseusement par les moteurs : importés ici, leur coût (~1 s)
+    # n'est pas compté dans le temps d'entraînement de la première configuration du worker
+    import scipy.sparse  # noqa: F401
+    import sklearn.decomposition  # noqa: F401
+
+    _SEGMENTS, arrays = attach_arrays(spec)
+    _SHARED.update(arrays)
+
+
+def evaluate_config(engine_name: str, n_components: int, params: dict, top_k: int = 10,
+                    latency_users: int = 200, light_threshold: int = 20) -> dict:
+    """
+    Entraîne et évalue une configuration sur les données partagées.
+
+    :param engine_name: nom du moteur
+    :param n_components: nombre de composantes latentes (None si le moteur n'en a pas)
+    :param params: autres paramètres du moteur
+    :param top_k: taille des listes pour la précision@k
+    :param latency_users: nombre d'utilisateurs tirés pour mesurer la latence
+    :param light_threshold: nombre maximal de notes d'entraînement d'un utilisateur « peu actif »
+    :return: dictionnaire de métriques
+    """
+    train = RatingsMatrix(*(_SHARED[name] for name in RatingsMatrix._arrays))
+    test_rows, test_cols, test_values = _SHARED["test_rows"], _SHARED["test_cols"], _SHARED["test_values"]
+    engine_params = dict(params)
+    if n_components is not None:
+        n_components = engine_params["n_components"] = min(n_components, train.shape[1] - 1)
+    # Les moteurs évalués en parallèle ne lancent pas eux-mêmes de threads ni de sous-processus
+    for name in ("n_jobs", "n_threads"):
+        if name in inspect.signature(ENGINES[engine_name].__init__).parameters:
+            engine_params[name] = 1
+
+    start = time.perf_counter()
+    engine = make_engine(engine_name, **engine_params).fit(train)
+    train_time = time.perf_counter() - start
+
+    # Qualité de prédiction sur les notes mises de côté
+    errors = predict_ratings(engine, test_rows, test_cols) - test_values
+    rmse = float(np.sqrt(np.mean(errors ** 2)))
+    mae = float(np.mean(np.abs(errors)))
+
+    def recommend(user_index):
+        scores = engine.score_user(user_index)
+        scores[train.seen(user_index)] = -np.inf
+        return top_n(scores, top_k)
+
+    # Qualité de classement : part des films du top-k aimés (note >= 4) dans le jeu de test
+    liked = test_values >= 4
+    liked_by_user = {}
+    for user_index, film_index in zip(test_rows[liked], test_cols[liked]):
+        liked_by_user.setdefault(int(user_index), set()).add(int(film_index))
+    hits = {user: len(films.intersection(recommend(user).tolist())) for user, films in liked_by_user.items()}
+    precision = sum(hits.values()) / (top_k * len(hits)) if hits else float("nan")
+    counts = np.diff(train.indptr)
+    light_hits = [value for user, value in hits.items() if counts[user] <= light_threshold]
+    light_precision = sum(light_hits) / (top_k * len(light_hits)) if light_hits else float("nan")
+
+    # Latence de scoring d'une requête : scores, filtrage des films vus, top-k
+    rng = np.random.default_rng(0)
+    timings = []
+    for user_index in rng.integers(0, train.shape[0], size=min(latency_users, train.shape[0])):
+        t0 = time.perf_counter()
+        recommend(user_index)
+        timings.append(time.perf_counter() - t0)
+
+    return {
+        "engine": engine_name,
+        "n_components": n_components,
+        "params": json.dumps(params, sort_keys=True),
+        "rmse": rmse,
+        "mae": mae,
+        f"precision@{top_k}": precision,
+        f"precision@{top_k}_light": light_precision,
+        "train_s": train_time,
+        "model_mb": engine.nbytes / 1e6,
+        "score_p50_ms": float(np.percentile(timings, 50) * 1e3),
+        "score_p95_ms": float(np.percentile(timings, 95) * 1e3),
+    }
+
+
+def build_grid(engines: list[str], components: list[int], options: dict[str, list]) -> list[tuple]:
+    """
+    Produit cartésien des configurations ; chaque option n'est appliquée qu'aux moteurs qui l'acceptent.
+
+    :param engines: noms des moteurs
+    :param components: dimensions latentes
+    :param options: nom d'option -> valeurs à tester
+    :return: liste de (moteur, dimension, paramètres)
+    """
+    grid = []
+    for engine_name in engines:
+        accepted = inspect.signature(ENGINES[engine_name].__init__).parameters
+        names = [name for name in options if name in accepted]
+        engine_components = components if "n_components" in accepted else [None]
+        for values in product(*(options[name] for name in names)):
+            for n_components in engine_components:
+                grid.append((engine_name, n_components, dict(zip(names, values))))
+    return grid
+
+
+def run_sweep(ratings_matrix: RatingsMatrix, grid: list[tuple], workers: int, test_size: float = 0.2,
+              top_k: int = 10) -> pd.DataFrame:
+    """
+    Lance l'évaluation de toute la grille dans un pool de processus.
+
+    :param ratings_matrix: matrice utilisateur-film
+    :param grid: configurations produites par `build_grid`
+    :param workers: nombre de processus
+    :param test_size: proportion des notes de test
+    :param top_k: taille des listes pour la précision@k
+    :return: DataFrame des résultats, une ligne par configuration
+    """
+    train, test_rows, test_cols, test_values = ratings_matrix.split(test_size=test_size)
+    arrays = {name: getattr(train, name) for name in RatingsMatrix._arrays}
+    arrays.update(test_rows=test_rows, test_cols=test_cols, test_values=test_values)
+    segments, spec = share_arrays(arrays)
+    del train, arrays
+    logger.info(f"Balayage de {len(grid)} configurations sur {workers} processus.")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(spec,)) as pool:
+            futures = [
+                pool.submit(evaluate_config, engine_name, n_components, params, top_k)
+                for engine_name, n_components, params in grid
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        release_arrays(segments, unlink=True)
+    return pd.DataFrame(results).sort_values(["engine", "params", "n_components"]).reset_index(drop=True)
+
+
+def parse_option(text: str) -> tuple[str, list]:
+    """Analyse une option `nom=v1,v2` ; les valeurs numériques sont converties."""
+    name, _, values = text.partition("=")
+
+    def convert(value):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return value
+
+    return name.strip(), [convert(value.strip()) for value in values.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Balayage des hyperparamètres des moteurs de recommandation.")
+    parser.add_argument("--engines", nargs="+", default=["svd"], choices=sorted(ENGINES))
+    parser.add_argument("--components", type=int, nargs="+", default=[5, 10, 20, 30, 50, 100])
+    parser.add_argument("--param", action="append", default=[], metavar="NOM=V1,V2",
+                        help="Option de moteur à faire varier (répétable)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--csv", help="Chemin d'un fichier CSV où écrire les résultats")
+    args = parser.parse_args()
+
+    # Évaluation sur les notes d'entraînement (options RECO_TRAIN_*)
+    _, _, ratings_matrix = load_data()
+    if ratings_matrix is None or ratings_matrix.nnz == 0:
+        logger.error("Aucune note disponible pour le balayage.")
+        return
+    grid = build_grid(args.engines, args.components, dict(parse_option(option) for option in args.param))
+    results = run_sweep(ratings_matrix, grid, args.workers, test_size=args.test_size, top_k=args.top_k)
+    print(results.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    if args.csv:
+        results.to_csv(args.csv, index=False)
+        logger.info(f"Résultats écrits dans {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
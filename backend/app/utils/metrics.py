@@ -0,0 +1,136 @@
+"""
+Métriques Prometheus de l'API, exposées sur `/metrics`.
+
+Avec plusieurs workers uvicorn, définir `PROMETHEUS_MULTIPROC_DIR` (dossier vide et
+accessible en écriture) pour que `/metrics` agrège les valeurs de tous les processus.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, Summary, generate_latest
+)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUESTS = Counter("http_requests_total", "Requêtes HTTP traitées", ["method", "route", "status"])
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Durée de traitement des requêtes HTTP",
+                            ["method", "route"], buckets=LATENCY_BUCKETS)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "Requêtes HTTP en cours de traitement",
+                             multiprocess_mode="livesum")
+DUCKDB_QUERY = Histogram("duckdb_query_duration_seconds", "Durée d'exécution des requêtes DuckDB",
+                         ["source"], buckets=LATENCY_BUCKETS)
+MODEL_LOAD = Summary("reco_model_load_seconds", "Durée de chargement d'un modèle sauvegardé", ["engine"])
+MODEL_TRAIN = Summary("reco_model_train_seconds", "Durée d'entraînement d'un modèle", ["engine"])
+TOP_N_PRECOMPUTE = Summary("reco_top_n_precompute_seconds", "Durée du précalcul des recommandations")
+MODEL_MEMORY = Gauge("reco_model_memory_bytes", "Mémoire occupée par le modèle servi", ["component"],
+                     multiprocess_mode="max")
+# Taux de succès d'un cache : rate(...{result="hit"}) / rate(...) par cache
+CACHE_REQUESTS = Counter("reco_cache_requests_total", "Accès aux caches du service", ["cache", "result"])
+RESPONSE_CACHE_BYTES = Gauge("reco_response_cache_bytes", "Mémoire occupée par le cache des réponses de recommandation",
+                             multiprocess_mode="livesum")
+# Contrôle d'admission (app.utils.admission), par budget de routes
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Requêtes admises en cours de traitement", ["budget"],
+                            multiprocess_mode="livesum")
+ADMISSION_QUEUED = Gauge("admission_queued", "Requêtes en attente d'admission", ["budget"],
+                         multiprocess_mode="livesum")
+ADMISSION_LIMIT = Gauge("admission_limit", "Requêtes admises simultanément au plus", ["budget"],
+                        multiprocess_mode="livesum")
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requêtes refusées par le contrôle d'admission",
+                             ["budget", "reason"])
+ADMISSION_WAIT = Histogram("admission_wait_seconds", "Attente des requêtes avant leur admission", ["budget"],
+                           buckets=LATENCY_BUCKETS)
+
+# Pool des requêtes DuckDB de l'API (app.utils.query_executor)
+QUERY_PENDING = Gauge("duckdb_queries_pending", "Requêtes DuckDB en cours ou en attente d'un thread",
+                      multiprocess_mode="livesum")
+QUERY_REJECTED = Counter("duckdb_queries_rejected_total", "Requêtes DuckDB refusées, pool et file pleins")
+QUERY_CANCELLED = Counter("duckdb_queries_cancelled_total", "Requêtes DuckDB interrompues", ["reason"])
+# Capture des requêtes pour le rejeu (app.utils.request_capture)
+REQUESTS_CAPTURED = Counter("request_capture_total", "Requêtes échantillonnées pour la capture", ["result"])
+
+@contextmanager
+def observe(metric, *labels):
+    """Chronomètre le bloc et enregistre sa durée dans `metric` (Histogram ou Summary)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        (metric.labels(*labels) if labels else metric).observe(time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class TimedConnection:
+    """
+    Connexion DuckDB dont chaque `execute` est chronométré ; les autres attributs sont délégués.
+    """
+
+    def __init__(self, conn, source: str):
+        self._conn = conn
+        self._histogram = DUCKDB_QUERY.labels(source)
+
+    def execute(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._conn.execute(*args, **kwargs)
+        finally:
+            self._histogram.observe(time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI comptant les requêtes et mesurant leur durée par route.
+
+    Le libellé `route` est le modèle de chemin (`/films/{id}`) et non l'URL, pour
+    garder un nombre de séries borné ; les URL sans route sont regroupées sous `unmatched`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUESTS.labels(scope["method"], path, status_code).inc()
+            REQUEST_LATENCY.labels(scope["method"], path).observe(duration)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Sérialise les métriques au format texte Prometheus.
+
+    :return: (contenu, type MIME)
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,183 @@
+"""
+Profileur statistique à la demande : échantillonne les piles d'appels pendant les N
+prochaines requêtes puis écrit le profil sur disque.
+
+Les piles sont relevées sur tous les threads (boucle d'événements et threads des routes
+synchrones) et seules celles qui traversent le code de l'application sont gardées. Le
+fichier produit est au format « piles repliées » (une pile par ligne suivie du nombre
+d'échantillons), lisible par speedscope ou flamegraph.pl.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+APP_DIR = Path(__file__).resolve().parents[1]
+BACKEND_DIR = APP_DIR.parent
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", APP_DIR / "utils" / "data" / "profiles"))
+# Intervalle d'échantillonnage en secondes
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.002"))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(str(BACKEND_DIR)):
+        filename = os.path.relpath(filename, BACKEND_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """
+    Échantillonneur de piles exécuté dans un thread dédié.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = None
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        app_prefix = str(APP_DIR)
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                in_app = False
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    in_app = in_app or frame.f_code.co_filename.startswith(app_prefix)
+                    frame = frame.f_back
+                if in_app:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def dump(self, directory: Path) -> Path:
+        """Écrit les piles repliées dans `directory` et retourne le chemin du fichier."""
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"profile-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))}.txt"
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+class ProfileSession:
+    """
+    Profilage des `n_requests` prochaines requêtes : l'échantillonneur tourne de la
+    première à la fin de la dernière, puis le profil est écrit sur disque.
+    """
+
+    def __init__(self, n_requests: int, directory: Path = None):
+        self.remaining = n_requests
+        self.in_flight = 0
+        self.directory = directory or PROFILE_DIR
+        self.profiler = None
+        self.output = None
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def enter(self) -> bool:
+        """Réserve une place pour la requête qui commence ; False si la session est complète."""
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            self.in_flight += 1
+            if self.profiler is None:
+                self.profiler = SamplingProfiler()
+                self.profiler.start()
+            return True
+
+    def exit(self) -> bool:
+        """Libère la place de la requête terminée ; True si c'était la dernière, `finish` reste à appeler."""
+        with self._lock:
+            self.in_flight -= 1
+            if self.remaining > 0 or self.in_flight > 0 or self._finished:
+                return False
+            self._finished = True
+            return True
+
+    def close(self):
+        """
+        Termine la session avant ses dernières requêtes : l'échantillonneur est arrêté et
+        le profil des échantillons déjà relevés écrit (bloquant). Les requêtes en cours
+        n'y contribuent plus.
+        """
+        with self._lock:
+            self.remaining = 0
+            if self.profiler is None or self._finished:
+                return
+            self._finished = True
+        self.finish()
+
+    def finish(self):
+        """Arrête l'échantillonneur et écrit le profil (bloquant, hors de la boucle d'événements)."""
+        self.profiler.stop()
+        self.output = self.profiler.dump(self.directory)
+        logger.info(f"Profil de {sum(self.profiler.samples.values())} échantillons écrit dans {self.output}")
+
+
+_session: Optional[ProfileSession] = None
+_session_lock = threading.Lock()
+
+
+def arm_profiler(n_requests: int) -> ProfileSession:
+    """
+    Active le profilage des `n_requests` prochaines requêtes.
+
+    Une session précédente inachevée est close (voir `ProfileSession.close`) : son
+    échantillonneur ne tourne pas indéfiniment et son profil partiel est écrit.
+    Bloquant : à appeler hors de la boucle d'événements.
+    """
+    global _session
+    with _session_lock:
+        previous, _session = _session, ProfileSession(n_requests)
+    if previous is not None:
+        previous.close()
+    return _session
+
+
+def current_session() -> Optional[ProfileSession]:
+    return _session
+
+
+class ProfilerMiddleware:
+    """
+    Middleware ASGI qui fait participer les requêtes à la session de profilage armée, s'il y en a une.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        session = _session
+        if scope["type"] != "http" or session is None or session.remaining <= 0 or not session.enter():
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if session.exit():
+                # Attente du thread d'échantillonnage et écriture du fichier dans un thread
+                await asyncio.to_thread(session.finish)
@@ -0,0 +1,208 @@
+"""
+Exécution des requêtes DuckDB de l'API sur un pool de threads dédié et borné.
+
+Les routes `async def` confient leur travail DuckDB à `QueryExecutor.run` : la boucle
+d'événements reste libre pendant la requête, et le pool de threads des routes
+synchrones n'est plus occupé par les requêtes SQL. Chaque thread du pool garde sa
+connexion en lecture seule, rouverte quand un nouvel instantané de la base est publié.
+
+Une requête est interrompue (`DuckDBPyConnection.interrupt`) quand elle dépasse son
+délai (`QUERY_TIMEOUT` secondes par défaut) ou quand le client se déconnecte : le
+thread est rendu au pool aussitôt au lieu de calculer une réponse que personne ne
+lira. Au-delà de `QUERY_WORKERS` requêtes en cours et `QUERY_QUEUE` en attente, les
+suivantes sont refusées immédiatement.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+import duckdb
+
+from .db import connect_read_only
+from .metrics import QUERY_CANCELLED, QUERY_PENDING, QUERY_REJECTED, TimedConnection
+from .snapshots import current_snapshot
+from .timing import stage
+
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", str(min(8, os.cpu_count() or 1))))
+QUERY_QUEUE = int(os.getenv("QUERY_QUEUE", "64"))
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "30"))
+
+
+class QueryRejected(Exception):
+    """Pool de requêtes et file d'attente pleins."""
+
+
+class QueryTimeout(Exception):
+    """Requête interrompue après son délai."""
+
+
+class QueryCancelled(Exception):
+    """Requête interrompue après la déconnexion du client."""
+
+
+class _Job:
+    """
+    Travail en cours sur une connexion : `interrupt` peut être appelé depuis un autre thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn = None
+        self.cancelled = False
+
+    def attach(self, conn):
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled()
+            self._conn = conn
+
+    def detach(self):
+        with self._lock:
+            self._conn = None
+
+    def interrupt(self):
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+
+class _JobConnection(TimedConnection):
+    """
+    Connexion chronométrée qui refuse d'exécuter une requête une fois le travail annulé
+    (une interruption arrivée entre deux requêtes serait sinon ignorée par DuckDB).
+    """
+
+    def __init__(self, conn, job: _Job):
+        super().__init__(conn, "api")
+        self._job = job
+
+    def execute(self, *args, **kwargs):
+        if self._job.cancelled:
+            raise QueryCancelled()
+        return super().execute(*args, **kwargs)
+
+
+class QueryExecutor:
+    """
+    Pool de threads dédié aux requêtes DuckDB d'une base.
+
+    :param db_path: chemin de la base servie (lien vers l'instantané publié)
+    :param workers: requêtes exécutées simultanément au plus
+    :param queue: requêtes en attente au plus ; au-delà, `QueryRejected`
+    :param timeout: délai par défaut d'une requête (secondes)
+    """
+
+    def __init__(self, db_path: Path, workers: int = QUERY_WORKERS, queue: int = QUERY_QUEUE,
+                 timeout: float = QUERY_TIMEOUT):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.capacity = workers + queue
+        self.pending = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="duckdb")
+        self._local = threading.local()
+
+    def _connection(self) -> duckdb.DuckDBPyConnection:
+        """Connexion du thread courant, rouverte si un autre instantané a été publié."""
+        snapshot = current_snapshot(self.db_path)
+        if getattr(self._local, "snapshot", None) != snapshot:
+            if getattr(self._local, "conn", None) is not None:
+                self._local.conn.close()
+            self._local.conn = connect_read_only(self.db_path)
+            self._local.snapshot = snapshot
+        return self._local.conn
+
+    def _execute(self, job: _Job, fn: Callable, args: tuple):
+        conn = self._connection()
+        job.attach(conn)
+        try:
+            return fn(_JobConnection(conn, job), *args)
+        except duckdb.InterruptException:
+            raise QueryCancelled()
+        finally:
+            job.detach()
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None,
+                  disconnected: Optional[asyncio.Event] = None):
+        """
+        Exécute `fn(con, *args)` sur le pool et retourne son résultat.
+
+        :param fn: fonction recevant une connexion DuckDB (exécutée dans un thread du pool)
+        :param timeout: délai en secondes (`QUERY_TIMEOUT` par défaut)
+        :param disconnected: événement signalant la déconnexion du client
+        :raises QueryRejected: pool et file d'attente pleins
+        :raises QueryTimeout: délai dépassé, requête interrompue
+        :raises QueryCancelled: client déconnecté, requête interrompue
+        """
+        if self.pending >= self.capacity:
+            QUERY_REJECTED.inc()
+            raise QueryRejected()
+        timeout = self.timeout if timeout is None else timeout
+        job = _Job()
+        context = contextvars.copy_context()
+        self.pending += 1
+        QUERY_PENDING.inc()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._pool, context.run, self._execute, job, fn, args)
+        except BaseException:
+            self._release()
+            raise
+        # Place rendue quand le thread a fini, et non quand la requête n'est plus attendue :
+        # une requête interrompue occupe son thread jusqu'à ce que DuckDB s'arrête
+        future.add_done_callback(self._release)
+
+        with stage("db"):
+            waiters = {future}
+            if disconnected is not None:
+                waiters.add(asyncio.ensure_future(disconnected.wait()))
+            try:
+                done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                job.interrupt()
+                raise
+            finally:
+                for waiter in waiters - {future}:
+                    waiter.cancel()
+        if future in done:
+            return future.result()
+        job.interrupt()
+        # Le thread termine seul après l'interruption : son erreur n'est plus attendue
+        future.add_done_callback(lambda f: f.exception())
+        if disconnected is not None and disconnected.is_set():
+            QUERY_CANCELLED.labels("disconnect").inc()
+            raise QueryCancelled()
+        QUERY_CANCELLED.labels("timeout").inc()
+        raise QueryTimeout()
+
+    def _release(self, future=None):
+        self.pending -= 1
+        QUERY_PENDING.dec()
+
+
+async def watch_disconnect(receive, disconnected: asyncio.Event):
+    """
+    Lit les messages ASGI de la requête jusqu'à la déconnexion du client, puis signale `disconnected`.
+
+    À réserver aux routes qui ne lisent pas le corps de la requête.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            disconnected.set()
+            return
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_query_executor(db_path: Path) -> QueryExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = QueryExecutor(db_path)
+        return _executor
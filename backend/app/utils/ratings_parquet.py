@@ -0,0 +1,183 @@
+"""
+Historique des notes exporté en Parquet, partitionné par période, pour l'entraînement.
+
+L'export écrit la table `ratings` dans un dossier `year=AAAA/month=M/` par période
+(`RATINGS_PARQUET_PERIOD` : `month` ou `year`), les notes de chaque fichier triées par
+utilisateur. Un entraînement sur une fenêtre récente ne lit que les partitions qui la
+recouvrent : les autres fichiers ne sont jamais ouverts, et dans les partitions lues
+DuckDB écarte les groupes de lignes hors de la fenêtre (ou hors de la tranche
+d'utilisateurs demandée) grâce aux statistiques Parquet.
+
+Chaque export est écrit dans un nouveau dossier puis publié en remplaçant le lien
+`current` d'un seul `os.replace`, comme les instantanés de la base : un entraînement
+en cours continue de lire l'export précédent.
+
+Exemple (depuis le dossier backend) :
+    python -m app.utils.ratings_parquet --db app/utils/data/films_reco.db --period month
+"""
+import argparse
+import os
+import re
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+import duckdb
+from loguru import logger
+
+from .db import connect_read_only
+
+RATINGS_PARQUET_DIR = Path(os.getenv("RATINGS_PARQUET_DIR", Path(__file__).resolve().parent / "data" / "ratings_parquet"))
+RATINGS_PARQUET_PERIOD = os.getenv("RATINGS_PARQUET_PERIOD", "month")
+# Nombre d'exports conservés en plus de l'export publié
+RATINGS_PARQUET_KEEP = int(os.getenv("RATINGS_PARQUET_KEEP", "1"))
+# Notes gardées en mémoire par partition avant écriture : plus de notes, moins de petits fichiers
+RATINGS_PARQUET_FLUSH_ROWS = int(os.getenv("RATINGS_PARQUET_FLUSH_ROWS", "4000000"))
+
+# Colonnes de partitionnement de chaque période
+PERIODS = {"year": ("year",), "month": ("year", "month")}
+PARTITION_PATTERN = re.compile(r"^(year|month)=(\d+)$")
+
+
+def current_export(directory: Path = RATINGS_PARQUET_DIR) -> Optional[Path]:
+    """Dossier de l'export publié, ou None si aucun export n'a encore été fait."""
+    link = Path(directory) / "current"
+    if not link.exists():
+        return None
+    return Path(os.path.realpath(link))
+
+
+def export_ratings(db_path: Path, directory: Path = RATINGS_PARQUET_DIR, period: str = RATINGS_PARQUET_PERIOD) -> Path:
+    """
+    Exporte les notes de la base en Parquet partitionné, puis publie l'export.
+
+    :param db_path: base DuckDB source
+    :param directory: dossier des exports
+    :param period: granularité des partitions ("month" ou "year")
+    :return: dossier de l'export publié
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Période inconnue : {period} (disponibles : {', '.join(PERIODS)})")
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"ratings-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    staging = directory / f".{name}.staging"
+    columns = ", ".join(PERIODS[period])
+    start = time.perf_counter()
+    try:
+        with connect_read_only(db_path) as conn:
+            conn.execute(f"SET partitioned_write_flush_threshold = {RATINGS_PARQUET_FLUSH_ROWS}")
+            # Horodatages en secondes UTC ; tri par utilisateur pour les lectures par tranches d'utilisateurs
+            conn.execute(f"""
+                COPY (
+                    SELECT user_id, film_id, rating, timestamp,
+                           year(epoch_ms(timestamp::BIGINT * 1000)) AS year,
+                           month(epoch_ms(timestamp::BIGINT * 1000)) AS month
+                    FROM ratings
+                    ORDER BY user_id, film_id
+                ) TO '{_quote(staging)}' (FORMAT PARQUET, PARTITION_BY ({columns}), COMPRESSION ZSTD)
+            """)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    export = directory / name
+    os.replace(staging, export)
+    link = directory / f".current.{os.getpid()}.link"
+    os.symlink(export.name, link)
+    os.replace(link, directory / "current")
+    logger.info(f"Notes exportées en Parquet dans {export} en {time.perf_counter() - start:.2f} s.")
+    cleanup_exports(directory)
+    return export
+
+
+def cleanup_exports(directory: Path = RATINGS_PARQUET_DIR, keep: int = RATINGS_PARQUET_KEEP) -> int:
+    """
+    Supprime les exports les plus anciens, hors export publié.
+
+    :return: nombre d'exports supprimés
+    """
+    current = current_export(directory)
+    exports = sorted(
+        (path for path in Path(directory).glob("ratings-*") if path.is_dir() and path != current),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in exports[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+    return max(len(exports) - keep, 0)
+
+
+def partitions(export: Path) -> List[tuple]:
+    """
+    Partitions d'un export, par ordre chronologique.
+
+    :param export: dossier de l'export
+    :return: liste de ((année, mois ou None), dossier)
+    """
+    found = []
+    for path in Path(export).rglob("*.parquet"):
+        keys = dict(PARTITION_PATTERN.match(part).groups() for part in path.parent.relative_to(export).parts
+                    if PARTITION_PATTERN.match(part))
+        if "year" in keys:
+            found.append(((int(keys["year"]), int(keys["month"]) if "month" in keys else None), path.parent))
+    return sorted(set(found))
+
+
+def partition_files(export: Path, since: Optional[int] = None) -> List[str]:
+    """
+    Fichiers Parquet des partitions qui contiennent des notes postérieures à `since`.
+
+    :param export: dossier de l'export
+    :param since: horodatage (secondes) du début de la fenêtre ; None pour tout l'historique
+    :return: chemins des fichiers, par ordre chronologique
+    """
+    first = None
+    if since is not None:
+        moment = datetime.fromtimestamp(since, tz=timezone.utc)
+        first = (moment.year, moment.month)
+    files = []
+    for (year, month), directory in partitions(export):
+        if first is not None and (year, month if month is not None else 12) < first:
+            continue
+        files.extend(str(path) for path in sorted(directory.glob("*.parquet")))
+    return files
+
+
+def parquet_source(files: List[str]) -> str:
+    """Expression SQL lisant une liste de fichiers Parquet."""
+    if not files:
+        raise ValueError("Aucune partition de notes à lire")
+    return "read_parquet([" + ", ".join(f"'{_quote(path)}'" for path in files) + "])"
+
+
+def latest_timestamp(conn, export: Path) -> Optional[int]:
+    """Horodatage de la note la plus récente de l'export, lu dans la dernière partition seulement."""
+    found = partitions(export)
+    if not found:
+        return None
+    files = [str(path) for path in sorted(found[-1][1].glob("*.parquet"))]
+    return conn.execute(f"SELECT MAX(timestamp) FROM {parquet_source(files)}").fetchone()[0]
+
+
+def _quote(path) -> str:
+    return str(path).replace("'", "''")
+
+
+def main():
+    from app.service.recommendation_service import FILMS_PATH
+
+    parser = argparse.ArgumentParser(description="Export des notes en Parquet partitionné par période.")
+    parser.add_argument("--db", default=str(FILMS_PATH), help="Base DuckDB source")
+    parser.add_argument("--output", default=str(RATINGS_PARQUET_DIR), help="Dossier des exports")
+    parser.add_argument("--period", default=RATINGS_PARQUET_PERIOD, choices=sorted(PERIODS))
+    args = parser.parse_args()
+    export = export_ratings(Path(args.db), Path(args.output), args.period)
+    with duckdb.connect() as conn:
+        rows = conn.execute(f"SELECT COUNT(*) FROM {parquet_source(partition_files(export))}").fetchone()[0]
+    print(f"{rows} notes en {len(partitions(export))} partitions : {export}")
+
+
+if __name__ == "__main__":
+    main()
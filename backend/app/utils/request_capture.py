@@ -0,0 +1,135 @@
+"""
+Capture d'un échantillon des requêtes reçues, pour rejouer un trafic réel (`benchmarks.replay`).
+
+Désactivée par défaut : `CAPTURE_ENABLED=1` l'active. Chaque requête est retenue avec
+la probabilité `CAPTURE_SAMPLE_RATE` ; pour chacune, une ligne JSON est ajoutée au
+fichier `requests-<pid>.jsonl` de `CAPTURE_DIR` (un fichier par worker) : instant de
+réception, méthode, chemin, paramètres, modèle de route, `Accept-Encoding`, statut,
+durée côté serveur et octets envoyés. Ni les corps (les routes de l'API n'en lisent
+pas) ni les autres en-têtes ne sont enregistrés ; les chemins contiennent en revanche
+les identifiants d'utilisateurs.
+
+Les lignes sont écrites par un thread dédié : une requête ne fait que déposer son
+relevé dans une file bornée, et un relevé est abandonné si la file est pleine. La
+capture s'arrête quand le fichier atteint `CAPTURE_MAX_MB` Mo.
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from .metrics import REQUESTS_CAPTURED
+
+CAPTURE_ENABLED = os.getenv("CAPTURE_ENABLED", "0") == "1"
+CAPTURE_SAMPLE_RATE = float(os.getenv("CAPTURE_SAMPLE_RATE", "0.1"))
+CAPTURE_DIR = Path(os.getenv("CAPTURE_DIR", Path(__file__).resolve().parent / "data" / "captures"))
+CAPTURE_MAX_MB = float(os.getenv("CAPTURE_MAX_MB", "100"))
+CAPTURE_EXCLUDE = tuple(prefix for prefix in os.getenv("CAPTURE_EXCLUDE", "/metrics,/admin").split(",") if prefix)
+# Relevés en attente d'écriture au plus
+CAPTURE_QUEUE = 10_000
+
+
+class CaptureWriter:
+    """
+    Écrit les relevés dans un fichier JSONL depuis un thread dédié.
+
+    :param path: fichier de capture (complété s'il existe)
+    :param max_bytes: taille au-delà de laquelle la capture s'arrête
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.full = False
+        self._queue = queue.Queue(maxsize=CAPTURE_QUEUE)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        if self.full:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-capture", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            REQUESTS_CAPTURED.labels("dropped").inc()
+
+    def _run(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            size = f.tell()
+            while size < self.max_bytes:
+                record = self._queue.get()
+                line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+                f.write(line)
+                size += len(line)
+                REQUESTS_CAPTURED.labels("written").inc()
+                if self._queue.empty():
+                    f.flush()
+        self.full = True
+        logger.warning(f"Capture des requêtes arrêtée : {self.path} atteint {CAPTURE_MAX_MB} Mo")
+
+
+class RequestCaptureMiddleware:
+    """
+    Middleware ASGI enregistrant un échantillon des requêtes (voir le docstring du module).
+    """
+
+    def __init__(self, app, enabled: bool = CAPTURE_ENABLED, sample_rate: float = CAPTURE_SAMPLE_RATE,
+                 directory: Path = CAPTURE_DIR):
+        self.app = app
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self._writer = None
+
+    @property
+    def writer(self) -> CaptureWriter:
+        # Créé à la première requête, donc dans le worker : un fichier par processus
+        if self._writer is None:
+            self._writer = CaptureWriter(self.directory / f"requests-{os.getpid()}.jsonl",
+                                         int(CAPTURE_MAX_MB * 1024 * 1024))
+        return self._writer
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not self.enabled or scope["path"].startswith(CAPTURE_EXCLUDE)
+                or random.random() >= self.sample_rate or self.writer.full):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        sent_bytes = 0
+
+        async def send_and_measure(message):
+            nonlocal status_code, sent_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                sent_bytes += len(message.get("body", b""))
+            await send(message)
+
+        received_at = time.time()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            headers = dict(scope["headers"])
+            self.writer.write({
+                "ts": round(received_at, 6),
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope["query_string"].decode("latin-1"),
+                "route": getattr(scope.get("route"), "path", None),
+                "accept_encoding": headers.get(b"accept-encoding", b"").decode("latin-1"),
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - start) * 1e3, 3),
+                "response_bytes": sent_bytes,
+            })
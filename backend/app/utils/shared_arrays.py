@@ -0,0 +1,63 @@
+import sys
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+def share_arrays(arrays: dict[str, np.ndarray]) -> tuple[list[SharedMemory], dict]:
+    """
+    Copie des tableaux NumPy dans des segments de mémoire partagée.
+
+    Le processus appelant reste propriétaire des segments : il doit garder les
+    objets retournés en vie puis appeler `release_arrays(..., unlink=True)`.
+
+    :param arrays: dictionnaire nom -> tableau à partager
+    :return: (segments créés, spécification picklable à transmettre aux workers)
+    """
+    segments = []
+    spec = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+        view[...] = array
+        segments.append(shm)
+        spec[name] = (shm.name, array.shape, array.dtype.str)
+    return segments, spec
+
+
+def attach_arrays(spec: dict) -> tuple[list[SharedMemory], dict[str, np.ndarray]]:
+    """
+    Attache, sans copie, les tableaux décrits par `share_arrays` dans un autre processus.
+
+    :param spec: spécification produite par `share_arrays`
+    :return: (segments attachés, dictionnaire nom -> vue NumPy en lecture seule)
+    """
+    segments = []
+    arrays = {}
+    for name, (shm_name, shape, dtype) in spec.items():
+        if sys.version_info >= (3, 13):
+            shm = SharedMemory(name=shm_name, track=False)
+        else:
+            shm = SharedMemory(name=shm_name)
+            # Seul le propriétaire doit supprimer le segment à la fin.
+            resource_tracker.unregister(shm._name, "shared_memory")
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        view.flags.writeable = False
+        segments.append(shm)
+        arrays[name] = view
+    return segments, arrays
+
+
+def release_arrays(segments: list[SharedMemory], unlink: bool = False):
+    """
+    Ferme des segments de mémoire partagée et, pour le propriétaire, les supprime.
+
+    :param segments: segments retournés par `share_arrays` ou `attach_arrays`
+    :param unlink: True pour supprimer définitivement les segments
+    """
+    for shm in segments:
+        shm.close()
+        if unlink:
+            shm.unlink()
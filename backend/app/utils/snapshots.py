@@ -0,0 +1,127 @@
+"""
+Instantanés de la base DuckDB : les chargeurs écrivent dans une copie publiée de façon atomique.
+
+La base servie (`FILMS_DB_PATH`, par défaut `data/current.db`) est un lien symbolique
+vers un fichier du dossier `snapshots/` voisin. Tant qu'aucun instantané n'a été publié,
+le lien par défaut n'existe pas et la base versionnée `data/films_reco.db` est servie ;
+elle n'est jamais modifiée, le premier chargement part d'une copie. Un chargement copie l'instantané courant, écrit dans la copie,
+puis remplace le lien d'un seul `os.replace`. L'API ouvre une connexion en lecture
+seule par requête sur la cible du lien : chaque requête voit un instantané cohérent
+et passe au nouveau dès la requête suivante, sans jamais attendre le chargeur.
+Les instantanés les plus anciens sont supprimés ; une connexion encore ouverte sur
+l'un d'eux garde son fichier lisible jusqu'à sa fermeture.
+"""
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import duckdb
+from loguru import logger
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+# Base versionnée dans le dépôt, servie tant qu'aucun instantané n'a été publié
+BUNDLED_DB_PATH = DATA_DIR / "films_reco.db"
+# Lien vers l'instantané publié
+DEFAULT_DB_PATH = DATA_DIR / "current.db"
+# Nombre d'instantanés conservés en plus de l'instantané publié
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "2"))
+
+
+def films_db_path() -> Path:
+    """Chemin absolu de la base servie : `FILMS_DB_PATH`, ou le lien par défaut `data/current.db`."""
+    return Path(os.getenv("FILMS_DB_PATH", DEFAULT_DB_PATH)).absolute()
+
+
+def snapshots_dir(db_path: Path) -> Path:
+    return Path(db_path).parent / "snapshots"
+
+
+def current_snapshot(db_path: Path) -> Path:
+    """
+    Fichier servi actuellement : cible du lien `db_path`, ou `db_path` lui-même s'il n'en est pas un.
+    Si le lien par défaut n'a pas encore été publié, la base versionnée.
+    """
+    if not os.path.lexists(db_path) and Path(db_path).absolute() == DEFAULT_DB_PATH:
+        return BUNDLED_DB_PATH
+    return Path(os.path.realpath(db_path))
+
+
+def publish_snapshot(db_path: Path, snapshot: Path):
+    """
+    Fait pointer `db_path` sur `snapshot` de façon atomique.
+
+    :param db_path: chemin de la base servie
+    :param snapshot: instantané complet (sans journal WAL en attente)
+    """
+    db_path = Path(db_path)
+    link = db_path.with_name(f".{db_path.name}.{os.getpid()}.link")
+    try:
+        os.symlink(os.path.relpath(snapshot, db_path.parent), link)
+    except OSError:
+        # Liens symboliques indisponibles (Windows sans privilège) : remplacement du fichier
+        os.replace(snapshot, db_path)
+        return
+    legacy = db_path.exists() and not db_path.is_symlink()
+    os.replace(link, db_path)
+    if legacy:
+        # L'ancienne base, copiée dans le premier instantané, n'est plus servie
+        Path(f"{db_path}.wal").unlink(missing_ok=True)
+    logger.info(f"Instantané publié : {db_path} -> {snapshot.name}")
+
+
+def cleanup_snapshots(db_path: Path, keep: int = SNAPSHOT_KEEP) -> int:
+    """
+    Supprime les instantanés les plus anciens, hors instantané publié.
+
+    :return: nombre d'instantanés supprimés
+    """
+    current = current_snapshot(db_path)
+    snapshots = sorted(
+        (path for path in snapshots_dir(db_path).glob("*.db") if path.resolve() != current),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in snapshots[keep:]:
+        path.unlink(missing_ok=True)
+        Path(f"{path}.wal").unlink(missing_ok=True)
+    return max(len(snapshots) - keep, 0)
+
+
+@contextmanager
+def staging_snapshot(db_path: Path, copy_current: bool = True) -> Iterator[Path]:
+    """
+    Base de travail d'un chargement, publiée à la sortie du bloc s'il se termine sans erreur.
+
+    Le chargeur doit avoir fermé ses connexions à la base de travail en sortant du bloc.
+    En cas d'erreur, la base de travail est supprimée et l'instantané servi est inchangé.
+
+    :param db_path: chemin de la base servie
+    :param copy_current: partir d'une copie de l'instantané courant (sinon d'une base vide)
+    :return: chemin de la base de travail
+    """
+    db_path = Path(db_path)
+    directory = snapshots_dir(db_path)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{db_path.stem}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    staging = directory / f"{name}.staging"
+    current = current_snapshot(db_path)
+    if copy_current and current.exists():
+        shutil.copy2(current, staging)
+        if Path(f"{current}.wal").exists():
+            shutil.copy2(f"{current}.wal", f"{staging}.wal")
+    try:
+        yield staging
+        # Intègre le journal au fichier pour que l'instantané se suffise à lui-même
+        with duckdb.connect(staging) as conn:
+            conn.execute("CHECKPOINT")
+    except BaseException:
+        staging.unlink(missing_ok=True)
+        Path(f"{staging}.wal").unlink(missing_ok=True)
+        raise
+    snapshot = staging.with_name(f"{name}.db")
+    os.replace(staging, snapshot)
+    publish_snapshot(db_path, snapshot)
+    cleanup_snapshots(db_path)
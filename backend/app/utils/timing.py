@@ -0,0 +1,64 @@
+"""
+Chronométrage des étapes d'une requête, renvoyé dans l'en-tête `Server-Timing`.
+
+Le code du service entoure ses étapes de `with stage("score"):` ; le middleware
+`ServerTimingMiddleware` crée un relevé par requête (variable de contexte, propagée
+aux threads des routes synchrones) et l'ajoute à la réponse, par exemple :
+`Server-Timing: data;dur=12.4, train;dur=850.1, score;dur=0.8, metadata;dur=0.3, serialize;dur=0.1, total;dur=865.0`.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+_timings: ContextVar[Optional[dict]] = ContextVar("server_timings", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Ajoute la durée du bloc à l'étape `name` de la requête en cours (sans effet hors requête)."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def server_timing_header(timings: dict, total: float) -> bytes:
+    entries = [f"{name};dur={duration * 1e3:.2f}" for name, duration in timings.items()]
+    entries.append(f"total;dur={total * 1e3:.2f}")
+    return ", ".join(entries).encode("latin-1")
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI ajoutant l'en-tête `Server-Timing` avec les étapes chronométrées par `stage`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        token = _timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(timings, time.perf_counter() - start)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
@@ -0,0 +1,122 @@
+"""
+Outils partagés par les benchmarks : statistiques de latence, serveur uvicorn local
+et base de données synthétique.
+"""
+import datetime
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import requests
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def summarize(latencies: list[float], errors: int = 0, elapsed: float = None) -> dict:
+    """
+    Statistiques d'une série de latences (en secondes).
+
+    :param latencies: durées des requêtes réussies
+    :param errors: nombre de requêtes en erreur
+    :param elapsed: durée totale de la série, pour le débit
+    :return: dictionnaire (nombre, erreurs, débit, moyenne et percentiles en ms)
+    """
+    values = np.asarray(latencies) * 1e3
+    total = len(values) + errors
+    summary = {"requests": total, "errors": errors}
+    if elapsed:
+        summary["throughput_rps"] = total / elapsed
+    if len(values):
+        summary.update({
+            "mean_ms": float(values.mean()),
+            "p50_ms": float(np.percentile(values, 50)),
+            "p95_ms": float(np.percentile(values, 95)),
+            "p99_ms": float(np.percentile(values, 99)),
+            "max_ms": float(values.max()),
+        })
+    return summary
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(env: dict = None, workers: int = 1, port: int = None, extra_args: list = None,
+                 timeout: float = 120):
+    """
+    Lance `uvicorn main:app` dans un sous-processus et attend qu'il réponde.
+
+    :param env: variables d'environnement ajoutées à celles du processus courant
+    :param workers: nombre de workers uvicorn
+    :param port: port d'écoute (un port libre par défaut)
+    :param extra_args: arguments supplémentaires pour uvicorn
+    :param timeout: délai maximal de démarrage en secondes
+    :return: (processus, URL de base)
+    """
+    port = port or free_port()
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"] + (extra_args or [])
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env={**os.environ, **(env or {})})
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn s'est arrêté au démarrage (code {process.returncode})")
+        try:
+            if requests.get(f"{base_url}/", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            time.sleep(0.1)
+    stop_server(process)
+    raise TimeoutError(f"uvicorn n'a pas répondu en {timeout} s")
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_metadata(**extra) -> dict:
+    """Contexte d'exécution enregistré avec les résultats (commit, date, machine)."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "cpus": os.cpu_count(),
+        **extra,
+    }
+
+
+def write_json(path: str, payload: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+
+
+def make_synthetic_db(path: Path, n_ratings: int, seed: int = 42) -> Path:
+    """
+    Crée une base `films`/`ratings` synthétique pour les benchmarks (voir `app.utils.generate_dataset`).
+
+    :param path: fichier DuckDB à créer (remplacé s'il existe)
+    :param n_ratings: nombre approximatif de notes
+    :param seed: graine aléatoire
+    :return: chemin de la base
+    """
+    from app.utils.generate_dataset import generate_dataset
+
+    generate_dataset(Path(path), n_ratings, seed=seed, overwrite=True)
+    return Path(path)
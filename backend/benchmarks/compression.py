@@ -0,0 +1,139 @@
+"""
+Octets transférés et délai avant le premier octet (TTFB) selon l'encodage des réponses.
+
+Un serveur uvicorn local est interrogé en HTTP pour chaque endpoint et chaque encodage
+demandé (`identity`, `gzip`, `zstd`, `br`) ; pour chaque combinaison sont relevés le
+nombre d'octets du corps reçu, le TTFB (réception du premier octet du corps) et la durée
+totale (médianes sur `--repeat` requêtes). Le catalogue complet est aussi mesuré dans
+ses deux formes : l'export diffusé `/films/export` et les pages de `/films` téléchargées
+en parallèle.
+
+Exemple (depuis le dossier backend) :
+    python -m benchmarks.compression --db /tmp/bench.db --output compression.json
+"""
+import argparse
+import http.client
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+
+from benchmarks.common import make_synthetic_db, run_metadata, start_server, stop_server, write_json
+
+ENDPOINTS = {
+    "catalog_page": "/films?page=1",
+    "export": "/films/export",
+    "overview": "/statistics/overview",
+    "range": "/statistics/range?year_from=1980&year_to=2020",
+}
+ENCODINGS = ["identity", "gzip", "zstd", "br"]
+FILMS_PER_PAGE = 20
+PAGE_WORKERS = 8
+
+
+def fetch(host: str, port: int, path: str, encoding: str) -> dict:
+    """Une requête GET : octets du corps (tel que transmis), TTFB et durée totale en secondes."""
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        start = time.perf_counter()
+        conn.request("GET", path, headers={"Accept-Encoding": encoding})
+        response = conn.getresponse()
+        first = response.read1(65536)
+        ttfb = time.perf_counter() - start
+        size = len(first)
+        while chunk := response.read1(65536):
+            size += len(chunk)
+        return {"status": response.status, "encoding": response.getheader("content-encoding", "identity"),
+                "bytes": size, "ttfb": ttfb, "total": time.perf_counter() - start}
+    finally:
+        conn.close()
+
+
+def get_body(host: str, port: int, path: str) -> bytes:
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        conn.request("GET", path, headers={"Accept-Encoding": "identity"})
+        return conn.getresponse().read()
+    finally:
+        conn.close()
+
+
+def measure(host: str, port: int, path: str, encoding: str, repeat: int) -> dict:
+    samples = [fetch(host, port, path, encoding) for _ in range(repeat)]
+    return {
+        "status": samples[-1]["status"],
+        "served_encoding": samples[-1]["encoding"],
+        "bytes": samples[-1]["bytes"],
+        "ttfb_ms": float(np.median([s["ttfb"] for s in samples]) * 1e3),
+        "total_ms": float(np.median([s["total"] for s in samples]) * 1e3),
+    }
+
+
+def measure_pages(host: str, port: int, encoding: str, n_films: int) -> dict:
+    """Catalogue complet par pages de 20 films, téléchargées en parallèle comme le frontend."""
+    n_pages = min(math.ceil(n_films / FILMS_PER_PAGE), 500)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as pool:
+        samples = list(pool.map(lambda page: fetch(host, port, f"/films?page={page}", encoding),
+                                range(1, n_pages + 1)))
+    return {
+        "status": max(s["status"] for s in samples),
+        "served_encoding": samples[0]["encoding"],
+        "bytes": sum(s["bytes"] for s in samples),
+        "ttfb_ms": min(s["ttfb"] for s in samples) * 1e3,
+        "total_ms": (time.perf_counter() - start) * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compression et TTFB des réponses de l'API.")
+    parser.add_argument("--db", help="Base DuckDB à utiliser (créée synthétiquement si absente)")
+    parser.add_argument("--synthetic-ratings", type=int, default=100_000)
+    parser.add_argument("--url", help="Serveur déjà lancé à interroger")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--encodings", nargs="+", default=ENCODINGS, choices=ENCODINGS)
+    parser.add_argument("--repeat", type=int, default=20, help="Requêtes par mesure (médiane)")
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        base_url = args.url
+    else:
+        db_path = Path(args.db) if args.db else Path("/tmp/bench_films.db")
+        if not db_path.exists():
+            make_synthetic_db(db_path, args.synthetic_ratings)
+        process, base_url = start_server(env={"FILMS_DB_PATH": str(db_path.resolve())})
+    url = urlparse(base_url)
+    host, port = url.hostname, url.port or 80
+
+    rows = []
+    try:
+        n_films = json.loads(get_body(host, port, "/films/count"))["total_films"]
+        for name in args.endpoints:
+            for encoding in args.encodings:
+                fetch(host, port, ENDPOINTS[name], encoding)
+                rows.append({"endpoint": name, "encoding": encoding,
+                             **measure(host, port, ENDPOINTS[name], encoding, args.repeat)})
+        for encoding in args.encodings:
+            rows.append({"endpoint": "catalog_pages", "encoding": encoding, **measure_pages(host, port, encoding, n_films)})
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    identity = {row["endpoint"]: row["bytes"] for row in rows if row["encoding"] == "identity"}
+    print(f"{'endpoint':14s} {'encodage':9s} {'servi':9s} {'octets':>10s} {'ratio':>6s} {'TTFB ms':>8s} {'total ms':>9s}")
+    for row in rows:
+        ratio = row["bytes"] / identity[row["endpoint"]] if identity.get(row["endpoint"]) else float("nan")
+        print(f"{row['endpoint']:14s} {row['encoding']:9s} {row['served_encoding']:9s} {row['bytes']:10d} "
+              f"{ratio:6.2f} {row['ttfb_ms']:8.2f} {row['total_ms']:9.2f}")
+    if args.output:
+        write_json(args.output, {"meta": run_metadata(url=base_url, repeat=args.repeat), "results": rows})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Benchmark de charge des endpoints de l'API.
+
+Deux modes :
+- `inprocess` : l'application est appelée via `TestClient`, sans réseau (coût du code seul) ;
+- `server` : un serveur uvicorn local est lancé et interrogé en HTTP.
+
+Chaque scénario est joué à plusieurs niveaux de concurrence ; le débit et les
+percentiles p50/p95/p99 sont écrits dans un fichier JSON. La sous-commande
+`compare` confronte deux fichiers de résultats et signale les régressions.
+
+Exemples (depuis le dossier backend) :
+    python -m benchmarks.endpoints run --mode inprocess --concurrency 1 4 16 --output base.json
+    python -m benchmarks.endpoints run --mode server --workers 2 --db /tmp/bench.db --output new.json
+    python -m benchmarks.endpoints compare base.json new.json --threshold 0.1
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import duckdb
+import numpy as np
+
+from benchmarks.common import (
+    make_synthetic_db, run_metadata, start_server, stop_server, summarize, write_json
+)
+
+SCENARIOS = {
+    "count": lambda ids: ("GET", "/films/count"),
+    "catalog": lambda ids: ("GET", f"/films?page={ids.page()}"),
+    "film": lambda ids: ("GET", f"/films/{ids.film()}"),
+    "search": lambda ids: ("GET", f"/films/search?query={ids.word()}"),
+    "similar": lambda ids: ("GET", f"/films/{ids.film()}/similar?k=10"),
+    "top_year": lambda ids: ("GET", f"/statistics/{ids.year()}"),
+    "genres_year": lambda ids: ("GET", f"/statistics/distribution_genres/{ids.year()}"),
+    "genre_stats": lambda ids: ("GET", f"/statistics/{ids.genre()}/{ids.year()}"),
+    "recommendations": lambda ids: ("POST", f"/recommendation_movies/{ids.user()}?num_recommendations=10"),
+}
+
+
+class Samples:
+    """Identifiants réels tirés de la base, pour que les requêtes touchent des données existantes."""
+
+    def __init__(self, db_path: Path, seed: int = 0):
+        with duckdb.connect(db_path) as conn:
+            self.films = [row[0] for row in conn.execute("SELECT id FROM films").fetchall()]
+            self.users = [row[0] for row in conn.execute("SELECT DISTINCT user_id FROM ratings").fetchall()]
+            self.years = [row[0] for row in conn.execute(
+                "SELECT DISTINCT year(release_date) FROM films WHERE release_date IS NOT NULL").fetchall()]
+            self.words = [row[0].split()[0] for row in conn.execute(
+                "SELECT title FROM films USING SAMPLE 200 ROWS").fetchall() if row[0]]
+            self.genres = sorted({genre.strip() for row in conn.execute("SELECT genres FROM films").fetchall()
+                                  if row[0] for genre in row[0].split(",")})
+        self.n_pages = max(1, min(500, len(self.films) // 20))
+        self._local = threading.local()
+        self._seed = seed
+
+    @property
+    def rng(self):
+        # Un générateur par thread : np.random.Generator n'est pas thread-safe
+        if not hasattr(self._local, "rng"):
+            self._local.rng = np.random.default_rng([self._seed, threading.get_ident()])
+        return self._local.rng
+
+    def _pick(self, values, default):
+        return values[self.rng.integers(len(values))] if values else default
+
+    def film(self):
+        return self._pick(self.films, 1)
+
+    def user(self):
+        return self._pick(self.users, 1)
+
+    def year(self):
+        return self._pick(self.years, 2000)
+
+    def word(self):
+        return self._pick(self.words, "the")
+
+    def genre(self):
+        return self._pick(self.genres, "Drama")
+
+    def page(self):
+        return int(self.rng.integers(1, self.n_pages + 1))
+
+
+def make_requester(mode: str, base_url: str = None):
+    """
+    Fabrique, pour chaque thread, une fonction `request(method, url) -> status`.
+
+    :param mode: `inprocess` ou `server`
+    :param base_url: URL du serveur en mode `server`
+    :return: fonction sans argument retournant un requêteur propre au thread courant
+    """
+    local = threading.local()
+
+    if mode == "inprocess":
+        from fastapi.testclient import TestClient
+        from main import app
+
+        # Une ligne de log par requête du TestClient fausserait les mesures
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+        def client():
+            if not hasattr(local, "client"):
+                local.client = TestClient(app)
+            return local.client
+    else:
+        import requests
+
+        def client():
+            if not hasattr(local, "client"):
+                local.client = requests.Session()
+            return local.client
+
+    def request(method: str, url: str) -> int:
+        target = url if mode == "inprocess" else base_url + url
+        return client().request(method, target, timeout=None if mode == "inprocess" else 60).status_code
+
+    return request
+
+
+def run_scenario(request, build, samples: Samples, concurrency: int, n_requests: int, warmup: int = 5) -> dict:
+    """
+    Joue `n_requests` requêtes d'un scénario avec `concurrency` clients simultanés.
+
+    :param request: fonction d'envoi produite par `make_requester`
+    :param build: fonction construisant (méthode, URL) à partir des échantillons
+    :param samples: identifiants tirés de la base
+    :param concurrency: nombre de clients simultanés
+    :param n_requests: nombre total de requêtes mesurées
+    :param warmup: nombre de requêtes d'échauffement non mesurées
+    :return: statistiques de latence et de débit
+    """
+    for _ in range(warmup):
+        request(*build(samples))
+
+    def one(_):
+        method, url = build(samples)
+        start = time.perf_counter()
+        try:
+            ok = request(method, url) < 500
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(n_requests)))
+    elapsed = time.perf_counter() - start
+    latencies = [duration for ok, duration in results if ok]
+    return summarize(latencies, errors=len(results) - len(latencies), elapsed=elapsed)
+
+
+def run(args) -> dict:
+    db_path = Path(args.db) if args.db else None
+    if db_path is None or not db_path.exists():
+        db_path = make_synthetic_db(db_path or Path("/tmp/bench_films.db"), args.synthetic_ratings)
+    os.environ["FILMS_DB_PATH"] = str(db_path.resolve())
+    samples = Samples(db_path)
+    scenarios = args.scenarios or list(SCENARIOS)
+
+    process = None
+    base_url = args.url
+    if args.mode == "server" and not base_url:
+        process, base_url = start_server(env={"FILMS_DB_PATH": os.environ["FILMS_DB_PATH"]}, workers=args.workers)
+    try:
+        request = make_requester(args.mode, base_url)
+        results = []
+        for name in scenarios:
+            for concurrency in args.concurrency:
+                summary = run_scenario(request, SCENARIOS[name], samples, concurrency, args.requests,
+                                       warmup=args.warmup)
+                results.append({"scenario": name, "concurrency": concurrency, **summary})
+                print(f"{name:16s} c={concurrency:<3d} {summary.get('throughput_rps', 0):8.1f} req/s  "
+                      f"p50={summary.get('p50_ms', float('nan')):7.2f} ms  "
+                      f"p95={summary.get('p95_ms', float('nan')):7.2f} ms  "
+                      f"p99={summary.get('p99_ms', float('nan')):7.2f} ms  errors={summary['errors']}")
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    payload = {
+        "meta": run_metadata(mode=args.mode, db=str(db_path), workers=args.workers, requests=args.requests),
+        "results": results,
+    }
+    if args.output:
+        write_json(args.output, payload)
+        print(f"Résultats écrits dans {args.output}")
+    return payload
+
+
+def compare(base: dict, new: dict, threshold: float) -> list[dict]:
+    """
+    Compare deux séries de résultats scénario par scénario.
+
+    Une régression est signalée si le p95 augmente ou si le débit baisse de plus de `threshold`
+    (en proportion), ou si des erreurs apparaissent.
+
+    :return: une ligne par couple (scénario, concurrence) présent dans les deux séries
+    """
+    reference = {(row["scenario"], row["concurrency"]): row for row in base["results"]}
+    rows = []
+    for row in new["results"]:
+        key = (row["scenario"], row["concurrency"])
+        if key not in reference:
+            continue
+        old = reference[key]
+        p95_change = row.get("p95_ms", np.inf) / old["p95_ms"] - 1 if old.get("p95_ms") else 0.0
+        rps_change = row.get("throughput_rps", 0) / old["throughput_rps"] - 1 if old.get("throughput_rps") else 0.0
+        regression = p95_change > threshold or rps_change < -threshold or row["errors"] > old["errors"]
+        rows.append({"scenario": key[0], "concurrency": key[1], "p95_ms": row.get("p95_ms"),
+                     "p95_change": p95_change, "throughput_rps": row.get("throughput_rps"),
+                     "throughput_change": rps_change, "errors": row["errors"], "regression": regression})
+    return rows
+
+
+def print_comparison(rows: list[dict]):
+    print(f"{'scénario':16s} {'c':>3s} {'p95 ms':>9s} {'Δp95':>8s} {'req/s':>9s} {'Δreq/s':>8s}  statut")
+    for row in rows:
+        status = "RÉGRESSION" if row["regression"] else "ok"
+        print(f"{row['scenario']:16s} {row['concurrency']:3d} {row['p95_ms'] or float('nan'):9.2f} "
+              f"{row['p95_change']:+8.1%} {row['throughput_rps'] or 0:9.1f} {row['throughput_change']:+8.1%}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de charge des endpoints de l'API.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Mesurer les endpoints")
+    run_parser.add_argument("--mode", choices=["inprocess", "server"], default="inprocess")
+    run_parser.add_argument("--url", help="Serveur déjà lancé à interroger (mode server)")
+    run_parser.add_argument("--workers", type=int, default=1, help="Workers uvicorn (mode server)")
+    run_parser.add_argument("--db", help="Base DuckDB à utiliser (créée synthétiquement si absente)")
+    run_parser.add_argument("--synthetic-ratings", type=int, default=100_000)
+    run_parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS))
+    run_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    run_parser.add_argument("--requests", type=int, default=200, help="Requêtes mesurées par scénario")
+    run_parser.add_argument("--warmup", type=int, default=5)
+    run_parser.add_argument("--output", help="Fichier JSON de résultats")
+
+    compare_parser = commands.add_parser("compare", help="Comparer deux fichiers de résultats")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="Variation relative tolérée avant de signaler une régression")
+    compare_parser.add_argument("--output", help="Fichier JSON du rapport")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+        return
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    rows = compare(base, new, args.threshold)
+    print_comparison(rows)
+    if args.output:
+        write_json(args.output, {"base": base["meta"], "new": new["meta"], "comparison": rows})
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Pic de mémoire pendant le chargement des notes en matrice utilisateur-film.
+
+Chaque méthode est mesurée dans un interpréteur neuf : le pic de RSS (`ru_maxrss`) est
+comparé à la RSS après les imports et l'ouverture de la base.
+- `pandas` : tables lues en DataFrame, filtrage `isin` en pandas, puis construction CSR ;
+- `fetchnumpy` : notes filtrées par DuckDB, lues d'un bloc en NumPy, puis construction CSR ;
+- `duckdb` : `RatingsMatrix.from_duckdb`, remplissage des tableaux CSR par tranches.
+
+Exemple (depuis le dossier backend) :
+    python -m benchmarks.load_memory --scales 1m 10m --output load_memory.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.common import BACKEND_DIR, make_synthetic_db, run_metadata, write_json
+
+METHODS = ["pandas", "fetchnumpy", "duckdb"]
+SCALES = {"1m": 1_000_000, "10m": 10_000_000}
+
+PROBE = r"""
+import json, resource, sys, time
+import duckdb, numpy as np
+from app.service.recommendation_service import RatingsMatrix
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+method, db_path = sys.argv[1], sys.argv[2]
+if method == "pandas":
+    import pandas as pd
+conn = duckdb.connect(db_path, read_only=True)
+before = rss()
+start = time.perf_counter()
+if method == "pandas":
+    ratings_df = conn.execute("SELECT user_id, film_id, rating FROM ratings").df()
+    films_df = conn.execute("SELECT id FROM films").df()
+    ratings_df = ratings_df[ratings_df["film_id"].isin(films_df["id"])]
+    matrix = RatingsMatrix.from_ratings(ratings_df["user_id"].to_numpy(), ratings_df["film_id"].to_numpy(),
+                                        ratings_df["rating"].to_numpy())
+    del ratings_df, films_df
+elif method == "fetchnumpy":
+    ratings = conn.execute(
+        "SELECT user_id, film_id, rating FROM ratings WHERE film_id IN (SELECT id FROM films)"
+    ).fetchnumpy()
+    matrix = RatingsMatrix.from_ratings(ratings["user_id"], ratings["film_id"], ratings["rating"])
+    del ratings
+else:
+    matrix = RatingsMatrix.from_duckdb(conn)
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+print(json.dumps({"seconds": elapsed, "peak_mb": (peak - before) / 1e6, "after_mb": (rss() - before) / 1e6,
+                  "matrix_mb": matrix.nbytes / 1e6, "nnz": int(matrix.nnz)}))
+"""
+
+
+def probe(method: str, db_path: Path) -> dict:
+    """Charge la matrice avec `method` dans un interpréteur neuf et retourne les mesures."""
+    output = subprocess.run([sys.executable, "-c", PROBE, method, str(db_path)], cwd=BACKEND_DIR,
+                            env=os.environ, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pic de mémoire du chargement des notes.")
+    parser.add_argument("--scales", nargs="+", default=list(SCALES), choices=list(SCALES))
+    parser.add_argument("--db-dir", default="/tmp", help="Dossier des bases synthétiques (créées si absentes)")
+    parser.add_argument("--methods", nargs="+", default=METHODS, choices=METHODS)
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    rows = []
+    for scale in args.scales:
+        db_path = Path(args.db_dir) / f"bench_films_{scale}.db"
+        if not db_path.exists():
+            make_synthetic_db(db_path, SCALES[scale])
+        for method in args.methods:
+            rows.append({"scale": scale, "method": method, **probe(method, db_path)})
+
+    print(f"{'échelle':7s} {'méthode':10s} {'notes':>10s} {'durée s':>8s} {'pic Mo':>8s} "
+          f"{'après Mo':>9s} {'matrice Mo':>11s} {'pic/matrice':>12s}")
+    for row in rows:
+        print(f"{row['scale']:7s} {row['method']:10s} {row['nnz']:10d} {row['seconds']:8.2f} {row['peak_mb']:8.1f} "
+              f"{row['after_mb']:9.1f} {row['matrix_mb']:11.1f} {row['peak_mb'] / row['matrix_mb']:12.2f}")
+    if args.output:
+        write_json(args.output, {"meta": run_metadata(), "results": rows})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Rapport sur la quantification des facteurs latents (moteur `quantized`).
+
+Pour chaque moteur de base (SVD, ALS), le modèle float32 est entraîné puis quantifié
+en float16 et en int8, et l'on compare à float32, sur un échantillon d'utilisateurs :
+- la mémoire des facteurs (codes et échelles contre facteurs float32) ;
+- l'accord des top-k : part des films recommandés dont le score float32 atteint le
+  k-ième meilleur score float32 (les ex æquo comptent comme accord), et part des
+  mêmes identifiants ;
+- la durée de calcul des scores par utilisateur.
+Les mesures sont faites sans recalcul des candidats, puis avec `--rerank` candidats
+recalculés en pleine précision.
+
+Exemple (depuis le dossier backend) :
+    python -m benchmarks.quantization --db /tmp/films_1m.db --engines svd als --top-k 10 --users 500
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+
+from benchmarks.common import make_synthetic_db, run_metadata, write_json
+from app.service.quantization import QUANTIZED_DTYPES
+from app.service.recommendation_service import QuantizedEngine, RatingsMatrix, make_engine
+
+
+def load_matrix(db_path: Path) -> RatingsMatrix:
+    with duckdb.connect(db_path, read_only=True) as conn:
+        ratings = conn.execute(
+            "SELECT user_id, film_id, rating FROM ratings WHERE film_id IN (SELECT id FROM films)"
+        ).fetchnumpy()
+    return RatingsMatrix.from_ratings(ratings["user_id"], ratings["film_id"], ratings["rating"])
+
+
+def top_k_agreement(reference: np.ndarray, scores: np.ndarray, k: int) -> tuple[float, float]:
+    """
+    Accord des top-k de `scores` avec ceux de `reference`.
+
+    :return: (accord en tenant compte des ex æquo de la référence, recouvrement des identifiants)
+    """
+    expected = np.argpartition(-reference, k - 1, axis=1)[:, :k]
+    found = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    kth = np.take_along_axis(reference, expected, axis=1).min(axis=1, keepdims=True)
+    # Tolérance pour les écarts d'arrondi entre deux calculs float32 du même score
+    tie_aware = float(np.mean(np.take_along_axis(reference, found, axis=1) >= kth - 1e-5))
+    overlap = float(np.mean([len(np.intersect1d(a, b)) / k for a, b in zip(expected, found)]))
+    return tie_aware, overlap
+
+
+def timed_scores(engine, users: np.ndarray, batch: int = 1) -> tuple[np.ndarray, float]:
+    """Scores des utilisateurs par lots de `batch` et durée moyenne par utilisateur (en secondes)."""
+    start = time.perf_counter()
+    scores = np.vstack([engine.score_batch(users[i:i + batch]) for i in range(0, len(users), batch)])
+    return scores, (time.perf_counter() - start) / len(users)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mémoire et qualité des facteurs quantifiés.")
+    parser.add_argument("--db", help="Base DuckDB à utiliser (créée synthétiquement si absente)")
+    parser.add_argument("--synthetic-ratings", type=int, default=1_000_000)
+    parser.add_argument("--engines", nargs="+", default=["svd", "als"], choices=["svd", "als"])
+    parser.add_argument("--dtypes", nargs="+", default=list(QUANTIZED_DTYPES), choices=QUANTIZED_DTYPES)
+    parser.add_argument("--n-components", type=int, default=20)
+    parser.add_argument("--rerank", type=int, default=200, help="Candidats recalculés en pleine précision")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--users", type=int, default=500, help="Taille de l'échantillon d'utilisateurs")
+    parser.add_argument("--min-agreement", type=float, default=0.95,
+                        help="Accord minimal attendu avec recalcul des candidats")
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    db_path = Path(args.db) if args.db else Path("/tmp/bench_films_quantization.db")
+    if not db_path.exists():
+        make_synthetic_db(db_path, args.synthetic_ratings)
+    matrix = load_matrix(db_path)
+    rng = np.random.default_rng(0)
+    users = np.sort(rng.choice(matrix.shape[0], min(args.users, matrix.shape[0]), replace=False))
+    print(f"{matrix.shape[0]} utilisateurs, {matrix.shape[1]} films, {len(users)} utilisateurs échantillonnés")
+
+    rows = []
+    for base_name in args.engines:
+        base = make_engine(base_name, args.n_components).fit(matrix)
+        reference, reference_time = timed_scores(base, users)
+        float32_bytes = sum(factors.nbytes for factors in base.factors())
+        rows.append({"engine": base_name, "dtype": "float32", "rerank": 0, "memory_mb": float32_bytes / 1e6,
+                     "saved": 0.0, "agreement": 1.0, "overlap": 1.0, "ms_per_user": reference_time * 1e3})
+        for dtype in args.dtypes:
+            for rerank in (0, args.rerank):
+                engine = QuantizedEngine.from_engine(base, dtype, rerank)
+                scores, elapsed = timed_scores(engine, users)
+                agreement, overlap = top_k_agreement(reference, scores, args.top_k)
+                rows.append({"engine": base_name, "dtype": dtype, "rerank": rerank,
+                             "memory_mb": engine.nbytes / 1e6, "saved": 1 - engine.nbytes / float32_bytes,
+                             "agreement": agreement, "overlap": overlap, "ms_per_user": elapsed * 1e3})
+
+    print(f"{'moteur':6s} {'type':8s} {'rerank':>6s} {'Mo':>8s} {'gain':>6s} "
+          f"{'accord@' + str(args.top_k):>9s} {'ids':>6s} {'ms/util.':>9s}")
+    for row in rows:
+        print(f"{row['engine']:6s} {row['dtype']:8s} {row['rerank']:6d} {row['memory_mb']:8.2f} {row['saved']:6.1%} "
+              f"{row['agreement']:9.1%} {row['overlap']:6.1%} {row['ms_per_user']:9.3f}")
+
+    if args.output:
+        write_json(args.output, {"meta": run_metadata(db=str(db_path), top_k=args.top_k, users=len(users)),
+                                 "results": rows})
+    failed = any(row["agreement"] < args.min_agreement for row in rows if row["rerank"] > 0)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Rejeu d'un trafic capturé par `app.utils.request_capture` contre un serveur local.
+
+Les requêtes des fichiers JSONL sont rejouées dans l'ordre de leur réception et au
+même rythme, accéléré ou ralenti par `--speed` (2 = deux fois plus vite, 0 = sans
+attente, au débit maximal du client). Un pool de `--concurrency` threads envoie les
+requêtes ; le retard pris sur le calendrier d'origine est mesuré, pour savoir si le
+client a tenu le rythme demandé. Chaque requête est envoyée avec l'`Accept-Encoding`
+capturé.
+
+Par endpoint (méthode et modèle de route), sont rapportés le nombre de requêtes, les
+erreurs (exception ou statut 5xx), les statuts différents de ceux de la capture, les
+percentiles de latence du rejeu et, pour comparaison, ceux mesurés côté serveur à
+la capture.
+
+Exemple (depuis le dossier backend) :
+    python -m benchmarks.replay app/utils/data/captures/*.jsonl --db /tmp/bench.db --speed 10 --output replay.json
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+
+from benchmarks.common import run_metadata, start_server, stop_server, summarize, write_json
+
+
+def load_capture(paths: list, limit: int = None) -> list:
+    """Relevés de plusieurs fichiers de capture, par ordre de réception."""
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    records.sort(key=lambda record: record["ts"])
+    return records[:limit] if limit else records
+
+
+def endpoint(record: dict) -> str:
+    return f"{record['method']} {record.get('route') or record['path']}"
+
+
+class Replayer:
+    """
+    Client HTTP du rejeu : une connexion persistante par thread.
+
+    :param host: hôte du serveur
+    :param port: port du serveur
+    :param timeout: délai maximal d'une requête (secondes)
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 60):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if getattr(self._local, "conn", None) is None:
+            self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._local.conn
+
+    def send(self, record: dict) -> dict:
+        """Rejoue une requête : statut (None en cas d'exception), latence et octets reçus."""
+        url = record["path"] + (f"?{record['query']}" if record.get("query") else "")
+        headers = {"Accept-Encoding": record.get("accept_encoding") or "identity"}
+        start = time.perf_counter()
+        reused = getattr(self._local, "conn", None) is not None
+        try:
+            conn = self._connection()
+            conn.request(record["method"], url, headers=headers)
+            response = conn.getresponse()
+            size = len(response.read())
+            return {"status": response.status, "latency": time.perf_counter() - start, "bytes": size}
+        except (OSError, http.client.HTTPException) as e:
+            self._local.conn = None
+            if reused and isinstance(e, (ConnectionError, http.client.RemoteDisconnected)):
+                # Connexion persistante fermée par le serveur entre deux requêtes : nouvel essai
+                return self.send(record)
+            return {"status": None, "latency": time.perf_counter() - start, "bytes": 0, "error": type(e).__name__}
+
+
+def replay(replayer: Replayer, records: list, speed: float, concurrency: int) -> tuple[list, float]:
+    """
+    Rejoue les relevés selon leur calendrier d'origine divisé par `speed`.
+
+    :return: (résultat de chaque requête avec son retard sur le calendrier, durée totale)
+    """
+    results = [None] * len(records)
+    origin = records[0]["ts"] if records else 0
+
+    def run(index: int, due: float):
+        lag = time.perf_counter() - due
+        results[index] = {**replayer.send(records[index]), "lag": max(lag, 0.0)}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index, record in enumerate(records):
+            due = start + ((record["ts"] - origin) / speed if speed > 0 else 0)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, index, due)
+    return results, time.perf_counter() - start
+
+
+def report(records: list, results: list, elapsed: float) -> list:
+    """Statistiques par endpoint, puis pour l'ensemble du rejeu (`*`)."""
+    groups = defaultdict(list)
+    for record, result in zip(records, results):
+        groups[endpoint(record)].append((record, result))
+    groups["*"] = list(zip(records, results))
+
+    rows = []
+    for name, pairs in sorted(groups.items()):
+        ok = [result["latency"] for _, result in pairs if result["status"] is not None and result["status"] < 500]
+        captured = np.array([record["duration_ms"] for record, _ in pairs])
+        rows.append({
+            "endpoint": name,
+            **summarize(ok, errors=len(pairs) - len(ok), elapsed=elapsed),
+            "status_mismatch": sum(1 for record, result in pairs if result["status"] != record["status"]),
+            "bytes": sum(result["bytes"] for _, result in pairs),
+            "captured_p50_ms": float(np.percentile(captured, 50)),
+            "captured_p95_ms": float(np.percentile(captured, 95)),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejeu d'un trafic capturé contre un serveur local.")
+    parser.add_argument("captures", nargs="+", help="Fichiers JSONL de capture")
+    parser.add_argument("--url", help="Serveur déjà lancé à interroger")
+    parser.add_argument("--db", help="Base DuckDB du serveur lancé pour le rejeu (sans --url)")
+    parser.add_argument("--workers", type=int, default=1, help="Workers uvicorn du serveur lancé")
+    parser.add_argument("--speed", type=float, default=1.0, help="Facteur d'accélération (0 = sans attente)")
+    parser.add_argument("--concurrency", type=int, default=64, help="Requêtes simultanées au plus")
+    parser.add_argument("--limit", type=int, help="Nombre maximal de requêtes rejouées")
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    records = load_capture(args.captures, args.limit)
+    if not records:
+        parser.error("aucune requête dans les fichiers de capture")
+    span = records[-1]["ts"] - records[0]["ts"]
+    pace = f"à la vitesse x{args.speed:g}" if args.speed > 0 else "sans attente"
+    print(f"{len(records)} requêtes capturées sur {span:.1f} s, rejouées {pace}")
+
+    process = None
+    if args.url:
+        base_url = args.url
+    else:
+        # Le serveur du rejeu ne capture pas le trafic rejoué
+        env = {"CAPTURE_ENABLED": "0", **({"FILMS_DB_PATH": str(Path(args.db).resolve())} if args.db else {})}
+        process, base_url = start_server(env=env, workers=args.workers)
+    url = urlparse(base_url)
+    try:
+        results, elapsed = replay(Replayer(url.hostname, url.port or 80), records, args.speed, args.concurrency)
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    rows = report(records, results, elapsed)
+    lags = np.array([result["lag"] for result in results]) * 1e3
+    print(f"Rejoué en {elapsed:.1f} s ; retard sur le calendrier p50 {np.percentile(lags, 50):.1f} ms, "
+          f"p95 {np.percentile(lags, 95):.1f} ms")
+    print(f"{'endpoint':40s} {'req.':>6s} {'err.':>5s} {'statut≠':>7s} {'p50 ms':>8s} {'p95 ms':>8s} "
+          f"{'p99 ms':>8s} {'capt. p50':>9s} {'capt. p95':>9s}")
+    for row in rows:
+        print(f"{row['endpoint'][:40]:40s} {row['requests']:6d} {row['errors']:5d} {row['status_mismatch']:7d} "
+              f"{row.get('p50_ms', float('nan')):8.1f} {row.get('p95_ms', float('nan')):8.1f} "
+              f"{row.get('p99_ms', float('nan')):8.1f} {row['captured_p50_ms']:9.1f} {row['captured_p95_ms']:9.1f}")
+    if args.output:
+        write_json(args.output, {
+            "meta": run_metadata(url=base_url, speed=args.speed, concurrency=args.concurrency,
+                                 captures=[str(path) for path in args.captures]),
+            "lag_p50_ms": float(np.percentile(lags, 50)),
+            "lag_p95_ms": float(np.percentile(lags, 95)),
+            "results": rows,
+        })
+
+
+if __name__ == "__main__":
+    main()
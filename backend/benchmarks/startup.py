@@ -0,0 +1,129 @@
+"""
+Benchmark de démarrage à froid de l'API.
+
+Chaque mesure est faite dans un interpréteur neuf :
+- durée de `import main` et modules lourds chargés par l'import ;
+- durée de la première réponse de `/films/count` et de la première recommandation
+  (modèle déjà sauvegardé : chargement, pas d'entraînement) ;
+- en option, délai entre le lancement d'uvicorn et sa première réponse HTTP.
+
+Exemples (depuis le dossier backend) :
+    python -m benchmarks.startup --runs 5 --output startup.json
+    python -m benchmarks.startup --runs 5 --baseline startup.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.common import BACKEND_DIR, make_synthetic_db, run_metadata, start_server, stop_server, write_json
+
+# Modules qui ne doivent pas être chargés pour servir les requêtes
+HEAVY_MODULES = ["pandas", "sklearn", "scipy", "sqlalchemy", "matplotlib", "pyarrow", "requests"]
+
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+heavy = sorted(name for name in HEAVY if name in sys.modules)
+
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+t0 = time.perf_counter()
+client.get("/films/count").raise_for_status()
+first_count = time.perf_counter() - t0
+t0 = time.perf_counter()
+client.post(f"/recommendation_movies/{USER_ID}?num_recommendations=10").raise_for_status()
+first_reco = time.perf_counter() - t0
+t0 = time.perf_counter()
+client.post(f"/recommendation_movies/{USER_ID}?num_recommendations=10").raise_for_status()
+second_reco = time.perf_counter() - t0
+serving_heavy = sorted(name for name in HEAVY if name in sys.modules)
+print(json.dumps({
+    "import_s": imported - start,
+    "first_count_s": first_count,
+    "first_recommendation_s": first_reco,
+    "warm_recommendation_s": second_reco,
+    "heavy_after_import": heavy,
+    "heavy_after_requests": serving_heavy,
+}))
+"""
+
+
+def probe(env: dict, user_id: int) -> dict:
+    """Lance une mesure dans un interpréteur neuf et retourne ses résultats."""
+    code = PROBE.replace("HEAVY", repr(HEAVY_MODULES)).replace("USER_ID", str(user_id))
+    output = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env={**os.environ, **env},
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def server_ready_time(env: dict) -> float:
+    """Délai entre le lancement d'uvicorn et sa première réponse à `GET /`."""
+    start = time.perf_counter()
+    process, _ = start_server(env=env)
+    elapsed = time.perf_counter() - start
+    stop_server(process)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage à froid de l'API.")
+    parser.add_argument("--db", help="Base DuckDB à utiliser (créée synthétiquement si absente)")
+    parser.add_argument("--synthetic-ratings", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--server", action="store_true", help="Mesurer aussi le démarrage d'uvicorn")
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    parser.add_argument("--baseline", help="Résultats de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Hausse relative tolérée des médianes avant de signaler une régression")
+    args = parser.parse_args()
+
+    db_path = Path(args.db) if args.db else Path("/tmp/bench_films.db")
+    if not db_path.exists():
+        make_synthetic_db(db_path, args.synthetic_ratings)
+    env = {"FILMS_DB_PATH": str(db_path.resolve())}
+    import duckdb
+    with duckdb.connect(db_path) as conn:
+        user_id = conn.execute("SELECT MIN(user_id) FROM ratings").fetchone()[0] or 1
+
+    # Une première exécution entraîne et sauvegarde le modèle : seules les suivantes sont mesurées
+    probe(env, user_id)
+    runs = [probe(env, user_id) for _ in range(args.runs)]
+    metrics = {
+        name: float(np.median([run[name] for run in runs]))
+        for name in ("import_s", "first_count_s", "first_recommendation_s", "warm_recommendation_s")
+    }
+    if args.server:
+        metrics["server_ready_s"] = float(np.median([server_ready_time(env) for _ in range(args.runs)]))
+    heavy = sorted({name for run in runs for name in run["heavy_after_requests"]})
+
+    for name, value in metrics.items():
+        print(f"{name:24s} {value * 1e3:9.1f} ms")
+    print(f"modules lourds chargés : {', '.join(heavy) or 'aucun'}")
+
+    payload = {"meta": run_metadata(db=str(db_path), runs=args.runs), "metrics": metrics, "heavy_modules": heavy}
+    if args.output:
+        write_json(args.output, payload)
+
+    failed = bool(heavy)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+        for name, value in metrics.items():
+            if name in baseline and baseline[name] > 0:
+                change = value / baseline[name] - 1
+                status = "RÉGRESSION" if change > args.threshold else "ok"
+                failed = failed or change > args.threshold
+                print(f"{name:24s} {change:+8.1%}  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Coût de l'entraînement selon la fenêtre d'historique et la source des notes.
+
+Les notes de la base sont exportées en Parquet partitionné (`app.utils.ratings_parquet`),
+puis, pour chaque source (`duckdb`, `parquet`) et chaque fenêtre (`0` = tout
+l'historique), la matrice d'entraînement est construite puis le moteur entraîné,
+comme dans `load_data` et `get_or_train_model` : les notes de la fenêtre sont placées
+sur les axes de la matrice complète, lue une fois au départ, et les utilisateurs sans
+note dans la fenêtre reçoivent leurs facteurs par `fold_in`. Sont relevés le nombre
+de fichiers Parquet lus, le nombre de notes retenues, les utilisateurs ajoutés par
+`fold_in` et les durées de chargement et d'entraînement. Avec une fenêtre fixe, la
+durée d'entraînement ne dépend plus de la longueur de l'historique ; la lecture de la
+matrice complète, nécessaire au service, en dépend toujours.
+
+Exemple (depuis le dossier backend) :
+    python -m benchmarks.training_window --db /tmp/films_10m.db --windows 0 365 90 --engine als
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.common import make_synthetic_db, run_metadata, write_json
+from app.service.recommendation_service import RATINGS_SOURCE, RatingsMatrix, get_or_train_model, training_source
+from app.utils import ratings_parquet
+from app.utils.db import connect_read_only
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durée d'entraînement selon la fenêtre d'historique.")
+    parser.add_argument("--db", help="Base DuckDB à utiliser (créée synthétiquement si absente)")
+    parser.add_argument("--synthetic-ratings", type=int, default=1_000_000)
+    parser.add_argument("--sources", nargs="+", default=["duckdb", "parquet"], choices=["duckdb", "parquet"])
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 730, 365, 90], help="Fenêtres en jours")
+    parser.add_argument("--half-life", type=float, default=0, help="Demi-vie des poids en jours")
+    parser.add_argument("--engine", default="svd", choices=["svd", "als"])
+    parser.add_argument("--period", default="month", choices=sorted(ratings_parquet.PERIODS))
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    db_path = Path(args.db) if args.db else Path("/tmp/bench_films.db")
+    if not db_path.exists():
+        make_synthetic_db(db_path, args.synthetic_ratings)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        export = ratings_parquet.export_ratings(db_path, Path(directory), args.period)
+        print(f"Export Parquet : {len(ratings_parquet.partitions(export))} partitions "
+              f"en {time.perf_counter() - start:.2f} s")
+        with connect_read_only(db_path) as conn:
+            latest = conn.execute("SELECT MAX(timestamp) FROM ratings").fetchone()[0]
+            start = time.perf_counter()
+            ratings_matrix = RatingsMatrix.from_duckdb(conn)
+            full_load_time = time.perf_counter() - start
+        print(f"Matrice complète : {ratings_matrix.nnz} notes lues en {full_load_time:.2f} s")
+        for source in args.sources:
+            for window in args.windows:
+                with connect_read_only(db_path) as conn:
+                    start = time.perf_counter()
+                    ratings_source, weight = training_source(conn, source, window, args.half_life,
+                                                               parquet_dir=Path(directory))
+                    if ratings_source == RATINGS_SOURCE:
+                        matrix = RatingsMatrix.from_duckdb(conn, weight=weight)
+                    else:
+                        matrix = RatingsMatrix.from_duckdb(conn, source=ratings_source, weight=weight,
+                                                           axes=ratings_matrix)
+                    load_time = time.perf_counter() - start
+                since = int(latest - window * 86400) if window > 0 else None
+                files = len(ratings_parquet.partition_files(export, since)) if source == "parquet" else 0
+                counts = np.diff(matrix.indptr)
+                start = time.perf_counter()
+                get_or_train_model(ratings_matrix, args.engine, params={}, training_matrix=matrix)
+                rows.append({"source": source, "window_days": window, "files": files, "ratings": matrix.nnz,
+                             "users": int(np.count_nonzero(counts)), "folded_in": int(np.count_nonzero(counts == 0)),
+                             "load_s": load_time, "fit_s": time.perf_counter() - start})
+
+    print(f"{'source':8s} {'fenêtre':>8s} {'fichiers':>8s} {'notes':>10s} {'utilis.':>8s} {'fold-in':>8s} "
+          f"{'chargement s':>13s} {'entraîn. s':>11s}")
+    for row in rows:
+        print(f"{row['source']:8s} {row['window_days']:8.0f} {row['files']:8d} {row['ratings']:10d} {row['users']:8d} "
+              f"{row['folded_in']:8d} {row['load_s']:13.2f} {row['fit_s']:11.2f}")
+    if args.output:
+        write_json(args.output, {"meta": run_metadata(engine=args.engine, half_life_days=args.half_life,
+                                                      period=args.period, full_load_s=full_load_time),
+                                 "results": rows})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Mémoire par worker en mode multi-processus (`uvicorn --workers N`).
+
+Pour chaque nombre de workers, le serveur est lancé, chaque worker reçoit des
+demandes de recommandation, puis la mémoire de chaque worker est lue dans
+`/proc/<pid>/smaps` (Linux) :
+- RSS : mémoire résidente, pages partagées comprises ;
+- USS : mémoire privée du worker ;
+- « modèle » : pages des fichiers du modèle sauvegardé (mémoire mappée) et leur PSS,
+  divisée entre les workers qui les partagent.
+
+Le modèle est entraîné et son top-N précalculé avant les mesures. La commande échoue
+si la mémoire privée d'un worker augmente de plus de `--threshold` quand on ajoute des
+workers, ou si un worker ne sert pas le modèle depuis les fichiers mappés.
+Avec `--update`, une note est ajoutée à la base et l'on vérifie que tous les workers
+passent au nouveau modèle sans redémarrage.
+
+Exemple (depuis le dossier backend) :
+    python -m benchmarks.workers_memory --workers 1 2 4 --db /tmp/films_1m.db --update
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import requests
+
+from benchmarks.common import BACKEND_DIR, make_synthetic_db, run_metadata, start_server, stop_server, write_json
+from app.service.recommendation_service import MODELS_DIR
+
+
+def worker_pids(master_pid: int) -> list[int]:
+    """Workers uvicorn : processus enfants du maître (le maître lui-même s'il n'y en a pas)."""
+    children_path = Path(f"/proc/{master_pid}/task/{master_pid}/children")
+    pids = [int(pid) for pid in children_path.read_text().split()] if children_path.exists() else []
+    workers = [pid for pid in pids if b"resource_tracker" not in Path(f"/proc/{pid}/cmdline").read_bytes()]
+    return workers or [master_pid]
+
+
+def memory_usage(pid: int, models_dir: Path = MODELS_DIR) -> dict:
+    """
+    Mémoire d'un processus d'après `/proc/<pid>/smaps`, en octets.
+
+    :return: rss, uss, pss, et les mêmes mesures restreintes aux fichiers du modèle,
+        ainsi que les dossiers de modèles mappés
+    """
+    usage = dict.fromkeys(["rss", "uss", "pss", "model_rss", "model_pss"], 0)
+    versions = set()
+    in_model = False
+    models_prefix = str(models_dir)
+    with open(f"/proc/{pid}/smaps", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            fields = line.split()
+            if not fields:
+                continue
+            if not fields[0].endswith(":"):
+                # En-tête d'un mapping : adresse, droits, ..., chemin éventuel
+                path = fields[5] if len(fields) > 5 else ""
+                in_model = path.startswith(models_prefix)
+                if in_model:
+                    versions.add(Path(path).relative_to(models_dir).parts[0])
+                continue
+            key, value = fields[0][:-1], int(fields[1]) * 1024 if len(fields) > 1 and fields[1].isdigit() else 0
+            if key == "Rss":
+                usage["rss"] += value
+                usage["model_rss"] += value if in_model else 0
+            elif key == "Pss":
+                usage["pss"] += value
+                usage["model_pss"] += value if in_model else 0
+            elif key in ("Private_Clean", "Private_Dirty"):
+                usage["uss"] += value
+    usage["versions"] = sorted(versions)
+    return usage
+
+
+def warm_workers(base_url: str, pids: list[int], user_ids: list[int], rounds: int = 20) -> bool:
+    """
+    Envoie des recommandations jusqu'à ce que chaque worker ait mappé le modèle.
+    """
+    rng = np.random.default_rng(0)
+    session = requests.Session()
+
+    def send(_):
+        user_id = int(rng.choice(user_ids))
+        session.post(f"{base_url}/recommendation_movies/{user_id}?num_recommendations=10", timeout=300)
+
+    for _ in range(rounds):
+        with ThreadPoolExecutor(max_workers=4 * len(pids)) as pool:
+            list(pool.map(send, range(20 * len(pids))))
+        if all(memory_usage(pid)["versions"] for pid in pids):
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def measure(n_workers: int, env: dict, user_ids: list[int]) -> dict:
+    process, base_url = start_server(env=env, workers=n_workers)
+    try:
+        # Laisse les workers terminer leur démarrage avant de les compter
+        time.sleep(1)
+        pids = worker_pids(process.pid)
+        warmed = warm_workers(base_url, pids, user_ids)
+        usages = [memory_usage(pid) for pid in pids]
+    finally:
+        stop_server(process)
+    row = {"workers": n_workers, "warmed": warmed}
+    for key in ("rss", "uss", "pss", "model_rss", "model_pss"):
+        row[f"{key}_mb"] = float(np.mean([usage[key] for usage in usages]) / 1e6)
+    row["total_pss_mb"] = float(sum(usage["pss"] for usage in usages) / 1e6)
+    return row
+
+
+def check_update(env: dict, n_workers: int, db_path: Path, user_ids: list[int]) -> bool:
+    """Ajoute une note pendant que le serveur tourne et vérifie que tous les workers servent le nouveau modèle."""
+    process, base_url = start_server(env={**env, "RECO_MODEL_CHECK_INTERVAL": "1"}, workers=n_workers)
+    try:
+        time.sleep(1)
+        pids = worker_pids(process.pid)
+        warm_workers(base_url, pids, user_ids)
+        before = {version for pid in pids for version in memory_usage(pid)["versions"]}
+        with duckdb.connect(db_path) as conn:
+            user_id, film_id = conn.execute("""
+                SELECT u.user_id, f.id FROM (SELECT MIN(user_id) AS user_id FROM ratings) u, films f
+                WHERE f.id NOT IN (SELECT film_id FROM ratings WHERE user_id = u.user_id) LIMIT 1
+            """).fetchone()
+            conn.execute("INSERT INTO ratings VALUES (?, ?, 5.0, ?)", [user_id, film_id, int(time.time())])
+        time.sleep(1.5)
+        start = time.perf_counter()
+        deadline = time.monotonic() + 300
+        while time.monotonic() < deadline:
+            warm_workers(base_url, pids, user_ids, rounds=1)
+            mapped = [set(memory_usage(pid)["versions"]) - before for pid in pids]
+            if all(mapped):
+                print(f"Nouveau modèle {sorted(set.union(*mapped))} servi par {len(pids)} workers "
+                      f"en {time.perf_counter() - start:.1f} s, sans redémarrage.")
+                return True
+        print("Tous les workers ne sont pas passés au nouveau modèle.")
+        return False
+    finally:
+        stop_server(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mémoire par worker en mode multi-processus.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--db", help="Base DuckDB à utiliser (créée synthétiquement si absente)")
+    parser.add_argument("--synthetic-ratings", type=int, default=1_000_000)
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Hausse relative tolérée de la mémoire privée par worker")
+    parser.add_argument("--update", action="store_true", help="Vérifier la propagation d'un nouveau modèle")
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    db_path = Path(args.db) if args.db else Path("/tmp/bench_films_workers.db")
+    if not db_path.exists():
+        make_synthetic_db(db_path, args.synthetic_ratings)
+    env = {"FILMS_DB_PATH": str(db_path.resolve())}
+    with duckdb.connect(db_path) as conn:
+        user_ids = [row[0] for row in conn.execute("SELECT DISTINCT user_id FROM ratings LIMIT 1000").fetchall()]
+    # Entraînement et précalcul hors des serveurs mesurés
+    subprocess.run([sys.executable, "-m", "app.service.top_n_store"], cwd=BACKEND_DIR,
+                   env={**os.environ, **env}, check=True, capture_output=True)
+
+    rows = [measure(n_workers, env, user_ids) for n_workers in args.workers]
+    print(f"{'workers':>7s} {'RSS Mo':>8s} {'USS Mo':>8s} {'modèle RSS':>11s} {'modèle PSS':>11s} {'PSS total':>10s}")
+    for row in rows:
+        print(f"{row['workers']:7d} {row['rss_mb']:8.1f} {row['uss_mb']:8.1f} {row['model_rss_mb']:11.1f} "
+              f"{row['model_pss_mb']:11.1f} {row['total_pss_mb']:10.1f}")
+
+    base_uss = rows[0]["uss_mb"]
+    failed = any(row["uss_mb"] > base_uss * (1 + args.threshold) for row in rows)
+    failed = failed or not all(row["warmed"] and row["model_rss_mb"] > 0 for row in rows)
+    if args.update:
+        failed = not check_update(env, max(args.workers), db_path, user_ids) or failed
+
+    if args.output:
+        write_json(args.output, {"meta": run_metadata(db=str(db_path)), "results": rows})
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,21 @@ import os
 from fastapi.middleware.cors import CORSMiddleware
 sys.path.append(os.path.join(os.path.dirname(__file__)))
 from app.routers.recommender import router
+from app.routers.metrics import router as metrics_router
+from app.routers.admin import router as admin_router
+from app.routers.posters import router as posters_router
+from app.utils.admission import AdmissionMiddleware
+from app.utils.compression import CompressionMiddleware
+from app.utils.metrics import MetricsMiddleware
+from app.utils.profiler import ProfilerMiddleware
+from app.utils.request_capture import RequestCaptureMiddleware
+from app.utils.timing import ServerTimingMiddleware
 
 ##Fastapi
 app = FastAPI()
 
+# Limite les requêtes simultanées par budget de routes (503 + Retry-After au-delà de la file d'attente)
+app.add_middleware(AdmissionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,8 +32,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression gzip/zstd/brotli négociée des réponses JSON, y compris en flux
+app.add_middleware(CompressionMiddleware)
+# Mesure du nombre et de la durée des requêtes par route
+app.add_middleware(MetricsMiddleware)
+# Durée des étapes de chaque requête dans l'en-tête Server-Timing
+app.add_middleware(ServerTimingMiddleware)
+# Profilage à la demande (POST /admin/profile)
+app.add_middleware(ProfilerMiddleware)
+# Échantillon des requêtes enregistré pour le rejeu (CAPTURE_ENABLED=1)
+app.add_middleware(RequestCaptureMiddleware)
+
 # Inclure les routeurs
 app.include_router(router, tags=["recommender"])
+app.include_router(metrics_router, tags=["monitoring"])
+app.include_router(admin_router, tags=["admin"])
+app.include_router(posters_router, tags=["posters"])
 
 
 @app.get("/")
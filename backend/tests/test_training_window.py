@@ -0,0 +1,74 @@
+"""
+Fenêtre d'entraînement (`RECO_TRAIN_WINDOW_DAYS`) : le moteur apprend sur les notes
+récentes, mais les films notés avant la fenêtre restent des films déjà vus.
+
+Depuis le dossier backend : python -m pytest tests
+"""
+import duckdb
+import numpy as np
+import pytest
+
+from app.service import recommendation_service as rs
+
+LATEST = 1_700_000_000
+DAY = 86400
+N_FILMS = 20
+OLD_USER, ABSENT_USER = 1, 1000
+
+
+@pytest.fixture
+def films_db(tmp_path, monkeypatch):
+    """
+    Base où le film 1 est le mieux noté des notes récentes. L'utilisateur 1 l'a noté
+    avant la fenêtre ; l'utilisateur 1000 n'a aucune note dans la fenêtre.
+    """
+    rng = np.random.default_rng(0)
+    rows = []
+    for user_id in range(2, 42):
+        for film_id in rng.choice(np.arange(2, N_FILMS + 1), size=8, replace=False):
+            rows.append((user_id, int(film_id), float(rng.integers(1, 5)), LATEST - int(rng.integers(0, 20)) * DAY))
+        rows.append((user_id, 1, 5.0, LATEST - int(rng.integers(0, 20)) * DAY))
+    rows += [(OLD_USER, 1, 5.0, LATEST - 1000 * DAY), (OLD_USER, 2, 3.0, LATEST - 5 * DAY),
+             (ABSENT_USER, 1, 4.0, LATEST - 900 * DAY), (ABSENT_USER, 3, 2.0, LATEST - 800 * DAY)]
+
+    path = tmp_path / "films.db"
+    with duckdb.connect(str(path)) as conn:
+        conn.execute("""
+            CREATE TABLE films (id INTEGER, title VARCHAR, genres VARCHAR, description VARCHAR,
+                                release_date DATE, vote_average FLOAT, vote_count INTEGER, poster_path VARCHAR)
+        """)
+        conn.execute("CREATE TABLE ratings (user_id INTEGER, film_id INTEGER, rating FLOAT, timestamp INTEGER)")
+        conn.executemany("INSERT INTO films VALUES (?, ?, 'Drame', '', DATE '2000-01-01', 0, 0, NULL)",
+                         [(film_id, f"Film {film_id}") for film_id in range(1, N_FILMS + 1)])
+        conn.executemany("INSERT INTO ratings VALUES (?, ?, ?, ?)", rows)
+    monkeypatch.setattr(rs, "FILMS_PATH", path)
+    monkeypatch.setattr(rs, "RECO_TRAIN_WINDOW_DAYS", 30)
+    return path
+
+
+def recommended(engine_name: str, user_id: int) -> set:
+    films, ratings_matrix, training_matrix = rs.load_data()
+    engine, _ = rs.get_or_train_model(ratings_matrix, engine_name, n_components=4, params={},
+                                      training_matrix=training_matrix)
+    response = rs.get_recommendation(user_id, ratings_matrix, films, engine, 10)
+    return {recommendation.movie_id for recommendation in response.recommendations}
+
+
+@pytest.mark.parametrize("engine_name", ["svd", "als"])
+def test_rating_before_window_is_seen(films_db, engine_name):
+    films, ratings_matrix, training_matrix = rs.load_data()
+    user_index = ratings_matrix.user_index(OLD_USER)
+    # Seule la note récente sert à l'entraînement, mais les deux films sont déjà vus
+    assert training_matrix.film_ids[training_matrix.seen(user_index)].tolist() == [2]
+    assert ratings_matrix.film_ids[ratings_matrix.seen(user_index)].tolist() == [1, 2]
+
+    movies = recommended(engine_name, OLD_USER)
+    assert movies
+    assert not movies & {1, 2}
+
+
+@pytest.mark.parametrize("engine_name", ["svd", "als"])
+def test_user_without_ratings_in_window(films_db, engine_name):
+    movies = recommended(engine_name, ABSENT_USER)
+    assert len(movies) == 10
+    assert not movies & {1, 3}
@@ -2,9 +2,67 @@ import requests
 import os
 import streamlit as st
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Récupère l'URL du backend à partir des variables d'environnement, sinon utilise une URL par défaut
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+# Délais (en secondes) de connexion et de lecture des appels au backend
+BACKEND_TIMEOUT = (float(os.getenv("BACKEND_CONNECT_TIMEOUT", "3")), float(os.getenv("BACKEND_READ_TIMEOUT", "30")))
+# Nouvelles tentatives sur erreur de connexion ou réponse 502/503/504 (en respectant Retry-After)
+BACKEND_RETRIES = int(os.getenv("BACKEND_RETRIES", "3"))
+# Durée de vie (en secondes) des réponses en cache, et de la version des données qui leur sert de clé
+CACHE_TTL = int(os.getenv("FRONTEND_CACHE_TTL", "3600"))
+DATA_VERSION_TTL = int(os.getenv("FRONTEND_DATA_VERSION_TTL", "30"))
+# URL du backend vue par le navigateur : si elle est définie, le navigateur charge (et garde en
+# cache) les affiches directement ; sinon elles transitent par ce serveur Streamlit
+POSTER_PUBLIC_URL = os.getenv("POSTER_PUBLIC_URL", "").rstrip("/")
+POSTER_CACHE_ENTRIES = int(os.getenv("FRONTEND_POSTER_CACHE_ENTRIES", "500"))
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """
+    Session HTTP partagée par tous les utilisateurs de l'application : les connexions au
+    backend sont réutilisées (keep-alive) au lieu d'être rouvertes à chaque appel.
+
+    Returns:
+        requests.Session: Session avec un pool de connexions et des nouvelles tentatives.
+    """
+    retry = Retry(
+        total=BACKEND_RETRIES,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        # Les POST du backend (recommandations) ne modifient rien : ils peuvent être rejoués
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _get(path: str, **kwargs) -> requests.Response:
+    return get_session().get(f"{BACKEND_URL}{path}", timeout=BACKEND_TIMEOUT, **kwargs)
+
+
+@st.cache_data(ttl=DATA_VERSION_TTL, show_spinner=False)
+def get_data_version() -> str:
+    """
+    Version des données du backend, utilisée comme clé des réponses en cache : dès
+    qu'elle change, les appels suivants interrogent de nouveau le backend.
+
+    Returns:
+        str: Version des données, ou chaîne vide si le backend ne répond pas.
+    """
+    try:
+        response = _get("/data/version")
+        response.raise_for_status()
+        return response.json()["version"]
+    except (requests.RequestException, KeyError, ValueError):
+        return ""
 
 
 # def get_all_movies(page: int = 1):
@@ -26,36 +84,27 @@ BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
 #         print(f"Erreur lors de get_all_movies: {e}")
 #         return []
 
-def get_all_movies():
+
+def get_statistics_overview(bins: int = 20, top_n: int = 10):
     """
-    Récupère tous les films depuis l'API backend, page par page.
-    
+    Récupère les agrégats du tableau de bord (histogramme des notes, films par année,
+    films les mieux notés), calculés par le backend.
+
+    Args:
+        bins (int): Nombre de classes de l'histogramme des notes.
+        top_n (int): Nombre de films les mieux notés.
+
     Returns:
-        list: Liste de tous les films disponibles.
-    """
-    all_movies = []
-    page = 1
-    while True:
-        try:
-            # Récupérer les films de la page actuelle
-            resp = requests.get(f"{BACKEND_URL}/films?page={page}")
-            resp.raise_for_status()  # Vérifie si la requête a réussi
-            data = resp.json()
-            movies = data.get("films", [])
-            
-            if not movies:
-                break  # Si aucune donnée n'est renvoyée, on arrête la boucle
-
-            # Ajouter les films récupérés à la liste
-            all_movies.extend(movies)
-            page += 1  # Passer à la page suivante
-            
-        except Exception as e:
-            print(f"Erreur lors de la récupération des films: {e}")
-            st.write(page)
-            break  # Si une erreur survient, arrêter la récupération des films
-    
-    return all_movies
+        dict | None: Agrégats, ou None si la requête échoue.
+    """
+    return _get_statistics_overview(bins, top_n, get_data_version())
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _get_statistics_overview(bins: int, top_n: int, data_version: str):
+    response = _get("/statistics/overview", params={"bins": bins, "top_n": top_n})
+    return response.json() if response.status_code == 200 else None
+
 
 def get_movie_by_id(movie_id: int):
     """
@@ -67,26 +116,87 @@ def get_movie_by_id(movie_id: int):
     Returns:
         dict | None: Dictionnaire contenant les informations du film, ou None si la requête échoue.
     """
-    response = requests.get(f"{BACKEND_URL}/films/{movie_id}")
+    return _get_movie_by_id(movie_id, get_data_version())
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _get_movie_by_id(movie_id: int, data_version: str):
+    response = _get(f"/films/{movie_id}")
     return response.json() if response.status_code == 200 else None
 
 
-def get_user_recommendations(user_id: int, num_recommendations: int = 5):
+def get_user_recommendations(user_id: int, num_recommendations: int = 5, genres: list = None,
+                             year_from: int = None, year_to: int = None):
     """
     Récupère des recommandations de films personnalisées pour un utilisateur.
 
+    Les filtres sont appliqués par le backend avant la sélection des meilleurs films :
+    inutile de demander plus de recommandations pour les filtrer ici.
+
     Args:
         user_id (int): Identifiant unique de l'utilisateur.
         num_recommendations (int): Nombre de recommandations souhaitées (par défaut 5).
+        genres (list, optional): Genres acceptés (au moins un par film recommandé).
+        year_from (int, optional): Première année de sortie acceptée.
+        year_to (int, optional): Dernière année de sortie acceptée.
 
     Returns:
         list: Liste de recommandations de films ou liste vide si la requête échoue.
     """
     params = {"num_recommendations": num_recommendations}
-    response = requests.post(f"{BACKEND_URL}/recommendation_movies/{user_id}", params=params)
+    if genres:
+        params["genres"] = list(genres)
+    if year_from is not None:
+        params["year_from"] = year_from
+    if year_to is not None:
+        params["year_to"] = year_to
+    response = get_session().post(f"{BACKEND_URL}/recommendation_movies/{user_id}", params=params,
+                                  timeout=BACKEND_TIMEOUT)
     return response.json() if response.status_code == 200 else []
 
 
+def get_poster(poster_path: str, size: str = "w300"):
+    """
+    Affiche d'un film en vignette, servie par le backend (`/posters/{size}/{poster_path}`).
+
+    Args:
+        poster_path (str): Chemin de l'affiche (`poster_path` du film).
+        size (str): Largeur de la vignette, par exemple `w200` ou `w300`.
+
+    Returns:
+        str | bytes | None: URL de la vignette si POSTER_PUBLIC_URL est définie, sinon l'image
+        elle-même ; None si l'affiche est indisponible. Les deux formes s'affichent avec `st.image`.
+    """
+    if POSTER_PUBLIC_URL:
+        return f"{POSTER_PUBLIC_URL}/posters/{size}{poster_path}"
+    return _get_poster(poster_path, size)
+
+
+@st.cache_data(max_entries=POSTER_CACHE_ENTRIES, show_spinner=False)
+def _get_poster(poster_path: str, size: str):
+    try:
+        response = _get(f"/posters/{size}{poster_path}")
+    except requests.RequestException:
+        return None
+    return response.content if response.status_code == 200 else None
+
+
+def get_genres():
+    """
+    Récupère la liste des genres disponibles pour filtrer les recommandations.
+
+    Returns:
+        list: Genres triés, ou liste vide si la requête échoue.
+    """
+    return _get_genres(get_data_version())
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _get_genres(data_version: str):
+    response = _get("/genres")
+    return response.json().get("genres", []) if response.status_code == 200 else []
+
+
 def get_statistics_by_genre_year(genre: str, year: int):
     """
     Récupère des statistiques de films en fonction du genre et de l'année.
@@ -98,7 +208,38 @@ def get_statistics_by_genre_year(genre: str, year: int):
     Returns:
         dict | None: Statistiques liées au genre et à l'année, ou None si la requête échoue.
     """
-    response = requests.get(f"{BACKEND_URL}/statistics/{genre}/{year}")
+    return _get_statistics_by_genre_year(genre, year, get_data_version())
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _get_statistics_by_genre_year(genre: str, year: int, data_version: str):
+    response = _get(f"/statistics/{genre}/{year}")
+    return response.json() if response.status_code == 200 else None
+
+
+def get_statistics_by_year_range(year_from: int, year_to: int, genres: list = None, top_n: int = 10):
+    """
+    Récupère les statistiques année par année d'une période (nombre de films, films par
+    genre, meilleurs films), calculées par le backend en une seule requête.
+
+    Args:
+        year_from (int): Première année de la période.
+        year_to (int): Dernière année de la période (incluse).
+        genres (list, optional): Genres retenus ; tous les genres si absent.
+        top_n (int): Nombre de meilleurs films par année.
+
+    Returns:
+        dict | None: Statistiques de chaque année, ou None si la requête échoue.
+    """
+    return _get_statistics_by_year_range(year_from, year_to, tuple(genres or ()), top_n, get_data_version())
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _get_statistics_by_year_range(year_from: int, year_to: int, genres: tuple, top_n: int, data_version: str):
+    params = {"year_from": year_from, "year_to": year_to, "top_n": top_n}
+    if genres:
+        params["genres"] = list(genres)
+    response = _get("/statistics/range", params=params)
     return response.json() if response.status_code == 200 else None
 
 
@@ -132,8 +273,9 @@ def afficher_film_complet(film_id: int):
 
     with col1:
         if poster_path:
-            poster_url = f"https://image.tmdb.org/t/p/w500{poster_path}"
-            st.image(poster_url, width=300)
+            poster = get_poster(poster_path, "w300")
+            if poster:
+                st.image(poster, width=300)
 
     with col2:
         st.title(title)
@@ -158,5 +300,10 @@ def get_genre_distribution_by_year(year: int):
         dict | None: Un dictionnaire contenant la liste des genres et leur fréquence pour l'année donnée,
                      ou None si la requête échoue.
     """
-    response = requests.get(f"{BACKEND_URL}/statistics/distribution_genres/{year}")
+    return _get_genre_distribution_by_year(year, get_data_version())
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _get_genre_distribution_by_year(year: int, data_version: str):
+    response = _get(f"/statistics/distribution_genres/{year}")
     return response.json() if response.status_code == 200 else None
@@ -8,20 +8,21 @@ import pandas as pd
 sns.set(style="whitegrid", palette="muted")
 
 
-def plot_rating_distribution(movies):
+def plot_rating_distribution(overview):
     """
     Affiche la distribution des notes moyennes des films sous forme d'histogramme.
 
     Args:
-        movies (list[dict]): Liste de films, chaque film étant représenté sous forme de dictionnaire 
-                             contenant au moins la clé 'vote_average'.
+        overview (dict): Réponse de `/statistics/overview`, dont la clé 'rating_histogram'
+                         donne les classes de notes (bornes et nombre de films).
 
     Returns:
         None. Le graphique est affiché via Streamlit.
     """
-    df = pd.DataFrame(movies)
+    bins = overview["rating_histogram"]
     fig, ax = plt.subplots(figsize=(10, 6))
-    sns.histplot(df["vote_average"], bins=20, kde=True, ax=ax, color="skyblue")
+    ax.bar([b["start"] for b in bins], [b["count"] for b in bins],
+           width=[b["end"] - b["start"] for b in bins], align="edge", color="skyblue", edgecolor="white")
     ax.set_title("Distribution des notes", fontsize=16, fontweight='bold')
     ax.set_xlabel("Note Moyenne", fontsize=14)
     ax.set_ylabel("Fréquence", fontsize=14)
@@ -31,24 +32,28 @@ def plot_rating_distribution(movies):
 
 
 
-def plot_movies_per_year(movies):
+def plot_movies_per_year(overview):
     """
     Affiche un graphique en barres du nombre de films par année de sortie.
 
     Args:
-        movies (list[dict]): Liste de films avec une clé 'release_date' au format YYYY-MM-DD.
+        overview (dict): Réponse de `/statistics/overview`, dont la clé 'films_per_year'
+                         donne le nombre de films de chaque année.
 
     Returns:
         None. Le graphique est affiché via Streamlit.
     """
-    df = pd.DataFrame(movies)
-    df["release_date"] = pd.to_datetime(df["release_date"], errors='coerce')
-    df["year"] = df["release_date"].dt.year
-    count_by_year = df["year"].value_counts().sort_index()
+    count_by_year = pd.Series(
+        {row["year"]: row["count"] for row in overview["films_per_year"]}, dtype="int64"
+    ).sort_index()
+    if count_by_year.empty:
+        st.info("Aucune date de sortie disponible.")
+        return
 
     fig, ax = plt.subplots(figsize=(10, 6))
     count_by_year.plot(kind="bar", ax=ax, color="cornflowerblue", edgecolor="black")
-    ax.set_title("Nombre de films par an de 1903 a 2025", fontsize=16, fontweight='bold')
+    ax.set_title(f"Nombre de films par an de {count_by_year.index.min()} a {count_by_year.index.max()}",
+                 fontsize=16, fontweight='bold')
     ax.set_xlabel("Année", fontsize=14)
     ax.set_ylabel("Nombre de films", fontsize=14)
 
@@ -65,23 +70,23 @@ def plot_movies_per_year(movies):
     st.pyplot(fig)
 
 
-def plot_top_movies(movies, top_n=10):
+def plot_top_movies(overview, top_n=10):
     """
     Affiche un graphique en barres horizontales des films les mieux notés.
 
     Args:
-        movies (list[dict]): Liste de films avec au minimum les clés 'vote_average' et 'title'.
+        overview (dict): Réponse de `/statistics/overview`, dont la clé 'top_films' donne
+                         les films les mieux notés (titre et note moyenne).
         top_n (int): Nombre de films à afficher dans le classement (par défaut : 10).
 
     Returns:
         None. Le graphique est affiché via Streamlit.
     """
-    df = pd.DataFrame(movies)
-    top_movies = df.sort_values("vote_average", ascending=False).head(top_n)
+    top_movies = pd.DataFrame(overview["top_films"]).head(top_n)
 
     fig, ax = plt.subplots(figsize=(10, 6))
     sns.barplot(data=top_movies, x="vote_average", y="title", ax=ax, color="lightseagreen", edgecolor="black")
-    ax.set_title(f"Top {top_n} films par note", fontsize=16, fontweight='bold')
+    ax.set_title(f"Top {len(top_movies)} films par note", fontsize=16, fontweight='bold')
     ax.set_xlabel("Note Moyenne", fontsize=14)
     ax.set_ylabel("Titre du Film", fontsize=14)
 
@@ -116,3 +121,32 @@ def plot_genre_distribution_chart(data: dict, year: int):
     st.pyplot(fig)
 
 
+
+
+def plot_genre_trends_chart(data: dict):
+    """
+    Affiche l'évolution du nombre de films par genre sur une période (une courbe par genre),
+    à partir de la réponse de `/statistics/range`.
+    """
+    if not data or not data.get("years"):
+        st.warning("Aucun film trouvé sur cette période.")
+        return
+
+    counts = pd.DataFrame(
+        [{"year": year["year"], "genre": g["genre"], "count": g["count"]} for year in data["years"] for g in year["genres"]]
+    )
+    if counts.empty:
+        st.warning("Aucun genre trouvé sur cette période.")
+        return
+    # Les années sans film d'un genre comptent 0 au lieu d'interrompre la courbe
+    years = range(data["year_from"], data["year_to"] + 1)
+    trends = counts.pivot_table(index="year", columns="genre", values="count", aggfunc="sum").reindex(years, fill_value=0).fillna(0)
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    trends.plot(ax=ax, marker="o")
+    ax.set_title(f"Nombre de films par genre de {data['year_from']} à {data['year_to']}")
+    ax.set_xlabel("Année")
+    ax.set_ylabel("Nombre de films")
+    ax.legend(title="Genre", bbox_to_anchor=(1.02, 1), loc="upper left")
+    plt.tight_layout()
+    st.pyplot(fig)
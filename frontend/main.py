@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
-from app.utils.api import get_all_movies, get_user_recommendations, afficher_film_complet, get_genre_distribution_by_year
+from app.utils.api import get_poster, get_statistics_overview, get_user_recommendations, afficher_film_complet, get_genre_distribution_by_year, get_genres, get_statistics_by_year_range
 from app.utils.charts import (
     plot_rating_distribution,
     plot_movies_per_year,
     plot_top_movies,
-    plot_genre_distribution_chart
+    plot_genre_distribution_chart,
+    plot_genre_trends_chart
 )
 from app.utils.logs import visual_log, display_logs
 from datetime import datetime
@@ -83,22 +84,21 @@ elif section == "📊 Statistiques des films":
     #     # Récupère les films de la dernière page valide
     #     all_movies = get_all_movies(page=last_valid_page)
     #     visual_log(f"Films chargés depuis la page {last_valid_page} (page de secours)", "SUCCESS")
-    # Récupérer tous les films disponibles
-    all_movies = get_all_movies()  # Cette fonction récupère tous les films en combinant les pages
-    
-    # Affichage des statistiques avec tous les films combinés
-    if all_movies:
+    # Agrégats calculés par le backend (quelques Ko au lieu du catalogue complet)
+    overview = get_statistics_overview(bins=20, top_n=10)
+
+    if overview and overview["total_films"]:
         st.subheader("Distribution des notes")
-        plot_rating_distribution(all_movies)
+        plot_rating_distribution(overview)
 
         st.subheader("Nombre de films par année")
-        plot_movies_per_year(all_movies)
+        plot_movies_per_year(overview)
 
         st.subheader("Top 10 des films les mieux notés")
-        plot_top_movies(all_movies, top_n=10)
+        plot_top_movies(overview, top_n=10)
     else:
         st.error("Aucun film n'a été récupéré pour afficher les statistiques.")
-        visual_log("Échec du chargement des films", "ERROR")
+        visual_log("Échec du chargement des statistiques", "ERROR")
 
 elif section == "🎯 Recommandations personnalisées":
     st.subheader("🔍 Rechercher des recommandations")
@@ -106,11 +106,18 @@ elif section == "🎯 Recommandations personnalisées":
     with st.form("user_form"):
         user_id = st.number_input("Entrer l'ID utilisateur", min_value=1, step=1)
         num_reco = st.slider("Nombre de recommandations", 1, 20, 5)
+        genres = st.multiselect("Genres (optionnel)", get_genres())
+        filter_years = st.checkbox("Filtrer par année de sortie")
+        year_from, year_to = st.slider("Années de sortie", 1900, datetime.now().year, (2000, datetime.now().year))
         submitted = st.form_submit_button("Obtenir les recommandations")
 
     if submitted:
         try:
-            reco_user = get_user_recommendations(user_id, num_reco)
+            reco_user = get_user_recommendations(
+                user_id, num_reco, genres,
+                year_from if filter_years else None,
+                year_to if filter_years else None,
+            )
             recommendations = reco_user["recommendations"]
             
             if recommendations:
@@ -123,9 +130,9 @@ elif section == "🎯 Recommandations personnalisées":
                         # Affiche l'affiche si disponible
                         with st.container(height=400,border=False):
                             poster = film.get('poster_path')
-                            if poster:
-                                image_url = f"https://image.tmdb.org/t/p/w300{poster}"
-                                st.image(image_url, width=200)
+                            image = get_poster(poster, "w200") if poster else None
+                            if image:
+                                st.image(image, width=200)
                             st.write("Titre: ",film['title'])
                             st.write("Id_film ",film['movie_id'])
                                     
@@ -200,3 +207,18 @@ elif section == "📅 Statistiques par genre et année":
         distribution_genres = get_genre_distribution_by_year(year)
         plot_genre_distribution_chart(distribution_genres, year)
 
+    st.subheader("📈 Tendances sur plusieurs années")
+    trend_from, trend_to = st.slider("Période", 1900, datetime.now().year, (2010, 2020))
+    trend_genres = st.multiselect("Genres (tous si aucun)", options=GENRES, default=["Action", "Drama"])
+    if st.button("Afficher les tendances"):
+        trends = get_statistics_by_year_range(trend_from, trend_to, trend_genres, top_n=3)
+        plot_genre_trends_chart(trends)
+        if trends and trends["years"]:
+            best = pd.DataFrame([
+                {"Année": year["year"], "Titre": film["title"],
+                 "Note moyenne": round(film["vote_average"], 2) if film["vote_average"] is not None else None}
+                for year in trends["years"] for film in year["top_films"]
+            ])
+            st.markdown("### 🎬 Meilleurs films de chaque année")
+            st.dataframe(best, hide_index=True)
+